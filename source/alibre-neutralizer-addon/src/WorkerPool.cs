@@ -0,0 +1,186 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.IO;
+using System.Linq;
+using System.Reflection;
+using System.Threading;
+
+namespace AlibreAddOnAssembly
+{
+    /// <summary>
+    /// Starts and looks after the headless worker processes (alibre-neutralizer-worker.exe) for a sharded export.
+    /// Each worker runs its own Alibre instance and IronPython engine, opens the assembly without ever saving it, and claims
+    /// components from the coordinator's work queue until it's empty (see FileWorkQueue in alibre-neutralizer.py).
+    /// The coordinator script calls <see cref="Start"/> once the queue is filled, and <see cref="Stop"/> once it's empty.
+    /// Workers that crash are restarted, up to <see cref="MaxRestartsPerWorker"/> times each.
+    /// </summary>
+    public class WorkerPool
+    {
+        public const string WorkerExecutableName = "alibre-neutralizer-worker.exe";
+
+        public int MaxRestartsPerWorker { get; set; } = 3;
+        public int Restarts { get; private set; }
+
+        private readonly object _lock = new object();
+        private readonly List<Worker> _workers = new List<Worker>();
+        private readonly List<string> _failures = new List<string>();
+        private Timer? _monitor;
+        private bool _stopping;
+
+        private class Worker
+        {
+            public int Number;
+            public string Arguments;
+            public string LogPath;
+            public Process Process;
+            public StreamWriter Log;
+            public int Restarts;
+            public bool Finished;
+        }
+
+        /// <summary>
+        /// Start <c>workerCount</c> workers on the assembly at <c>assemblyFilePath</c>, with the config at <c>configFilePath</c>.
+        /// Each worker's output goes to worker-N.log in <c>logDirectory</c>.
+        /// </summary>
+        public void Start(int workerCount, string configFilePath, string assemblyFilePath, string logDirectory)
+        {
+            lock (_lock)
+            {
+                if (_workers.Count > 0)
+                    throw new InvalidOperationException("The worker pool is already running.");
+                _failures.Clear();
+                Restarts = 0;
+                _stopping = false;
+                Directory.CreateDirectory(logDirectory);
+
+                string arguments = $"--role Worker --config {Quote(configFilePath)} --assembly {Quote(assemblyFilePath)}";
+                for (int i = 1; i <= workerCount; i++)
+                {
+                    var worker = new Worker
+                    {
+                        Number = i,
+                        Arguments = arguments,
+                        LogPath = Path.Combine(logDirectory, $"worker-{i}.log"),
+                    };
+                    worker.Log = new StreamWriter(worker.LogPath, false) { AutoFlush = true };
+                    _workers.Add(worker);
+                    Launch(worker);
+                }
+
+                _monitor = new Timer(_ => CheckWorkers(), null, TimeSpan.FromSeconds(2), TimeSpan.FromSeconds(2));
+            }
+        }
+
+        /// <summary>
+        /// Wait (up to <c>timeoutSeconds</c>) for the workers to run out of work and exit, then kill any still running.
+        /// Returns everything that went wrong with the workers along the way, for the coordinator's report.
+        /// </summary>
+        public string[] Stop(int timeoutSeconds)
+        {
+            lock (_lock)
+            {
+                _stopping = true;
+                _monitor?.Dispose();
+                _monitor = null;
+            }
+
+            var deadline = DateTime.UtcNow.AddSeconds(timeoutSeconds);
+            foreach (var worker in _workers)
+            {
+                int remainingMilliseconds = Math.Max(0, (int)(deadline - DateTime.UtcNow).TotalMilliseconds);
+                if (!worker.Process.WaitForExit(remainingMilliseconds))
+                {
+                    AddFailure($"ERROR: Worker {worker.Number} was still running {timeoutSeconds} seconds after the work queue emptied, so it was stopped. See {worker.LogPath}");
+                    try { worker.Process.Kill(); } catch { }
+                    worker.Process.WaitForExit();
+                }
+                else
+                {
+                    // Let the asynchronous output readers catch up before closing the log
+                    worker.Process.WaitForExit();
+                    if (!worker.Finished && worker.Process.ExitCode != 0)
+                        AddFailure($"ERROR: Worker {worker.Number} exited with code {worker.Process.ExitCode}. See {worker.LogPath}");
+                }
+                lock (worker.Log)
+                    worker.Log.Dispose();
+                worker.Process.Dispose();
+            }
+
+            lock (_lock)
+            {
+                _workers.Clear();
+                return _failures.ToArray();
+            }
+        }
+
+        private void CheckWorkers()
+        {
+            lock (_lock)
+            {
+                if (_stopping)
+                    return;
+                foreach (var worker in _workers.Where(w => !w.Finished && w.Process.HasExited))
+                {
+                    if (worker.Process.ExitCode == 0)
+                    {
+                        // Nothing left to claim
+                        worker.Finished = true;
+                    }
+                    else if (worker.Restarts < MaxRestartsPerWorker)
+                    {
+                        worker.Restarts++;
+                        Restarts++;
+                        AddFailure($"WARNING: Worker {worker.Number} crashed (exit code {worker.Process.ExitCode}), restarting it ({worker.Restarts} of {MaxRestartsPerWorker}). See {worker.LogPath}");
+                        worker.Process.Dispose();
+                        Launch(worker);
+                    }
+                    else
+                    {
+                        worker.Finished = true;
+                        AddFailure($"ERROR: Worker {worker.Number} crashed {worker.Restarts + 1} times, giving up on it. Whatever it had claimed goes back in the queue. See {worker.LogPath}");
+                    }
+                }
+            }
+        }
+
+        private void Launch(Worker worker)
+        {
+            string addOnDirectory = Path.GetDirectoryName(Assembly.GetExecutingAssembly().Location);
+            var startInfo = new ProcessStartInfo(Path.Combine(addOnDirectory, WorkerExecutableName), worker.Arguments)
+            {
+                UseShellExecute = false,
+                CreateNoWindow = true,
+                RedirectStandardOutput = true,
+                RedirectStandardError = true,
+                WorkingDirectory = addOnDirectory,
+            };
+            var process = new Process { StartInfo = startInfo };
+            process.OutputDataReceived += (sender, e) => WriteLog(worker, e.Data);
+            process.ErrorDataReceived += (sender, e) => WriteLog(worker, e.Data);
+            process.Start();
+            process.BeginOutputReadLine();
+            process.BeginErrorReadLine();
+            worker.Process = process;
+            WriteLog(worker, $"--- Worker {worker.Number} started (process {process.Id}) at {DateTime.Now:s} ---");
+        }
+
+        private static void WriteLog(Worker worker, string? line)
+        {
+            if (line == null)
+                return;
+            lock (worker.Log)
+            {
+                try { worker.Log.WriteLine(line); } catch (ObjectDisposedException) { }
+            }
+        }
+
+        private void AddFailure(string message)
+        {
+            lock (_failures)
+                _failures.Add(message);
+        }
+
+        private static string Quote(string argument) => "\"" + argument.Replace("\"", "\\\"") + "\"";
+    }
+}
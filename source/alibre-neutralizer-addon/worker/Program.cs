@@ -0,0 +1,61 @@
+﻿using AlibreAddOnAssembly;
+using AlibreX;
+using System;
+using System.Collections.Generic;
+
+namespace AlibreNeutralizerWorker
+{
+    /// <summary>
+    /// A headless Alibre Neutralizer worker, started by the add-on's WorkerPool for sharded exports.
+    /// Starts its own Alibre instance (no UI), opens the assembly hidden (it's never saved), and runs alibre-neutralizer.py with
+    /// this process's arguments, which claims components from the coordinator's work queue until it's empty.
+    ///
+    /// Usage: alibre-neutralizer-worker.exe --role Worker --config C:\path\to\config.xml --assembly C:\path\to\root.AD_ASM
+    ///
+    /// Exits with 0 once there's nothing left to claim, or non-zero if the worker crashed (and should be restarted).
+    /// </summary>
+    public static class Program
+    {
+        [STAThread]
+        public static int Main(string[] args)
+        {
+            string? assemblyFilePath = GetArgument(args, "--assembly");
+            if (assemblyFilePath == null || GetArgument(args, "--config") == null)
+            {
+                Console.Error.WriteLine("Usage: alibre-neutralizer-worker.exe --role Worker --config <config file> --assembly <assembly file>");
+                return 2;
+            }
+
+            IADRoot? root = null;
+            IADSession? session = null;
+            try
+            {
+                var hook = (IAutomationHook)Activator.CreateInstance(Type.GetTypeFromProgID("AlibreX.AutomationHook"));
+                hook.Initialize("", "", "", false, 0);
+                root = (IADRoot)hook.Root;
+
+                // Opened hidden, and never saved: workers only ever read the design
+                session = root.OpenFileEx(assemblyFilePath, true);
+
+                var runner = new ScriptRunner(root, interactive: false);
+                return runner.ExecuteScript(session, "alibre-neutralizer.py", new List<string>(args)) ? 0 : 1;
+            }
+            catch (Exception ex)
+            {
+                Console.Error.WriteLine($"Worker failed: {ex}");
+                return 1;
+            }
+            finally
+            {
+                try { session?.Close(false); } catch { }
+                try { root?.TerminateAll(); } catch { }
+            }
+        }
+
+        private static string? GetArgument(string[] args, string name)
+        {
+            int index = Array.IndexOf(args, name);
+            return index >= 0 && index + 1 < args.Length ? args[index + 1] : null;
+        }
+    }
+}
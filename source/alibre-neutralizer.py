@@ -9,9 +9,62 @@ from AlibreScript import *
 
 # real dependencies
 import os
+import errno
 import re
 import xml.etree.ElementTree as ET
 import csv
+import threading
+import Queue
+import shutil
+import gzip
+import zlib
+import zipfile
+import struct
+import time
+import uuid
+import hashlib
+import tempfile
+import operator
+import itertools
+import json
+import contextlib
+import gc
+from collections import OrderedDict
+
+# Optional: memory-mapped reads of big exported files. Falls back to ordinary buffered reads if mmap isn't available.
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+# Optional: .NET runtime access, for memory management. Always there inside Alibre (IronPython), missing under plain CPython.
+try:
+    import clr
+    from System import GC
+    from System.Diagnostics import Process
+except ImportError:
+    GC = None
+    Process = None
+
+# Optional: downscaling for PNG_Thumbnail exports, via .NET's System.Drawing. Without it, thumbnails stay the size Alibre rendered them.
+try:
+    import clr
+    clr.AddReference("System.Drawing")
+    from System.Drawing import Bitmap, Graphics
+    from System.Drawing.Drawing2D import InterpolationMode
+    from System.Drawing.Imaging import ImageFormat
+except (ImportError, IOError):
+    Bitmap = None
+
+# Optional: SQLite index export. Alibre Script ships it (via IronPython.SQLite), but not every IronPython install does.
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+class ConfigurationError(Exception):
+    """Raised when a config file (or an ExportDirective built from one) is invalid. Always raised before anything is exported or purged."""
+    pass
 
 class ExportTypes:
     """AlibreScript's IronPython interpreter doesn't have the Enum library available, so this was my best shot at fudging enum-ish behavior."""
@@ -22,6 +75,14 @@ class ExportTypes:
     IGES = 5
     CSV_Properties = 6
     CSV_Parameters = 7
+    CSV_BOM = 8
+    SQLite_Index = 9
+    JSON_Structure = 10
+    PNG_Thumbnail = 11
+    CSV_MassProperties = 12
+
+    # The names allowed in a config file's <type> tag
+    NAMES = ("STEP203", "STEP214", "SAT", "STL", "IGES", "CSV_Properties", "CSV_Parameters", "CSV_BOM", "SQLite_Index", "JSON_Structure", "PNG_Thumbnail", "CSV_MassProperties")
 
     # Static utility method
     @staticmethod
@@ -35,8 +96,14 @@ class ExportTypes:
             return [".stl"]
         elif (export_type == ExportTypes.IGES):
             return [".iges", ".igs"]
-        elif (export_type == ExportTypes.CSV_Properties) or (export_type == ExportTypes.CSV_Parameters):
+        elif (export_type == ExportTypes.CSV_Properties) or (export_type == ExportTypes.CSV_Parameters) or (export_type == ExportTypes.CSV_BOM) or (export_type == ExportTypes.CSV_MassProperties):
             return [".csv"]
+        elif (export_type == ExportTypes.SQLite_Index):
+            return [".sqlite", ".db"]
+        elif (export_type == ExportTypes.JSON_Structure):
+            return [".json"]
+        elif (export_type == ExportTypes.PNG_Thumbnail):
+            return [".png"]
         else:
             raise Exception("Invalid export type provided.")
     
@@ -57,13 +124,59 @@ class ExportTypes:
             return "CSV of Component Properties"
         elif export_type == ExportTypes.CSV_Parameters:
             return "CSV of Component Parameters"
+        elif export_type == ExportTypes.CSV_BOM:
+            return "CSV Bill of Materials"
+        elif export_type == ExportTypes.SQLite_Index:
+            return "SQLite Index of Properties and Parameters"
+        elif export_type == ExportTypes.JSON_Structure:
+            return "JSON Assembly Structure"
+        elif export_type == ExportTypes.PNG_Thumbnail:
+            return "PNG Thumbnail"
+        elif export_type == ExportTypes.CSV_MassProperties:
+            return "CSV of Mass Properties"
+
+    @staticmethod
+    def is_aggregate(export_type):
+        """Given an integer export type, return True if it writes ONE file per run covering every component (like a BOM),
+        rather than one file per component. Aggregate exports take their path from the root assembly."""
+        return (
+            (export_type == ExportTypes.CSV_BOM) or (export_type == ExportTypes.SQLite_Index) or (export_type == ExportTypes.JSON_Structure)
+            or (export_type == ExportTypes.CSV_MassProperties)
+        )
+
+    @staticmethod
+    def get_compressed_file_extension(export_type):
+        """Given an integer export type, return the file extension used when that type is written compressed.
+        STEP files use the ISO 10303-21 compressed STEP-Z convention (``.stpZ``); everything else just gets ``.gz`` tacked onto the end."""
+        if (export_type == ExportTypes.STEP203) or (export_type == ExportTypes.STEP214):
+            return ".stpZ"
+        elif (export_type == ExportTypes.SAT) or (export_type == ExportTypes.STL) or (export_type == ExportTypes.IGES):
+            return ".gz"
+        else:
+            raise Exception("Compression is not supported for {0} exports.".format(ExportTypes.convert_to_string(export_type)))
 
 class ExportDirective:
     """Each instance of this directs AssemblyNeutralizer to export a particular type of file, with a particular relative path and filename.
     For example, a STEP214 export to ./whatever/relative/path/{FileName}_{Revision}.stp ."""
 
-    def __init__(self, export_type, export_rel_path_expression, purge_directory_before_export=None, export_root_assembly=True, export_subassemblies=True, export_parts=True):
-        # type: (ExportDirective, int, str, None | str, bool, bool, bool) -> None
+    # The {Variables} available in export_rel_path_expression (see get_export_path())
+    PATH_VARIABLES = (
+        "Comment", "CostCenter", "CreatedBy", "CreatedDate", "CreatingApplication", "Density", "Description", "DocumentNumber",
+        "EngineeringApprovalDate", "EngineeringApprovedBy", "EstimatedCost", "FileName", "Keywords", "LastAuthor", "LastUpdateDate",
+        "ManufacturingApprovedBy", "ModifiedInformation", "Name", "Number", "Product", "ReceivedFrom", "Revision", "StockSize",
+        "Supplier", "Title", "Vendor", "WebLink", "Configuration",
+    )
+
+    # Set ``configurations`` to this to export every configuration a component has
+    ALL_CONFIGURATIONS = "All"
+
+    # PNG_Thumbnail images are rendered this many times bigger than thumbnail_size, then scaled down, which smooths the edges
+    THUMBNAIL_RENDER_SCALE = 2
+    # The PNG text chunk keyword a thumbnail's stamp (what it shows; see AlibreNeutralizer._get_thumbnail_stamp()) is kept under
+    THUMBNAIL_STAMP_KEYWORD = "AlibreNeutralizerStamp"
+
+    def __init__(self, export_type, export_rel_path_expression, purge_directory_before_export=None, export_root_assembly=True, export_subassemblies=True, export_parts=True, compress=False, convert_stl_to_binary=False, detect_geometry_changes=False, geometry_tolerance=1e-6, base_path=None, configurations=None, thumbnail_size=256):
+        # type: (ExportDirective, int, str, None | str, bool, bool, bool, bool, bool, bool, float, str | None, list[str] | str | None, int) -> None
         """
         Define a new Export Directive. You'll need one of these for each type of file you want to export.
 
@@ -71,7 +184,11 @@ class ExportDirective:
         :type export_type: str
 
         :param export_rel_path_expression: Specify a formula for the relative path of each exported file, using Python string .format syntax.
-        For example, ``./whatever/relative/path/{FileName}_{Revision}.stp``. Available variables are: TODO
+        For example, ``./whatever/relative/path/{FileName}_{Revision}.stp``. Available variables (``ExportDirective.PATH_VARIABLES``) are the
+        component's Name and FileName, the configuration it's exported in (Configuration), and its file properties: Comment, CostCenter,
+        CreatedBy, CreatedDate, CreatingApplication, Density, Description, DocumentNumber, EngineeringApprovalDate, EngineeringApprovedBy,
+        EstimatedCost, Keywords, LastAuthor, LastUpdateDate, ManufacturingApprovedBy, ModifiedInformation, Number, Product, ReceivedFrom,
+        Revision, StockSize, Supplier, Title, Vendor and WebLink.
         :type export_rel_path_expression: str
 
         :param purge_directory_before_export: Set to a path (relative to the root assembly) that you'd like purged of your selected export type (.stp, .sat, etc) before exporting.
@@ -85,30 +202,102 @@ class ExportDirective:
 
         :param export_parts: Set to False to skip exporting individual parts with this Export Directive.
         :type export_parts: bool
+
+        :param compress: Set to True to write compressed files: STEP exports become STEP-Z (``.stpZ``), and SAT/STL/IGES exports get gzipped (``.gz``).
+        Compression happens on the post-export workers, so it doesn't hold up Alibre.
+        :type compress: bool
+
+        :param convert_stl_to_binary: For STL exports only. Set to True to convert ASCII STL files to binary STL, which is roughly 5x smaller
+        and much faster for slicers to load. Files that are already binary are left alone.
+        :type convert_stl_to_binary: bool
+
+        :param detect_geometry_changes: For STL exports only. Set to True to only replace an existing STL file when its geometry actually changed.
+        Re-tessellation can reorder triangles (or rotate their vertices) without changing the shape, which otherwise shows up as a changed file in Git.
+        When this is enabled, the purge for this directive runs after the export, and only deletes files that weren't written this run.
+        :type detect_geometry_changes: bool
+
+        :param geometry_tolerance: How far apart (in model units) two vertex coordinates may be and still count as the same, when ``detect_geometry_changes`` is on.
+        :type geometry_tolerance: float
+
+        :param base_path: The absolute base path this directive's export and purge paths are relative to, if it isn't the AlibreNeutralizer's own.
+        That's the case for directives from a merged config file (see MergeConfigFile) with a BaseExportPath of its own.
+        :type base_path: str | None
+
+        :param configurations: The names of the Alibre configurations to export each component in, or ``ExportDirective.ALL_CONFIGURATIONS`` for all of them.
+        Each one gets activated in turn (once per component, for every directive that wants it), and the one that was active is put back afterwards.
+        Components without a configuration of that name are skipped for it. Leave as None (the default) to export whichever configuration is active.
+        :type configurations: list[str] | str | None
+
+        :param thumbnail_size: For PNG_Thumbnail exports only. The width and height of the images, in pixels.
+        :type thumbnail_size: int
         """
-        # Core Export Settings
-        
-        # TODO: Data validation
+        # Core Export Settings (from a config file, ConfigCompiler has already checked the type and the path template)
         self.export_type = export_type
-
-        # TODO: Data validation
         self.export_rel_path_expression = export_rel_path_expression
-
-        # TODO: Data validation on the relative path syntax, if it's not set to None
         self.purge_before_export = purge_directory_before_export
 
         # Store data on which types of components we should export
         self.export_root_assembly = export_root_assembly
         self.export_subassemblies = export_subassemblies
         self.export_parts = export_parts
+
+        if export_type == ExportTypes.SQLite_Index and sqlite3 is None:
+            raise ConfigurationError("SQLite_Index exports need the sqlite3 module, which isn't available in this Python environment.")
+
+        # Output compression (STEP-Z for STEP, gzip for everything else)
+        if compress:
+            # Fails right away for types that can't be compressed (like the CSVs), rather than halfway through an export
+            ExportTypes.get_compressed_file_extension(export_type)
+        self.compress = compress
+
+        # ASCII to binary STL compaction
+        if convert_stl_to_binary and export_type != ExportTypes.STL:
+            raise ConfigurationError("STL to binary conversion is only available for STL exports.")
+        self.convert_stl_to_binary = convert_stl_to_binary
+
+        # Geometry-aware write-if-changed
+        if detect_geometry_changes and export_type != ExportTypes.STL:
+            raise ConfigurationError("Geometry-aware change detection is only available for STL exports.")
+        self.detect_geometry_changes = detect_geometry_changes
+        self.geometry_tolerance = geometry_tolerance
+
+        # Where this directive's paths start from (None means the AlibreNeutralizer's base path)
+        self.base_path = base_path
+
+        # Which configurations to export (None means whichever is active)
+        if configurations is not None:
+            if ExportTypes.is_aggregate(export_type):
+                raise ConfigurationError("Configurations can't be set for {0} exports, which cover the whole run in one file.".format(ExportTypes.convert_to_string(export_type)))
+            if (configurations == ExportDirective.ALL_CONFIGURATIONS or len(configurations) > 1) and "{Configuration" not in export_rel_path_expression:
+                raise ConfigurationError("Exporting more than one configuration needs {{Configuration}} in the RelativeExportPath ({0}), or each one overwrites the last.".format(export_rel_path_expression))
+        self.configurations = configurations
+
+        # Thumbnail image size
+        if thumbnail_size < 1:
+            raise ConfigurationError("The thumbnail size has to be at least 1 pixel, not {0}.".format(thumbnail_size))
+        self.thumbnail_size = thumbnail_size
+
+    def checks_previous_output(self):
+        """Return True if this directive's exports get checked against the files the last run left behind, so those have to survive until it's done:
+        Alibre writes to a temporary file next to the real output, and the purge runs after exporting. That's STL change detection, and thumbnails."""
+        # type: (ExportDirective) -> bool
+        return self.detect_geometry_changes or self.export_type == ExportTypes.PNG_Thumbnail
+
+    def wants_configuration(self, configuration_name):
+        """Return True if this directive exports the configuration named ``configuration_name`` (when it's set to export specific ones)."""
+        # type: (ExportDirective, str) -> bool
+        return self.configurations == ExportDirective.ALL_CONFIGURATIONS or configuration_name in self.configurations
     
-    def get_export_path(self, component):
+    def get_export_path(self, component, configuration=None):
         """Given a Part or Subassembly or Assembly, return the relative Export path based on the expression in ``export_rel_path_expression``.
         
         :type self: ExportDirective
 
         :param component: The component (Part or Assembly) whose export path you want to evaluate.
         :type component: Assembly | Part | Subassembly | AssembledPart
+
+        :param configuration: The name of the configuration being exported, for {Configuration}. None means whichever one is active.
+        :type configuration: str | None
         """
         # A smidge of type enforcement
         if not (
@@ -121,6 +310,9 @@ class ExportDirective:
         
         # At this point we can safely assume we have an Alibre Part/Assembly
         component_properties_prettified = self.get_prettified_component_properties(component)
+        # Only ask Alibre which configuration is active when the path actually uses it
+        if configuration is None and "{Configuration" in self.export_rel_path_expression:
+            configuration = _get_active_configuration_name(component)
         
         path_unsanitized = os.path.normpath(
             self.export_rel_path_expression.format(
@@ -151,6 +343,7 @@ class ExportDirective:
                 Title = component_properties_prettified["Title"],
                 Vendor = component_properties_prettified["Vendor"],
                 WebLink = component_properties_prettified["WebLink"],
+                Configuration = configuration if configuration else "Undefined Configuration",
             )
         )
 
@@ -163,6 +356,20 @@ class ExportDirective:
 
         return path_sanitized
 
+    def get_output_path(self, export_path):
+        """Given the path a file gets exported to, return the path of the file this directive finally leaves on disk.
+        That's the same path, unless compression is enabled, in which case it's the compressed file's path."""
+        # type: (ExportDirective, str) -> str
+        if not self.compress:
+            return export_path
+
+        compressed_extension = ExportTypes.get_compressed_file_extension(self.export_type)
+        if compressed_extension == ".stpZ":
+            # STEP-Z replaces the .stp/.step extension rather than adding to it
+            return os.path.splitext(export_path)[0] + compressed_extension
+        else:
+            return export_path + compressed_extension
+
     def get_prettified_component_properties(self, component):
         """Return a dictionary of Alibre component properties (such as Number, CostCenter, etc).
         The only difference over the 'raw' data is that this dictionary will replace any totally-empty values
@@ -253,14 +460,1392 @@ class ExportDirective:
         # type: (ExportDirective) -> list[str]
         if self.purge_before_export == None:
             return [] # Returning an empty list means "purge no files"
+        elif self.compress:
+            compressed_extension = ExportTypes.get_compressed_file_extension(self.export_type)
+            if compressed_extension == ".stpZ":
+                return [compressed_extension]
+            return [extension + compressed_extension for extension in ExportTypes.get_file_extensions(self.export_type)]
         else:
             return ExportTypes.get_file_extensions(self.export_type)
 
+class PostExportPipeline:
+    """Runs the follow-up work for each export (writing CSVs, and anything else that doesn't need Alibre) on a pool of worker threads.
+
+    Alibre's COM calls have to stay on the thread that owns the Alibre session, but nothing that happens *after* a file has been
+    handed to us needs Alibre at all. The COM thread submits that work here and moves straight on to the next component.
+
+    The queue between the COM thread and the workers is bounded: if the workers fall behind, ``submit()`` blocks until a slot frees up.
+    This back-pressure keeps memory use flat no matter how many components are waiting to be post-processed."""
+
+    def __init__(self, worker_count=2, queue_size=32):
+        # type: (PostExportPipeline, int, int) -> None
+        """
+        :param worker_count: Number of worker threads. Set to 0 to run every task inline on the calling thread (handy for debugging).
+        :type worker_count: int
+
+        :param queue_size: Maximum number of tasks waiting for a worker before ``submit()`` blocks.
+        :type queue_size: int
+        """
+        self.worker_count = max(0, worker_count)
+        self.queue_size = max(1, queue_size)
+        self._queue = None
+        self._workers = []
+        self._failures = []
+        self._failures_lock = threading.Lock()
+        self._group = None
+
+    def start(self):
+        """Spin up the worker threads. Safe to call again after ``drain()``."""
+        # type: (PostExportPipeline) -> None
+        if self._workers:
+            return
+        self._queue = Queue.Queue(self.queue_size)
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self._worker_loop, name="PostExportWorker-{0}".format(i))
+            # Daemon threads, so a crashed run can never hang Alibre on exit
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, description, function, *args):
+        """Queue ``function(*args)`` to run on a worker thread. Blocks while the queue is full.
+
+        :param description: Human-readable description of the task, used in failure messages (e.g. the output file path).
+        :type description: str
+        """
+        # type: (PostExportPipeline, str, callable, ...) -> None
+        group = self._group
+        if group is not None:
+            with group.lock:
+                group.pending += 1
+        if not self._workers:
+            # No workers (or not started): just do the work right here
+            self._run_task(description, function, args, group)
+        else:
+            self._queue.put((description, function, args, group))
+
+    def begin_group(self):
+        """Collect every task submitted from now on (until ``end_group()``) into a new ``PostExportTaskGroup``, and return it."""
+        # type: (PostExportPipeline) -> PostExportTaskGroup
+        self._group = PostExportTaskGroup()
+        return self._group
+
+    def end_group(self, on_done):
+        """Stop collecting tasks into the current group, and call ``on_done(group)`` once every task in it has finished.
+        That's right away if they already have; otherwise it's on the worker thread that finishes the last one, so ``on_done`` mustn't touch Alibre."""
+        # type: (PostExportPipeline, callable) -> None
+        group = self._group
+        self._group = None
+        with group.lock:
+            group.on_done = on_done
+            finished = group.pending == 0
+        if finished:
+            on_done(group)
+
+    def pop_failures(self):
+        """Return (and forget) the failure messages collected so far. Call this from the COM thread so logging stays single-threaded."""
+        # type: (PostExportPipeline) -> list[str]
+        with self._failures_lock:
+            failures = self._failures
+            self._failures = []
+        return failures
+
+    def drain(self):
+        """Wait for every queued task to finish, then stop the worker threads. Returns any failure messages not yet popped."""
+        # type: (PostExportPipeline) -> list[str]
+        for _ in self._workers:
+            self._queue.put(None) # One stop sentinel per worker
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        return self.pop_failures()
+
+    def _worker_loop(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            description, function, args, group = task
+            self._run_task(description, function, args, group)
+
+    def _run_task(self, description, function, args, group=None):
+        try:
+            function(*args)
+        except Exception as e:
+            failure_message = "ERROR: Post-export processing failed for {0}: {1}".format(description, e)
+            if group is not None:
+                with group.lock:
+                    group.failures.append(failure_message)
+            else:
+                with self._failures_lock:
+                    self._failures.append(failure_message)
+        if group is None:
+            return
+        with group.lock:
+            group.pending -= 1
+            on_done = group.on_done if group.pending == 0 else None
+        if on_done is not None:
+            try:
+                on_done(group)
+            except Exception as e:
+                with self._failures_lock:
+                    self._failures.append("ERROR: Post-export processing failed to finish up after {0}: {1}".format(description, e))
+
+class PostExportTaskGroup:
+    """Post-export tasks that belong together (like everything for one work queue item), so something can happen once they've all finished
+    (see ``PostExportPipeline.begin_group()``). Failures in the group's tasks are kept here, rather than going to ``PostExportPipeline.pop_failures()``."""
+
+    def __init__(self):
+        # type: (PostExportTaskGroup) -> None
+        self.failures = []
+        self.pending = 0
+        # Set by end_group(); until then, the group can still get more tasks, so it can't be finished
+        self.on_done = None
+        self.lock = threading.Lock()
+
+class PurgeEngine:
+    """Deletes the stale files for one or more purges, on a pool of worker threads.
+
+    A big purge can mean hundreds of thousands of ``os.remove()`` calls, each one a round-trip to the (often network) filesystem.
+    Here, one thread walks the purge directories and feeds the files to delete through a bounded queue to the deleter threads, so the deletes
+    overlap, memory use stays flat, and the calling thread is free to get on with something else (like planning the exports) until it calls ``wait()``.
+    Failures are counted up by cause, and ``wait()`` returns one summary line per cause rather than one per file."""
+
+    def __init__(self, worker_count=4, queue_size=1024):
+        # type: (PurgeEngine, int, int) -> None
+        """
+        :param worker_count: Number of deleter threads. Set to 0 to do the whole purge inline in ``start()`` (handy for debugging).
+        :type worker_count: int
+
+        :param queue_size: Maximum number of files waiting for a deleter before the directory walk pauses.
+        :type queue_size: int
+        """
+        self.worker_count = max(0, worker_count)
+        self.queue_size = max(1, queue_size)
+        self.deleted_count = 0
+        self.failed_count = 0
+        self._failures = OrderedDict() # cause -> [count, example path]
+        self._lock = threading.Lock()
+        self._queue = None
+        self._threads = []
+
+    def start(self, purges):
+        """Start purging. ``purges`` is a list of ``(directory, extensions, keep_files)`` tuples: every file under ``directory`` (recursively)
+        ending in one of ``extensions`` gets deleted, unless its normalized path (``os.path.normcase(os.path.normpath(path))``) is in ``keep_files``."""
+        # type: (PurgeEngine, list[tuple[str, tuple[str], set[str] | None]]) -> None
+        if self.worker_count == 0:
+            for file_path in self._iter_files_to_purge(purges):
+                self._delete(file_path)
+            return
+        self._queue = Queue.Queue(self.queue_size)
+        walker = threading.Thread(target=self._walk, args=(purges,), name="PurgeWalker")
+        self._threads = [walker] + [threading.Thread(target=self._delete_loop, name="PurgeWorker-{0}".format(i)) for i in range(self.worker_count)]
+        for thread in self._threads:
+            # Daemon threads, so a crashed run can never hang Alibre on exit
+            thread.daemon = True
+            thread.start()
+
+    def is_running(self):
+        """Whether the purge started by ``start()`` is still going."""
+        # type: (PurgeEngine) -> bool
+        return any(thread.is_alive() for thread in self._threads)
+
+    def wait(self):
+        """Wait for the purge to finish. Returns one summary line for each cause of failure (empty if every file was deleted)."""
+        # type: (PurgeEngine) -> list[str]
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return [
+            "ERROR: Could not delete {0} files in purge: {1} (e.g. {2})".format(count, cause, example_path)
+            for cause, (count, example_path) in self._failures.items()
+        ]
+
+    def _iter_files_to_purge(self, purges):
+        for purge_path, extensions, keep_files in purges:
+            for root, _, files in os.walk(purge_path):
+                for file in files:
+                    if file.endswith(extensions):
+                        file_path = os.path.join(root, file)
+                        if keep_files is not None and os.path.normcase(os.path.normpath(file_path)) in keep_files:
+                            continue
+                        yield file_path
+
+    def _walk(self, purges):
+        try:
+            for file_path in self._iter_files_to_purge(purges):
+                self._queue.put(file_path)
+        except Exception as e:
+            self._record_failure("the directory walk failed: {0}".format(e), "")
+        finally:
+            for _ in range(self.worker_count):
+                self._queue.put(None) # One stop sentinel per deleter
+
+    def _delete_loop(self):
+        while True:
+            file_path = self._queue.get()
+            if file_path is None:
+                return
+            self._delete(file_path)
+
+    def _delete(self, file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            # Already gone (another purge of an overlapping directory got there first, or someone else deleted it), which is all we wanted
+            if e.errno != errno.ENOENT:
+                self._record_failure(e.strerror or str(e), file_path)
+            return
+        with self._lock:
+            self.deleted_count += 1
+
+    def _record_failure(self, cause, file_path):
+        with self._lock:
+            failure = self._failures.setdefault(cause, [0, file_path])
+            failure[0] += 1
+            self.failed_count += 1
+
+class ParameterTable:
+    """A component's Parameters (the Equation Editor table), read from Alibre once and stored column by column.
+
+    Generated parts can carry thousands of parameters. Every field of every parameter is still its own COM round-trip (``attrgetter`` only
+    makes the reading loop tidier), but it only happens once per run: the values are kept in one table, as one compact tuple per column
+    rather than a list of lists, and only sorted (once) when a writer asks for alphabetical rows.
+    The same table feeds every writer (CSV, SQLite, ...) without going back to Alibre."""
+
+    COLUMNS = ["Name", "Equation", "Value", "Units", "Type", "Comment"]
+    _read_fields = operator.attrgetter(*COLUMNS)
+
+    def __init__(self, columns):
+        # type: (ParameterTable, list[tuple]) -> None
+        """
+        :param columns: One tuple of values per entry in ``ParameterTable.COLUMNS``, all the same length.
+        :type columns: list[tuple]
+        """
+        self.columns = columns
+        self._alphabetical_order = None
+
+    @staticmethod
+    def read(component):
+        """Read every Parameter of a Part or Assembly from Alibre into a new ``ParameterTable``."""
+        # type: (Part | Assembly) -> ParameterTable
+        rows = [ParameterTable._read_fields(param) for param in component.Parameters]
+        if not rows:
+            return ParameterTable([() for _ in ParameterTable.COLUMNS])
+        return ParameterTable(zip(*rows))
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def iter_rows(self, alphabetized=True):
+        """Yield one tuple per parameter (in ``ParameterTable.COLUMNS`` order), without building the whole table of rows in memory.
+
+        :param alphabetized: Sort by parameter name. We don't know what order Alibre returns parameters in (will D1 come before A19?),
+        so sorting keeps the output consistent between runs, which makes it easy to diff.
+        :type alphabetized: bool
+        """
+        if alphabetized:
+            if self._alphabetical_order is None:
+                # The names column already IS the sort key, so just sort row numbers by it (stable, like sorting the rows would be)
+                names = self.columns[0]
+                self._alphabetical_order = sorted(range(len(names)), key=names.__getitem__)
+            order = self._alphabetical_order
+        else:
+            order = range(len(self))
+
+        columns = self.columns
+        for i in order:
+            yield tuple(column[i] for column in columns)
+
+class RunReport:
+    """Timings and other statistics for one run of ``AlibreNeutralizer.export_all()``.
+    These get printed at the end of the run, and can be saved as JSON (``RunReportPath``), so runs with different settings can be compared."""
+
+    def __init__(self):
+        # type: (RunReport) -> None
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.settings = OrderedDict()
+        self.phase_seconds = OrderedDict()
+        self.export_counts = OrderedDict()
+        self.export_seconds = OrderedDict()
+        self.counters = OrderedDict()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a ``with`` block as one phase of the run (e.g. "Purge"). Time spent in the same phase more than once is added up."""
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + (time.time() - started)
+
+    def add_export(self, export_type_name, seconds):
+        """Record one export of the given type, and how long Alibre spent on it."""
+        # type: (RunReport, str, float) -> None
+        self.export_counts[export_type_name] = self.export_counts.get(export_type_name, 0) + 1
+        self.export_seconds[export_type_name] = self.export_seconds.get(export_type_name, 0.0) + seconds
+
+    def get_summary_lines(self):
+        """Return the report as human-readable lines, for the console."""
+        # type: (RunReport) -> list[str]
+        lines = ["Run report:"]
+        for name, value in self.settings.items():
+            lines.append("- {0}: {1}".format(name, value))
+        for name, seconds in self.phase_seconds.items():
+            lines.append("- {0}: {1:.1f} s".format(name, seconds))
+        for name, count in self.export_counts.items():
+            lines.append("- {0} exports: {1} in {2:.1f} s ({3:.2f} s each)".format(name, count, self.export_seconds[name], self.export_seconds[name] / count))
+        for name, value in self.counters.items():
+            lines.append("- {0}: {1}".format(name, value))
+        return lines
+
+    def save(self, report_path):
+        """Save the report as JSON."""
+        # type: (RunReport, str) -> None
+        report_directory = os.path.dirname(report_path)
+        if not os.path.exists(report_directory):
+            os.makedirs(report_directory)
+        with open(report_path, 'w') as report_file:
+            json.dump(OrderedDict([
+                ("StartedAt", self.started_at),
+                ("Settings", self.settings),
+                ("PhaseSeconds", self.phase_seconds),
+                ("ExportCounts", self.export_counts),
+                ("ExportSeconds", self.export_seconds),
+                ("Counters", self.counters),
+            ]), report_file, indent=2)
+
+class ExportHistory:
+    """What we remember about each component from earlier runs, saved as JSON between runs (``ExportHistoryPath``). Keyed by FileName.
+    For each component, that's how long its exports took (which the ``ExportScheduler`` uses to estimate how long they'll take next time),
+    when it was last exported, the modification time its source file had back then (to tell whether it's changed since),
+    and its mass properties, with the geometry fingerprint they were read for (so CSV_MassProperties doesn't ask Alibre again until it changes)."""
+
+    def __init__(self, history_path=None):
+        # type: (ExportHistory, str | None) -> None
+        """
+        :param history_path: Absolute path of the JSON file to load from and save to. If None, history only lasts as long as this object.
+        :type history_path: str | None
+        """
+        self.history_path = history_path
+        self.components = {}
+        if history_path is not None and os.path.exists(history_path):
+            with open(history_path, 'r') as history_file:
+                self.components = json.load(history_file).get("Components", {})
+
+    def get_export_seconds(self, file_name):
+        """Return how long all of a component's exports took last time, or None if we've never exported it."""
+        # type: (ExportHistory, str) -> float | None
+        return self.components.get(file_name, {}).get("ExportSeconds")
+
+    def get_average_export_seconds(self, component_kind):
+        """Return the average time all of a component's exports took, across every component of this kind ("Part", "Subassembly", ...) we know of."""
+        # type: (ExportHistory, str) -> float | None
+        known_seconds = [entry["ExportSeconds"] for entry in self.components.values() if entry.get("Kind") == component_kind and "ExportSeconds" in entry]
+        if not known_seconds:
+            return None
+        return sum(known_seconds) / len(known_seconds)
+
+    def get_last_exported(self, file_name):
+        """Return when (seconds since the epoch) we last exported a component, or None if we've never exported it."""
+        # type: (ExportHistory, str) -> float | None
+        return self.components.get(file_name, {}).get("LastExported")
+
+    def has_changed(self, file_name):
+        """Return True if a component has never been exported, or its source file has been modified since we last exported it."""
+        # type: (ExportHistory, str) -> bool
+        entry = self.components.get(file_name)
+        if entry is None or "LastExported" not in entry:
+            return True
+        source_modified = _get_source_modified(file_name)
+        return source_modified is not None and source_modified != entry.get("SourceModified")
+
+    def record_export(self, file_name, component_kind, seconds):
+        """Remember that we've just exported a component, and how long all of its exports took."""
+        # type: (ExportHistory, str, str, float) -> None
+        entry = self.components.setdefault(file_name, {})
+        entry["Kind"] = component_kind
+        entry["ExportSeconds"] = seconds
+        entry["LastExported"] = time.time()
+        entry["SourceModified"] = _get_source_modified(file_name)
+
+    def get_mass_properties(self, file_name, fingerprint):
+        """Return the mass properties we last read for a component, or None if we haven't read them for this ``fingerprint`` of its geometry."""
+        # type: (ExportHistory, str, str) -> list | None
+        entry = self.components.get(file_name, {}).get("MassProperties")
+        if entry is None or entry.get("Fingerprint") != fingerprint:
+            return None
+        return entry["Values"]
+
+    def record_mass_properties(self, file_name, fingerprint, values):
+        """Remember a component's mass properties (see ``_read_mass_properties()``), as read for the geometry fingerprint ``fingerprint``."""
+        # type: (ExportHistory, str, str, list) -> None
+        self.components.setdefault(file_name, {})["MassProperties"] = {"Fingerprint": fingerprint, "Values": values}
+
+    def save(self):
+        """Write the history back to ``self.history_path`` (if there is one). The old file is only replaced once the new one is completely written."""
+        # type: (ExportHistory) -> None
+        if self.history_path is None:
+            return
+        history_directory = os.path.dirname(self.history_path)
+        if not os.path.exists(history_directory):
+            os.makedirs(history_directory)
+        temporary_path = _get_temporary_path(self.history_path)
+        with open(temporary_path, 'w') as history_file:
+            json.dump({"Version": 1, "Components": self.components}, history_file, indent=1, sort_keys=True)
+        _replace_file(temporary_path, self.history_path)
+
+class ExportScheduler:
+    """Decides what order the planned components get exported in.
+
+    Every component's export directives always run back-to-back, whatever the order, so Alibre's geometry for that component stays hot in its caches.
+    What changes is the order of the components themselves:
+
+    - ``Traversal`` (the default) keeps the order the assembly tree was walked in: the root assembly, then parts before the subassembly they're in.
+    - ``LongestFirst`` exports the components expected to take longest first, going by their timings from earlier runs (components we've never
+      exported are assumed to take the average for their kind). The expensive work finishes early, so a time-boxed run gets the most value."""
+
+    TRAVERSAL = "Traversal"
+    LONGEST_FIRST = "LongestFirst"
+    EXPORT_ORDERS = [TRAVERSAL, LONGEST_FIRST]
+
+    def __init__(self, export_order, export_history):
+        # type: (ExportScheduler, str, ExportHistory) -> None
+        if export_order not in ExportScheduler.EXPORT_ORDERS:
+            raise Exception("Invalid export order '{0}'. Options are: {1}".format(export_order, ", ".join(ExportScheduler.EXPORT_ORDERS)))
+        self.export_order = export_order
+        self.export_history = export_history
+        self._average_seconds = {} # component kind -> average export seconds, worked out once per kind
+
+    def schedule(self, plan):
+        """Given the planned ``(component, component_kind)`` pairs in traversal order, return them in the order they should be exported."""
+        # type: (ExportScheduler, list[tuple]) -> list[tuple]
+        if self.export_order == ExportScheduler.TRAVERSAL:
+            return list(plan)
+
+        # sorted() is stable, so components with the same estimate keep their traversal order, and the schedule is repeatable
+        return sorted(plan, key=self.get_expected_seconds, reverse=True)
+
+    def prioritize(self, schedule, backlog_files):
+        """For time-boxed runs: given a schedule, return it reordered so the components that matter most come first, in case we run out of time.
+        That's changed components (never exported, or modified since), then the root assembly, then the backlog left over by the last run
+        (``backlog_files``), then everything else, least-recently-exported first. Within each group, the order of ``schedule`` is kept."""
+        # type: (ExportScheduler, list[tuple], set[str]) -> list[tuple]
+        def _priority(planned_component):
+            component, component_kind = planned_component
+            if self.export_history.has_changed(component.FileName):
+                return (0, 0)
+            if component_kind == "Root Assembly":
+                return (1, 0)
+            if component.FileName in backlog_files:
+                return (2, 0)
+            return (3, self.export_history.get_last_exported(component.FileName))
+
+        return sorted(schedule, key=_priority)
+
+    def get_expected_seconds(self, planned_component):
+        """Return how long all of the exports on a planned ``(component, component_kind)`` are expected to take, going by earlier runs.
+        Components we've never exported are assumed to take the average for their kind (or 0, if we've never exported anything of that kind)."""
+        # type: (ExportScheduler, tuple) -> float
+        component, component_kind = planned_component
+        seconds = self.export_history.get_export_seconds(component.FileName)
+        if seconds is None:
+            if component_kind not in self._average_seconds:
+                self._average_seconds[component_kind] = self.export_history.get_average_export_seconds(component_kind) or 0.0
+            seconds = self._average_seconds[component_kind]
+        return seconds
+
+class StagedOutput:
+    """Builds a run's output in a staging directory next to the live output directory, then swaps it into place in one go.
+
+    Without it, the live output is purged at the start of a run and filled back in as the exports happen, so anyone reading it mid-run sees
+    a half-empty tree, and a crash loses the old files. With it, the live output isn't touched until the very end:
+
+    1. The staging directory is seeded with a hard link to every live file the pre-export purge would have *kept* (the files it would have deleted are
+       just left behind, so there's nothing to purge). Links cost next to nothing however big the output is, and they're safe because the run never
+       writes into a file it didn't create: existing outputs are always removed or replaced first (see ``AlibreNeutralizer._output_may_be_linked()``).
+       The few files a run does update in place (the SQLite index) are copied instead, and so is everything if the volume can't do hard links.
+    2. The run exports into the staging directory.
+    3. ``swap()`` renames the live directory out of the way, renames the staging directory into its place, and deletes the old one.
+       Readers see either the complete old output or the complete new one; only the two renames in between are unprotected.
+
+    Both the staging directory and the old one live next to the live directory (``<live>.staging-<run ID>-<process ID>`` and
+    ``<live>.previous-<run ID>-<process ID>``), so they're on the same volume and the renames don't copy anything.
+    Leftovers from a crashed run are cleared out by the next one (see ``remove_leftovers()``)."""
+
+    STAGING_SUFFIX = ".staging-"
+    PREVIOUS_SUFFIX = ".previous-"
+    # Next to a staging directory (``<staging>.complete``) while it's being swapped in, to say it holds a finished run's output
+    COMPLETE_SUFFIX = ".complete"
+
+    def __init__(self, live_path, run_id):
+        # type: (StagedOutput, str, str) -> None
+        self.live_path = os.path.normpath(live_path)
+        # The process ID tells the next run whether these belong to a run that's still going
+        owner_suffix = "{0}-{1}".format(run_id, _get_process_id())
+        self.staging_path = self.live_path + StagedOutput.STAGING_SUFFIX + owner_suffix
+        self.previous_path = self.live_path + StagedOutput.PREVIOUS_SUFFIX + owner_suffix
+        self.linked_count = 0
+        self.copied_count = 0
+        self._thread = None
+        self._error = None
+
+    def remove_leftovers(self):
+        """Clean up the staging and old directories left next to the live directory by earlier runs that crashed (or couldn't delete them).
+        A run that crashed between the two renames of its swap leaves no live directory at all. Then its old output is put back,
+        or if there wasn't one, its finished new output. Directories that belong to a run that's still going (in another process) are left alone."""
+        # type: (StagedOutput) -> None
+        parent_path, live_name = os.path.split(self.live_path)
+        if not os.path.isdir(parent_path):
+            return
+        leftover_paths = []
+        interrupted_swaps = [] # The owner suffixes (run ID and process ID) of the runs that crashed mid-swap
+        # Run IDs start with the time, so these come out oldest first
+        for name in sorted(os.listdir(parent_path)):
+            if name.startswith(live_name + StagedOutput.STAGING_SUFFIX) and name.endswith(StagedOutput.COMPLETE_SUFFIX):
+                owner_suffix = name[len(live_name + StagedOutput.STAGING_SUFFIX):-len(StagedOutput.COMPLETE_SUFFIX)]
+                if StagedOutput._is_abandoned(owner_suffix):
+                    interrupted_swaps.append(owner_suffix)
+                    leftover_paths.append(os.path.join(parent_path, name))
+            elif name.startswith(live_name + StagedOutput.STAGING_SUFFIX) or name.startswith(live_name + StagedOutput.PREVIOUS_SUFFIX):
+                if StagedOutput._is_abandoned(name):
+                    leftover_paths.append(os.path.join(parent_path, name))
+
+        # Only the directories of an interrupted swap are known to be whole; any other old directory may be half deleted
+        if not os.path.exists(self.live_path) and interrupted_swaps:
+            for suffix in (StagedOutput.PREVIOUS_SUFFIX, StagedOutput.STAGING_SUFFIX):
+                path = self.live_path + suffix + interrupted_swaps[-1]
+                if os.path.isdir(path):
+                    os.rename(path, self.live_path)
+                    print "Recovered the output of a run that crashed while swapping it into place, from {0}".format(path)
+                    break
+
+        for path in leftover_paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _is_abandoned(name):
+        """Whether the staging or old directory called ``name`` (or just its run ID and process ID) belongs to a run that's over:
+        its process has exited, or it's this process, which only runs one export at a time.
+        Directories without a process ID predate it, so they're always abandoned."""
+        # type: (str) -> bool
+        try:
+            process_id = int(name.rsplit("-", 1)[1])
+        except (IndexError, ValueError):
+            return True
+        return process_id == _get_process_id() or not _process_is_running(process_id)
+
+    def start_seeding(self, purges, excluded_paths=(), copied_paths=()):
+        """Start linking the live files into the staging directory in the background, except the ones ``purges`` (see ``PurgeEngine.start()``) would delete,
+        and anything under ``excluded_paths`` (directories that belong to this run alone, like the work queue).
+        The files in ``copied_paths`` get updated in place during the run, so they're copied rather than linked."""
+        # type: (StagedOutput, list[tuple[str, tuple[str], set[str] | None]], list[str], list[str]) -> None
+        os.makedirs(self.staging_path)
+        excluded_paths = set(os.path.normcase(os.path.normpath(path)) for path in excluded_paths)
+        copied_paths = set(os.path.normcase(os.path.normpath(path)) for path in copied_paths)
+        self._thread = threading.Thread(target=self._seed, args=(purges, excluded_paths, copied_paths), name="StagingSeeder")
+        # Daemon thread, so a crashed run can never hang Alibre on exit
+        self._thread.daemon = True
+        self._thread.start()
+
+    def is_seeding(self):
+        """Whether ``start_seeding()`` is still going."""
+        # type: (StagedOutput) -> bool
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait_for_seeding(self):
+        """Wait for ``start_seeding()`` to finish. Raises whatever went wrong, if anything did."""
+        # type: (StagedOutput) -> None
+        self._thread.join()
+        if self._error is not None:
+            raise Exception("Could not seed the staging directory {0}: {1}".format(self.staging_path, self._error))
+
+    def swap(self, attempts=10):
+        """Swap the staging directory into the live directory's place, then delete the old output.
+        Windows won't rename a directory while something has a file in it open, so each rename is retried (once a second) before giving up.
+        If the swap fails, the old output is put back, and the new one is left in the staging directory."""
+        # type: (StagedOutput, int) -> None
+        # If we crash between the two renames, this tells the next run the staging directory is finished (see remove_leftovers())
+        open(self.staging_path + StagedOutput.COMPLETE_SUFFIX, 'w').close()
+        if os.path.exists(self.live_path):
+            _rename_with_retries(self.live_path, self.previous_path, attempts)
+        try:
+            _rename_with_retries(self.staging_path, self.live_path, attempts)
+        except Exception:
+            if os.path.exists(self.previous_path):
+                os.rename(self.previous_path, self.live_path)
+            raise
+        os.remove(self.staging_path + StagedOutput.COMPLETE_SUFFIX)
+        # Anything that can't be deleted yet (e.g. still open in a reader) gets cleared out by the next run
+        shutil.rmtree(self.previous_path, ignore_errors=True)
+
+    def _seed(self, purges, excluded_paths, copied_paths):
+        can_link = True
+        try:
+            for root, directories, files in os.walk(self.live_path):
+                staging_root = os.path.join(self.staging_path, os.path.relpath(root, self.live_path))
+                # Pruning the list in place stops os.walk() from going into them
+                directories[:] = [directory for directory in directories if os.path.normcase(os.path.join(root, directory)) not in excluded_paths]
+                for directory in directories:
+                    os.makedirs(os.path.join(staging_root, directory))
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    if _is_purged(file_path, purges):
+                        continue
+                    staged_file_path = os.path.join(staging_root, file)
+                    if can_link and os.path.normcase(file_path) not in copied_paths:
+                        try:
+                            _create_link(file_path, staged_file_path)
+                            self.linked_count += 1
+                            continue
+                        except OSError:
+                            can_link = False # e.g. a FAT32 or network volume; it won't work for the next file either
+                    shutil.copy2(file_path, staged_file_path)
+                    self.copied_count += 1
+        except Exception as e:
+            self._error = e
+
+class FileWorkQueue:
+    """A work queue shared by several neutralizer processes (each in its own Alibre instance), kept as a directory of small JSON files, one per component.
+
+    Layout, under the queue directory::
+
+        queue.json   Which run the queue belongs to. Written last, so workers never see a half-filled queue.
+        todo/        Items waiting to be claimed
+        claimed/     Items a process is working on
+        done/        Finished items, with the results the worker reported (output files, timings)
+        failed/      Finished items that had export failures
+        reports/     The workers' run reports (see get_report_path())
+
+    Claiming an item is an ``os.rename()`` from ``todo/`` into ``claimed/``. Within one volume that's atomic, so exactly one process wins each item,
+    without any locks. Nothing in here touches Alibre, so the queue can be exercised without it."""
+
+    COORDINATOR = "Coordinator"
+    WORKER = "Worker"
+    ROLES = [COORDINATOR, WORKER]
+
+    TODO = "todo"
+    CLAIMED = "claimed"
+    DONE = "done"
+    FAILED = "failed"
+    STATES = [TODO, CLAIMED, DONE, FAILED]
+
+    REPORTS = "reports"
+
+    MANIFEST_FILE_NAME = "queue.json"
+
+    def __init__(self, queue_path):
+        # type: (FileWorkQueue, str) -> None
+        """
+        :param queue_path: Absolute path of the queue directory. Every process sharing the queue needs to see it at the same path, on the same volume.
+        :type queue_path: str
+        """
+        self.queue_path = queue_path
+
+    def reset(self, run_id, items, output_path=None):
+        """Throw away whatever was in the queue, and fill it with ``items`` (JSON-able dicts) for the run ``run_id``, in order.
+        ``output_path``, if given, is where everyone should write their exports instead of the configured base path (e.g. a ``StagedOutput``'s staging directory)."""
+        # type: (FileWorkQueue, str, list[dict], str | None) -> None
+        manifest_path = os.path.join(self.queue_path, FileWorkQueue.MANIFEST_FILE_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for state in FileWorkQueue.STATES:
+            state_path = os.path.join(self.queue_path, state)
+            if os.path.exists(state_path):
+                shutil.rmtree(state_path)
+            os.makedirs(state_path)
+        # Reports from the last run's workers
+        shutil.rmtree(os.path.join(self.queue_path, FileWorkQueue.REPORTS), ignore_errors=True)
+
+        for i in range(len(items)):
+            # Item names sort in queue order, so claim() hands them out in the order they were scheduled
+            self._write_item(os.path.join(self.queue_path, FileWorkQueue.TODO, "{0:06d}.json".format(i)), items[i])
+        self._write_item(manifest_path, {"Version": 1, "RunId": run_id, "Items": len(items), "OutputPath": output_path})
+
+    def get_manifest(self):
+        """Return the manifest (``RunId``, ``Items``, ``OutputPath``) the queue was last filled with, or None if there's no queue (or it's still being filled)."""
+        # type: (FileWorkQueue) -> dict | None
+        manifest_path = os.path.join(self.queue_path, FileWorkQueue.MANIFEST_FILE_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r') as manifest_file:
+            return json.load(manifest_file)
+
+    def claim(self, process_id=None):
+        """Claim the next item waiting in the queue, and return it (with its queue name added as ``"Id"``), or None if there's nothing left to claim.
+        If ``process_id`` is given, it's recorded with the claim, so the claim can be taken back as soon as that process dies (see release_stale_claims())."""
+        # type: (FileWorkQueue, int | None) -> dict | None
+        for name in self._list_items(FileWorkQueue.TODO):
+            claimed_path = os.path.join(self.queue_path, FileWorkQueue.CLAIMED, name)
+            try:
+                os.rename(os.path.join(self.queue_path, FileWorkQueue.TODO, name), claimed_path)
+            except OSError:
+                continue # Someone else got there first
+            # Claims are timed from now, not from when the item was queued (see release_stale_claims())
+            os.utime(claimed_path, None)
+            with open(claimed_path, 'r') as item_file:
+                item = json.load(item_file)
+            if process_id is not None:
+                item["ClaimedBy"] = process_id
+                self._write_item(claimed_path, item)
+            item["Id"] = name
+            return item
+        return None
+
+    def complete(self, item, result):
+        """Report a claimed item as finished, with a ``result`` dict to store alongside it. Items whose ``result["Failures"]`` isn't empty go to ``failed/``.
+        Returns False if the claim had already been released as stale (someone else will redo that item, and this result is dropped)."""
+        # type: (FileWorkQueue, dict, dict) -> bool
+        claimed_path = os.path.join(self.queue_path, FileWorkQueue.CLAIMED, item["Id"])
+        if not os.path.exists(claimed_path):
+            return False
+        finished_item = dict(item)
+        finished_item.update(result)
+        state = FileWorkQueue.FAILED if result.get("Failures") else FileWorkQueue.DONE
+        self._write_item(os.path.join(self.queue_path, state, item["Id"]), finished_item)
+        os.remove(claimed_path)
+        return True
+
+    def release(self, item):
+        """Put a claimed item back in ``todo/``, for anyone (this process included) to claim again.
+        Does nothing if it isn't claimed anymore (it's been completed, or released as stale)."""
+        # type: (FileWorkQueue, dict) -> None
+        try:
+            os.rename(os.path.join(self.queue_path, FileWorkQueue.CLAIMED, item["Id"]), os.path.join(self.queue_path, FileWorkQueue.TODO, item["Id"]))
+        except OSError:
+            pass
+
+    def get_report_path(self, worker_id, report_file_name):
+        """Return where the worker ``worker_id`` saves its run report (``report_file_name`` is the name the config gives it).
+        Every worker gets a file of its own, so they don't save over each other's reports (or the coordinator's). ``reset()`` clears them out."""
+        # type: (FileWorkQueue, str, str) -> str
+        return os.path.join(self.queue_path, FileWorkQueue.REPORTS, "{0}-{1}".format(worker_id, os.path.basename(report_file_name)))
+
+    def release_stale_claims(self, timeout_seconds):
+        """Put items back in ``todo/`` if the process that claimed them has died, or (for claims that don't say who made them)
+        they were claimed more than ``timeout_seconds`` ago. Returns how many were released."""
+        # type: (FileWorkQueue, float) -> int
+        released = 0
+        now = time.time()
+        for name in self._list_items(FileWorkQueue.CLAIMED):
+            claimed_path = os.path.join(self.queue_path, FileWorkQueue.CLAIMED, name)
+            try:
+                with open(claimed_path, 'r') as item_file:
+                    process_id = json.load(item_file).get("ClaimedBy")
+                if process_id is not None:
+                    stale = not _process_is_running(process_id)
+                else:
+                    stale = now - os.path.getmtime(claimed_path) > timeout_seconds
+                if stale:
+                    os.rename(claimed_path, os.path.join(self.queue_path, FileWorkQueue.TODO, name))
+                    released += 1
+            except (OSError, IOError, ValueError):
+                pass # Finished (or released, or being rewritten) while we were looking
+        return released
+
+    def get_counts(self):
+        """Return how many items are in each state, e.g. ``{"todo": 12, "claimed": 3, "done": 40, "failed": 0}``."""
+        # type: (FileWorkQueue) -> dict[str, int]
+        return dict((state, len(self._list_items(state))) for state in FileWorkQueue.STATES)
+
+    def iter_results(self):
+        """Yield every finished item (from ``done/`` and ``failed/``), with its result."""
+        # type: (FileWorkQueue) -> Iterator[dict]
+        for state in [FileWorkQueue.DONE, FileWorkQueue.FAILED]:
+            for name in self._list_items(state):
+                with open(os.path.join(self.queue_path, state, name), 'r') as item_file:
+                    yield json.load(item_file)
+
+    def _list_items(self, state):
+        state_path = os.path.join(self.queue_path, state)
+        if not os.path.exists(state_path):
+            return []
+        # Skip the temporary files items are written through
+        return sorted(name for name in os.listdir(state_path) if name.endswith(".json") and not name.startswith("~"))
+
+    def _write_item(self, item_path, item):
+        # Write to a temporary file, then move it into place, so nobody ever reads (or claims) a half-written item
+        temporary_path = _get_temporary_path(item_path)
+        with open(temporary_path, 'w') as item_file:
+            json.dump(item, item_file, indent=1)
+        _replace_file(temporary_path, item_path)
+
+class HashService:
+    """Hashes files (SHA-1), for the export cache and the content store, without reading a file twice if it hasn't changed.
+    Files are read in memory-mapped chunks (see ``_iter_file_chunks()``), and ``hash_files()`` spreads them over a pool of threads.
+
+    Results are remembered, and saved as JSON between runs (``HashCachePath``), keyed by path, size and modification time,
+    so a file whose size or modification time has changed gets hashed again. A file that changes while it's being hashed isn't remembered at all."""
+
+    def __init__(self, cache_path=None, worker_count=4):
+        # type: (HashService, str | None, int) -> None
+        """
+        :param cache_path: Absolute path of the JSON file to load from and save to. If None, hashes only last as long as this object.
+        :type cache_path: str | None
+
+        :param worker_count: How many threads ``hash_files()`` uses. 0 hashes on the calling thread.
+        :type worker_count: int
+        """
+        self.cache_path = cache_path
+        self.worker_count = worker_count
+        self.hashed_count = 0
+        self.cached_count = 0
+        self._lock = threading.Lock()
+        self._files = {}
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as cache_file:
+                    self._files = json.load(cache_file).get("Files", {})
+            except ValueError:
+                pass # A damaged cache just means hashing everything again
+
+    def hash_file(self, file_path):
+        """Return the SHA-1 (hex) of a file's contents, from the cache if the file hasn't changed since it was last hashed."""
+        # type: (HashService, str) -> str
+        key = os.path.normcase(os.path.abspath(file_path))
+        file_stat = os.stat(file_path)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is not None and entry["Size"] == file_stat.st_size and entry["Modified"] == file_stat.st_mtime:
+                self.cached_count += 1
+                return entry["Hash"]
+        content_hash = _hash_file(file_path)
+        hashed_stat = os.stat(file_path)
+        with self._lock:
+            if hashed_stat.st_size == file_stat.st_size and hashed_stat.st_mtime == file_stat.st_mtime:
+                self._files[key] = {"Size": file_stat.st_size, "Modified": file_stat.st_mtime, "Hash": content_hash}
+            self.hashed_count += 1
+        return content_hash
+
+    def hash_files(self, file_paths):
+        """Hash a batch of files on the thread pool. Returns a dict of path -> SHA-1 (hex). Files that can't be read are left out."""
+        # type: (HashService, list[str]) -> dict[str, str]
+        file_hashes = {}
+        file_paths = list(file_paths)
+        if self.worker_count <= 0 or len(file_paths) <= 1:
+            for file_path in file_paths:
+                try:
+                    file_hashes[file_path] = self.hash_file(file_path)
+                except (IOError, OSError):
+                    pass
+            return file_hashes
+
+        path_queue = Queue.Queue()
+        for file_path in file_paths:
+            path_queue.put(file_path)
+
+        def _hash_loop():
+            while True:
+                try:
+                    file_path = path_queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    content_hash = self.hash_file(file_path)
+                except (IOError, OSError):
+                    continue
+                with self._lock:
+                    file_hashes[file_path] = content_hash
+
+        threads = [threading.Thread(target=_hash_loop, name="Hasher-{0}".format(i)) for i in range(min(self.worker_count, len(file_paths)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return file_hashes
+
+    def save(self):
+        """Write the cache back to ``self.cache_path`` (if there is one), leaving out files that don't exist anymore."""
+        # type: (HashService) -> None
+        if self.cache_path is None:
+            return
+        with self._lock:
+            files = dict((key, entry) for key, entry in self._files.items() if os.path.exists(key))
+        cache_directory = os.path.dirname(self.cache_path)
+        if not os.path.exists(cache_directory):
+            os.makedirs(cache_directory)
+        temporary_path = _get_temporary_path(self.cache_path)
+        with open(temporary_path, 'w') as cache_file:
+            json.dump({"Version": 1, "Files": files}, cache_file, sort_keys=True)
+        _replace_file(temporary_path, self.cache_path)
+
+class ExportCache:
+    """A persistent cache of files Alibre has exported, shared across runs (and products). Parts like standard hardware show up in
+    dozens of products, and only need exporting once for all of them, as long as the source file doesn't change.
+
+    Entries are keyed by the source file's content hash, the export type, and the version of the exporter (Alibre), and hold the file exactly
+    as Alibre wrote it. Post-processing (compression etc) still happens per run, so directives with different options share entries.
+    A hit is materialized by copying the entry, or by hard-linking it with ``use_links`` (nothing in here ever rewrites an output file in place).
+
+    Layout: ``objects/<first 2 characters of key>/<key>`` for the entries, ``tmp/`` for entries being written, and a ``trim.lock`` file.
+    Entries are written to ``tmp/`` and renamed into place, so readers never see half a file, and any number of runs can read and add at once.
+    Each hit touches the entry's modification time, which ``trim()`` uses to evict the least recently used entries once the cache is too big.
+    Only one run trims at a time (whoever holds ``trim.lock``); the others skip it."""
+
+    # A trim lock older than this was left behind by a crashed run
+    LOCK_TIMEOUT_SECONDS = 600
+
+    # Only Alibre's own (slow) geometry exports are worth caching. The CSVs are written from properties we read anyway.
+    EXPORT_TYPES = (ExportTypes.STEP203, ExportTypes.STEP214, ExportTypes.SAT, ExportTypes.STL, ExportTypes.IGES)
+
+    def __init__(self, cache_path, max_size_mb, use_links=False):
+        # type: (ExportCache, str, float, bool) -> None
+        self.cache_path = cache_path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.use_links = use_links
+        self._objects_path = os.path.join(cache_path, "objects")
+        self._tmp_path = os.path.join(cache_path, "tmp")
+        self._lock_path = os.path.join(cache_path, "trim.lock")
+
+    @staticmethod
+    def get_key(source_hash, export_type, exporter_version, configuration=None):
+        """Return the cache key for exporting a source file with content hash ``source_hash`` to ``export_type``, with exporter version ``exporter_version``.
+        ``configuration`` is the name of the configuration activated for the export; None (the file's own active configuration) keeps the original key."""
+        # type: (str, int, str, str | None) -> str
+        key = "{0}|{1}|{2}".format(source_hash, ExportTypes.convert_to_string(export_type), exporter_version)
+        if configuration is not None:
+            key += u"|{0}".format(configuration).encode("utf-8")
+        return hashlib.sha1(key).hexdigest()
+
+    def fetch(self, key, destination_path):
+        """Materialize the entry for ``key`` at ``destination_path``. Returns False (leaving nothing behind) if there's no such entry,
+        including when another run evicts it while we're at it."""
+        # type: (ExportCache, str, str) -> bool
+        entry_path = self._get_entry_path(key)
+        if not os.path.exists(entry_path):
+            return False
+        try:
+            # Mark it as recently used
+            os.utime(entry_path, None)
+            if os.path.exists(destination_path):
+                os.remove(destination_path)
+            if self.use_links:
+                try:
+                    _create_link(entry_path, destination_path)
+                    return True
+                except OSError:
+                    pass # e.g. the cache is on another drive. Copy it instead.
+            shutil.copyfile(entry_path, destination_path)
+            return True
+        except (IOError, OSError):
+            if os.path.exists(destination_path):
+                os.remove(destination_path)
+            return False
+
+    def store(self, key, source_path):
+        """Add the file at ``source_path`` to the cache as the entry for ``key``, unless there's one already (another run may have just added it)."""
+        # type: (ExportCache, str, str) -> None
+        entry_path = self._get_entry_path(key)
+        if os.path.exists(entry_path):
+            return
+        for directory in (self._tmp_path, os.path.dirname(entry_path)):
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    pass # Another run just made it
+        # Unique per writer, so two runs storing the same entry don't trip over each other
+        temporary_path = os.path.join(self._tmp_path, "{0}-{1}".format(key, uuid.uuid4().hex[:8]))
+        shutil.copyfile(source_path, temporary_path)
+        try:
+            os.rename(temporary_path, entry_path)
+        except OSError:
+            # Windows won't rename over an existing file, so someone beat us to it. Their copy is just as good.
+            os.remove(temporary_path)
+
+    def trim(self):
+        """Evict the least recently used entries until the cache fits in ``max_size_bytes``. Returns how many were evicted.
+        Skipped (returning 0) if another run is trimming already."""
+        # type: (ExportCache) -> int
+        if not os.path.isdir(self._objects_path) or not self._acquire_lock():
+            return 0
+        try:
+            entries = []
+            total_size = 0
+            for directory_path, _, file_names in os.walk(self._objects_path):
+                for file_name in file_names:
+                    entry_path = os.path.join(directory_path, file_name)
+                    try:
+                        entry_stat = os.stat(entry_path)
+                    except OSError:
+                        continue
+                    entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+                    total_size += entry_stat.st_size
+
+            evicted_count = 0
+            for _, entry_size, entry_path in sorted(entries):
+                if total_size <= self.max_size_bytes:
+                    break
+                try:
+                    os.remove(entry_path)
+                except OSError:
+                    continue # In use (Windows), so leave it for next time
+                total_size -= entry_size
+                evicted_count += 1
+
+            # Entries that crashed runs never finished writing
+            if os.path.isdir(self._tmp_path):
+                for file_name in os.listdir(self._tmp_path):
+                    temporary_path = os.path.join(self._tmp_path, file_name)
+                    try:
+                        if time.time() - os.path.getmtime(temporary_path) > self.LOCK_TIMEOUT_SECONDS:
+                            os.remove(temporary_path)
+                    except OSError:
+                        pass
+            return evicted_count
+        finally:
+            self._release_lock()
+
+    def _get_entry_path(self, key):
+        # type: (ExportCache, str) -> str
+        return os.path.join(self._objects_path, key[:2], key)
+
+    def _acquire_lock(self):
+        """Take the trim lock, breaking it if it's stale. Returns False if another run holds it."""
+        # type: (ExportCache) -> bool
+        for _ in range(2):
+            try:
+                lock_file = os.open(self._lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(lock_file, str(_get_process_id()))
+                os.close(lock_file)
+                return True
+            except OSError:
+                try:
+                    if time.time() - os.path.getmtime(self._lock_path) <= self.LOCK_TIMEOUT_SECONDS:
+                        return False
+                    os.remove(self._lock_path)
+                except OSError:
+                    return False
+        return False
+
+    def _release_lock(self):
+        # type: (ExportCache) -> None
+        try:
+            os.remove(self._lock_path)
+        except OSError:
+            pass
+
+class ContentStore:
+    """A content-addressed store for output files. Every file is kept once, as ``<first 2 characters of hash>/<SHA-1 of contents>``,
+    and the paths the export directives asked for become links to it: hard links by default, or symbolic links.
+    Byte-identical outputs (the same part under two numbers, the same file in two directories) then only take up space once,
+    and two trees can be compared by their link targets (or inodes) without reading any files.
+
+    Blobs are added under a writer-unique name and renamed into place, so any number of runs can share a store.
+    Nothing in here ever deletes a blob: with hard links, the store can be deleted at any time (each output keeps its own link to the data),
+    which is also how to reclaim space from blobs nothing links to anymore."""
+
+    HARD_LINK = "HardLink"
+    SYMBOLIC_LINK = "SymLink"
+    LINK_TYPES = [HARD_LINK, SYMBOLIC_LINK]
+
+    def __init__(self, store_path, link_type=HARD_LINK):
+        # type: (ContentStore, str, str) -> None
+        self.store_path = store_path
+        self.link_type = link_type
+
+    def add(self, file_path, content_hash=None):
+        """Move the file at ``file_path`` into the store (unless an identical one is in there already), and leave a link to it in its place.
+        Pass its SHA-1 (hex) as ``content_hash`` if it's already known. Returns True if the store already had it (so ``file_path`` now shares its space with another file)."""
+        # type: (ContentStore, str, str | None) -> bool
+        blob_path = self.get_blob_path(content_hash if content_hash is not None else _hash_file(file_path))
+        symbolic = self.link_type == ContentStore.SYMBOLIC_LINK
+        if os.path.exists(blob_path):
+            duplicate = True
+        else:
+            duplicate = False
+            blob_directory = os.path.dirname(blob_path)
+            if not os.path.isdir(blob_directory):
+                try:
+                    os.makedirs(blob_directory)
+                except OSError:
+                    pass # Another run just made it
+            temporary_path = "{0}-{1}".format(blob_path, uuid.uuid4().hex[:8])
+            if symbolic:
+                shutil.copyfile(file_path, temporary_path)
+            else:
+                # The blob is just another name for the file, so nothing gets copied
+                _create_link(file_path, temporary_path)
+            try:
+                os.rename(temporary_path, blob_path)
+            except OSError:
+                # Windows won't rename over an existing file, so another run just added the same contents
+                os.remove(temporary_path)
+                duplicate = True
+            if not symbolic and not duplicate:
+                return False
+
+        # Swap the file for a link to the blob. The link is made next to it first, so the file is never missing.
+        link_path = _get_temporary_path(file_path)
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        _create_link(blob_path, link_path, symbolic)
+        _replace_file(link_path, file_path)
+        return duplicate
+
+    def get_blob_path(self, content_hash):
+        """Return where the blob with the SHA-1 (hex) ``content_hash`` is kept."""
+        # type: (ContentStore, str) -> str
+        return os.path.join(self.store_path, content_hash[:2], content_hash)
+
+class ConfigCompiler:
+    """Checks an XML config file against the schema below, and compiles it into a plain (JSON-friendly) dict for AlibreNeutralizer to configure itself from:
+    ``{"Settings": {tag: value}, "ExportDirectives": [{ExportDirective keyword argument: value}]}``.
+    Only the tags actually in the file (and not empty) make it into the compiled config. The defaults are up to AlibreNeutralizer.
+
+    Everything wrong with the file is collected, and raised together as one ConfigurationError, so it can all be fixed in one go.
+    Compiled configs are cached in ``cache_directory``, keyed by a hash of the file and the schema, so an unchanged config is only checked once."""
+
+    DEFAULT_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "alibre-neutralizer", "config-cache")
+
+    # Top-level settings: tag -> value type (see _parse_value())
+    SETTINGS = OrderedDict([
+        ("BaseExportPath", "text"),
+        ("PostExportWorkerCount", "int"),
+        ("PostExportQueueSize", "int"),
+        ("PurgeWorkerCount", "int"),
+        ("BulkMode", "bool"),
+        ("StagedSwap", "bool"),
+        ("ExportHistoryPath", "text"),
+        ("ExportOrder", "text"),
+        ("StreamingTraversal", "bool"),
+        ("TimeBudgetMinutes", "float"),
+        ("BacklogPath", "text"),
+        ("WorkQueuePath", "text"),
+        ("WorkQueueRole", "text"),
+        ("WorkQueueClaimTimeoutMinutes", "float"),
+        ("WorkerProcessCount", "int"),
+        ("MemorySampleInterval", "int"),
+        ("MemoryThresholdMB", "int"),
+        ("RunReportPath", "text"),
+        ("RunArchivePath", "text"),
+        ("MergeConfigFile", "text"),
+        ("ExportCachePath", "text"),
+        ("ExportCacheSizeMB", "float"),
+        ("ExportCacheLinks", "bool"),
+        ("ContentStorePath", "text"),
+        ("ContentStoreLinks", "text"),
+        ("HashCachePath", "text"),
+        ("HashWorkerCount", "int"),
+    ])
+
+    # Settings that may be given more than once. Their compiled value is a list.
+    REPEATABLE_SETTINGS = ("MergeConfigFile",)
+
+    # Settings that only take certain values
+    CHOICES = {
+        "ExportOrder": ExportScheduler.EXPORT_ORDERS,
+        "WorkQueueRole": FileWorkQueue.ROLES,
+        "ContentStoreLinks": ContentStore.LINK_TYPES,
+    }
+
+    # Export directive tags: tag -> (ExportDirective keyword argument, value type)
+    DIRECTIVE_SETTINGS = OrderedDict([
+        ("type", ("export_type", "export type")),
+        ("RelativeExportPath", ("export_rel_path_expression", "path template")),
+        ("PurgeDirectoryBeforeExporting", ("purge_directory_before_export", "text")),
+        ("EnableRootAssemblyExport", ("export_root_assembly", "bool")),
+        ("EnableSubassemblyExport", ("export_subassemblies", "bool")),
+        ("EnablePartExport", ("export_parts", "bool")),
+        ("Compress", ("compress", "bool")),
+        ("ConvertSTLToBinary", ("convert_stl_to_binary", "bool")),
+        ("DetectGeometryChanges", ("detect_geometry_changes", "bool")),
+        ("GeometryTolerance", ("geometry_tolerance", "float")),
+        ("Configurations", ("configurations", "configuration list")),
+        ("ThumbnailSize", ("thumbnail_size", "int")),
+    ])
+    REQUIRED_DIRECTIVE_SETTINGS = ("type", "RelativeExportPath")
+
+    TRUE_VALUES = ("true", "1", "yes", "y")
+    FALSE_VALUES = ("false", "0", "no", "n")
+
+    def __init__(self, cache_directory=None):
+        # type: (ConfigCompiler, str | None) -> None
+        """:param cache_directory: Where to cache compiled configs. None turns the cache off."""
+        self.cache_directory = cache_directory
+        # Whether the last compile() came straight from the cache
+        self.cache_hit = False
+
+    def compile(self, config_file_path):
+        """Return the compiled form of the config file at ``config_file_path`` (see the class docstring), from the cache if it's there.
+        Raises a ConfigurationError if the file can't be read, or doesn't match the schema."""
+        # type: (ConfigCompiler, str) -> dict
+        try:
+            with open(config_file_path, "rb") as config_file:
+                config_bytes = config_file.read()
+        except (IOError, OSError) as e:
+            raise ConfigurationError("Could not read the config file {0}: {1}".format(config_file_path, e))
+
+        self.cache_hit = False
+        cache_path = None
+        if self.cache_directory is not None:
+            cache_path = os.path.join(self.cache_directory, self._get_cache_key(config_bytes) + ".json")
+            compiled = self._load_cached(cache_path)
+            if compiled is not None:
+                self.cache_hit = True
+                return compiled
+
+        compiled = self._compile(config_bytes, config_file_path)
+        if cache_path is not None:
+            self._save_cached(cache_path, compiled)
+        return compiled
+
+    def _get_cache_key(self, config_bytes):
+        """Hash the config file together with the schema, so changing either one (e.g. a new version of this script) misses the cache."""
+        # type: (ConfigCompiler, bytes) -> str
+        schema = json.dumps([self.SETTINGS, self.CHOICES, self.REPEATABLE_SETTINGS, self.DIRECTIVE_SETTINGS, ExportTypes.NAMES, ExportDirective.PATH_VARIABLES], sort_keys=True)
+        return hashlib.sha1(schema + config_bytes).hexdigest()
+
+    def _compile(self, config_bytes, config_file_path):
+        # type: (ConfigCompiler, bytes, str) -> dict
+        try:
+            root = ET.fromstring(config_bytes)
+        except Exception as e:
+            raise ConfigurationError("The config file {0} isn't valid XML: {1}".format(config_file_path, e))
+
+        errors = []
+        settings = {}
+        export_directives = []
+        if root.tag != "AlibreNeutralizerConfig":
+            errors.append("The root tag should be <AlibreNeutralizerConfig>, not <{0}>.".format(root.tag))
+        if root.find("ExportDirectiveList") is None:
+            errors.append("There's no <ExportDirectiveList>.")
+
+        for elem in root:
+            if elem.tag == "ExportDirectiveList":
+                for i, directive in enumerate(elem):
+                    if directive.tag != "ExportDirective":
+                        errors.append("Unknown tag <{0}> in <ExportDirectiveList> (only <ExportDirective> goes there).".format(directive.tag))
+                        continue
+                    export_directives.append(self._compile_directive(directive, "Export directive {0}".format(i + 1), errors))
+            elif elem.tag not in self.SETTINGS:
+                errors.append("Unknown setting <{0}>.".format(elem.tag))
+            elif elem.tag in settings and elem.tag not in self.REPEATABLE_SETTINGS:
+                errors.append("<{0}> is set more than once.".format(elem.tag))
+            else:
+                value = self._parse_value(self.SETTINGS[elem.tag], elem.text, "<{0}>".format(elem.tag), errors)
+                if value is None:
+                    continue
+                if elem.tag in self.CHOICES and value not in self.CHOICES[elem.tag]:
+                    errors.append("Invalid <{0}> '{1}'. Options are: {2}".format(elem.tag, value, ", ".join(self.CHOICES[elem.tag])))
+                    continue
+                if elem.tag in self.REPEATABLE_SETTINGS:
+                    settings.setdefault(elem.tag, []).append(value)
+                else:
+                    settings[elem.tag] = value
+
+        if errors:
+            raise ConfigurationError("The config file {0} has {1} problem(s):\n{2}".format(config_file_path, len(errors), "\n".join("- " + error for error in errors)))
+        return {"Settings": settings, "ExportDirectives": export_directives}
+
+    def _compile_directive(self, directive, description, errors):
+        """Compile one <ExportDirective> into ExportDirective keyword arguments, adding anything wrong with it to ``errors``."""
+        # type: (ConfigCompiler, ET.Element, str, list[str]) -> dict
+        type_elem = directive.find("type")
+        if type_elem is not None and type_elem.text is not None and type_elem.text.strip() != "":
+            description = "{0} ({1})".format(description, type_elem.text.strip())
+
+        error_count = len(errors)
+        kwargs = {}
+        for elem in directive:
+            if elem.tag not in self.DIRECTIVE_SETTINGS:
+                errors.append("{0}: unknown tag <{1}>.".format(description, elem.tag))
+                continue
+            argument_name, value_type = self.DIRECTIVE_SETTINGS[elem.tag]
+            if argument_name in kwargs:
+                errors.append("{0}: <{1}> is set more than once.".format(description, elem.tag))
+                continue
+            value = self._parse_value(value_type, elem.text, "{0}: <{1}>".format(description, elem.tag), errors)
+            if value is not None:
+                kwargs[argument_name] = value
+        for tag in self.REQUIRED_DIRECTIVE_SETTINGS:
+            if directive.find(tag) is None or directive.find(tag).text is None or directive.find(tag).text.strip() == "":
+                errors.append("{0}: <{1}> is required.".format(description, tag))
+
+        # The combinations ExportDirective checks for itself (like compressing a CSV)
+        if len(errors) == error_count:
+            try:
+                ExportDirective(**kwargs)
+            except Exception as e:
+                errors.append("{0}: {1}".format(description, e))
+        return kwargs
+
+    def _parse_value(self, value_type, text, description, errors):
+        """Parse the text of a tag as ``value_type``: "text", "bool", "int", "float", "export type" (a name from ExportTypes.NAMES),
+        "path template" (a RelativeExportPath, checked by filling it in with placeholder values) or "configuration list"
+        (comma-separated configuration names, or just ExportDirective.ALL_CONFIGURATIONS).
+        Returns None for empty tags, which count as missing, and for invalid values, after adding them to ``errors``."""
+        # type: (ConfigCompiler, str, str | None, str, list[str]) -> object
+        if text is None or text.strip() == "":
+            return None
+        text = text.strip()
+        if value_type == "bool":
+            if text.lower() in self.TRUE_VALUES:
+                return True
+            if text.lower() in self.FALSE_VALUES:
+                return False
+            errors.append("{0} should be true or false, not '{1}'.".format(description, text))
+        elif value_type == "int" or value_type == "float":
+            try:
+                return int(text) if value_type == "int" else float(text)
+            except ValueError:
+                errors.append("{0} should be a number{1}, not '{2}'.".format(description, " (a whole one)" if value_type == "int" else "", text))
+        elif value_type == "export type":
+            if text in ExportTypes.NAMES:
+                return getattr(ExportTypes, text)
+            errors.append("{0}: unknown export type '{1}'. Options are: {2}".format(description, text, ", ".join(ExportTypes.NAMES)))
+        elif value_type == "path template":
+            try:
+                text.format(**dict((name, name) for name in ExportDirective.PATH_VARIABLES))
+                return text
+            except KeyError as e:
+                errors.append("{0}: unknown variable {{{1}}} in '{2}'. Options are: {3}".format(description, e.args[0], text, ", ".join(ExportDirective.PATH_VARIABLES)))
+            except (ValueError, IndexError, AttributeError) as e:
+                errors.append("{0}: '{1}' isn't a valid path template ({2}). Variables go in braces, like {{Number}}; use {{{{ and }}}} for literal braces.".format(description, text, e))
+        elif value_type == "configuration list":
+            if text.lower() == ExportDirective.ALL_CONFIGURATIONS.lower():
+                return ExportDirective.ALL_CONFIGURATIONS
+            names = [name.strip() for name in text.split(",") if name.strip()]
+            if names:
+                return names
+            errors.append("{0} should be a comma-separated list of configuration names, or {1}, not '{2}'.".format(description, ExportDirective.ALL_CONFIGURATIONS, text))
+        else:
+            return text
+        return None
+
+    def _load_cached(self, cache_path):
+        """Return the compiled config cached at ``cache_path``, or None if there isn't one (or it's unreadable)."""
+        # type: (ConfigCompiler, str) -> dict | None
+        try:
+            with open(cache_path, "r") as cache_file:
+                compiled = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(compiled, dict) or "Settings" not in compiled or "ExportDirectives" not in compiled:
+            return None
+        return compiled
+
+    def _save_cached(self, cache_path, compiled):
+        """Cache a compiled config. The cache is only an optimization, so failing to write it isn't an error."""
+        # type: (ConfigCompiler, str, dict) -> None
+        try:
+            if not os.path.isdir(self.cache_directory):
+                os.makedirs(self.cache_directory)
+            temporary_path = _get_temporary_path(cache_path)
+            with open(temporary_path, "w") as cache_file:
+                json.dump(compiled, cache_file, sort_keys=True)
+            _replace_file(temporary_path, cache_path)
+        except (IOError, OSError):
+            pass
+
 class AlibreNeutralizer:
     """Create an instance of this, with an Alibre Assembly passed in, to handle the backend logic of recursively exporting files."""
 
-    def __init__(self, component, config_file_path):
-        # type: (AlibreNeutralizer, Assembly | AssembledSubAssembly, str) -> None
+    def __init__(self, component, config_file_path, work_queue_role=None, worker_pool=None):
+        # type: (AlibreNeutralizer, Assembly | AssembledSubAssembly, str, str | None, object | None) -> None
         """Create and configure an instance of AlibreNeutralizer from an XML configuration file.
         
         :type self: AlibreNeutralizer
@@ -269,7 +1854,14 @@ class AlibreNeutralizer:
         :type component: Assembly | AssembledSubAssembly
 
         :param config_file_path: Path to the XML configuration file that defines the export configuration.
+        Any config files it merges in (MergeConfigFile) add their export directives to the same run, with their own BaseExportPath.
         :type config_file_path: str
+
+        :param work_queue_role: If the config has a WorkQueuePath, "Coordinator" or "Worker" (see ``FileWorkQueue``). Overrides the config's WorkQueueRole.
+        :type work_queue_role: str | None
+
+        :param worker_pool: The add-on's ``WorkerPool`` (WorkerPool.cs), if we're running from the add-on. Starts the worker processes for WorkerProcessCount.
+        :type worker_pool: WorkerPool | None
         """
 
         # Store the root assembly or part, our main connection point to Alibre
@@ -282,169 +1874,863 @@ class AlibreNeutralizer:
         # instead of being silently swallowed (which would make an incomplete export look successful).
         self.export_failures = []
 
-        # Read the configuration file
-        tree = ET.parse(config_file_path)
-        root = tree.getroot()
+        # Absolute paths of every file this run leaves on disk (after compression, if enabled).
+        # Used to build the optional per-run archive.
+        self.output_files = set()
+
+        # Snapshot of every component's Properties and Parameters, read from Alibre once per run and shared by every export that needs them.
+        # Keyed by FileName, or for an export in a named configuration, by (FileName, configuration name), since they can differ between configurations.
+        self.component_properties = {}
+        self.component_parameters = {}
+        self.component_mass_properties = {}
+
+        # Identifies this run in exports that keep history across runs (like the SQLite index)
+        self.run_id = None
+
+        # Timings and statistics for the latest run
+        self.run_report = RunReport()
+
+        # What we remember about each component from earlier runs (loaded at the start of each run)
+        self.export_history = ExportHistory()
+
+        # Identifies this process in the work queue's results
+        self.worker_id = uuid.uuid4().hex[:8]
+
+        # While a run's output is being staged (see StagedOutput), everything that would go in the base path goes here instead
+        self._staging_path = None
+
+        # Memory management: the sampling countdown
+        self._exports_since_memory_sample = 0
+
+        # Components whose display updates we've paused in bulk mode, so they can all be resumed at the end
+        self._suspended_components = []
+        self._suspended_files = set()
+
+        # Where each unique component shows up in the assembly tree, keyed by FileName, in the order they were discovered.
+        # Each value is a dict with "Path" (the component's own path in the tree), "Count" (how many instances of it we found),
+        # and "ParentPaths" (the tree paths of the assemblies it's placed in).
+        # Each unique assembly is only walked once, so "Count" is the number of instances placed in each unique parent assembly, added up
+        # (it isn't multiplied out by how many times that parent is itself repeated).
+        self.component_occurrences = OrderedDict()
+
+        # For JSON_Structure and the total quantities (see _get_total_quantities()): every instance placed in each unique assembly, keyed by the
+        # assembly's FileName. Each value is a list of (instance name, FileName, transform) tuples, in the order they were found.
+        # Only filled in when an export that needs it is configured, and the transforms only for JSON_Structure (they cost Alibre calls).
+        self.assembly_occurrences = OrderedDict()
+        self.records_occurrences = False
+        self.records_structure = False
+        # For the transforms above: where the instance of each unique assembly that got walked sits in the top-level assembly, keyed by FileName.
+        # Alibre Script places everything in the top-level assembly, and transforms are relative to the parent, so they're worked out from these.
+        self.assembly_transforms = {}
+
+        # The output files each component (by FileName) got this run, so the structure can point at them
+        self.component_output_files = {}
+
+        # Geometry fingerprints for PNG_Thumbnail, by FileName (see _get_geometry_fingerprint())
+        self.geometry_fingerprints = {}
+
+        # For aggregate exports (like CSV_BOM): the FileNames of the components each ExportDirective picked up this run.
+        self.aggregate_export_components = {}
+
+        # Read the configuration file. The compiler checks the whole file up front (and raises a ConfigurationError listing everything wrong with it),
+        # so a broken config never gets as far as purging anything. Unchanged configs come straight out of its cache.
+        config_compiler = ConfigCompiler(ConfigCompiler.DEFAULT_CACHE_DIRECTORY)
+        compiled_config = config_compiler.compile(config_file_path)
+        self.config_from_cache = config_compiler.cache_hit
+        settings = compiled_config["Settings"]
         
         # Store the config file path.
         # This is used to interpret the "Base Path" from the config file, since it's specified RELATIVE to the config file's location.
         self.config_file_path = config_file_path
         # Get the base path from config
-        base_path_elem = root.find('BaseExportPath')
-        self.base_path = os.path.normpath(base_path_elem.text) if base_path_elem is not None and base_path_elem.text is not None else os.path.normpath('.')
-        
-        # Parse export directives from config
-        self.export_directives = []
-        for directive in root.find('ExportDirectiveList').findall('ExportDirective'):
-            export_type = getattr(ExportTypes, directive.find('type').text)
-            path_expression = directive.find('RelativeExportPath').text
-            purge_directory = directive.find('PurgeDirectoryBeforeExporting').text if directive.find('PurgeDirectoryBeforeExporting') is not None else None
-
-            # Read boolean flags (default to True if the element is missing)
-            def _bool_from_elem(elem, default=True):
-                if elem is None or elem.text is None:
-                    return default
-                val = elem.text.strip().lower()
-                return val in ("true", "1", "yes", "y")
-
-            enable_root = _bool_from_elem(directive.find('EnableRootAssemblyExport'), True)
-            enable_sub = _bool_from_elem(directive.find('EnableSubassemblyExport'), True)
-            enable_part = _bool_from_elem(directive.find('EnablePartExport'), True)
-
-            self.export_directives.append(
-                ExportDirective(
-                    export_type=export_type,
-                    export_rel_path_expression=path_expression,
-                    purge_directory_before_export=purge_directory,
-                    export_root_assembly=enable_root,
-                    export_subassemblies=enable_sub,
-                    export_parts=enable_part
-                )
-            )
+        self.base_path = os.path.normpath(settings.get("BaseExportPath", "."))
+
+        # Post-export work (CSV writing, etc) runs on a pool of worker threads, so the COM thread never waits on file I/O
+        self.post_export_pipeline = PostExportPipeline(
+            worker_count=settings.get("PostExportWorkerCount", 2),
+            queue_size=settings.get("PostExportQueueSize", 32)
+        )
+
+        # Purges delete their files on a pool of threads too (see PurgeEngine)
+        self.purge_worker_count = settings.get("PurgeWorkerCount", 4)
+
+        # Bulk mode: pause Alibre's display updates/regeneration on the root assembly and everything we export, for the whole run
+        self.bulk_mode = settings.get("BulkMode", False)
+
+        # Staged swap: build the new output next to the live one, and swap it into place at the end, instead of purging up front (see StagedOutput)
+        self.staged_swap = settings.get("StagedSwap", False)
+
+        # What order to export components in, and where to remember how long they took (path is relative to the base path)
+        self.export_history_path = settings.get("ExportHistoryPath")
+        self.export_order = settings.get("ExportOrder", ExportScheduler.TRAVERSAL)
+        if self.export_order == ExportScheduler.LONGEST_FIRST and self.export_history_path is None:
+            raise ConfigurationError("ExportOrder LongestFirst needs an ExportHistoryPath, to learn how long each component takes to export.")
+
+        # Streaming traversal: start exporting as soon as the first components are found, instead of walking the whole tree first
+        self.streaming_traversal = settings.get("StreamingTraversal", False)
+
+        # Time-boxed runs: stop starting new components once TimeBudgetMinutes is used up, and save what's left to BacklogPath (relative to the base path),
+        # so the next run picks it up. 0 means no time limit.
+        self.time_budget_minutes = settings.get("TimeBudgetMinutes", 0.0)
+        if self.time_budget_minutes < 0:
+            raise ConfigurationError("TimeBudgetMinutes must not be negative (0 means no time limit).")
+        self.backlog_path = settings.get("BacklogPath")
+        if self.time_budget_minutes > 0 and (self.backlog_path is None or self.export_history_path is None):
+            raise ConfigurationError("TimeBudgetMinutes needs a BacklogPath (to save what's left for the next run) and an ExportHistoryPath (to tell what's changed).")
+
+        # Sharding across several Alibre instances: the coordinator plans the run into the work queue at WorkQueuePath (relative to the base path),
+        # then every process (coordinator included) claims components from it until it's empty. See FileWorkQueue.
+        self.work_queue_path = settings.get("WorkQueuePath")
+        if work_queue_role is None:
+            work_queue_role = settings.get("WorkQueueRole", FileWorkQueue.COORDINATOR)
+        if work_queue_role not in FileWorkQueue.ROLES:
+            raise ConfigurationError("Invalid WorkQueueRole '{0}'. Options are: {1}".format(work_queue_role, ", ".join(FileWorkQueue.ROLES)))
+        self.work_queue_role = work_queue_role
+        self.work_queue_claim_timeout_minutes = settings.get("WorkQueueClaimTimeoutMinutes", 60.0)
+        if self.work_queue_path is not None and self.time_budget_minutes > 0:
+            raise ConfigurationError("TimeBudgetMinutes can't be combined with a WorkQueuePath.")
+        # A streamed walk exports components as it finds them, so there's no full plan to reorder, time-box or share out
+        if self.streaming_traversal and (self.export_order != ExportScheduler.TRAVERSAL or self.time_budget_minutes > 0 or self.work_queue_path is not None):
+            raise ConfigurationError("StreamingTraversal only works with the Traversal ExportOrder, and can't be combined with TimeBudgetMinutes or a WorkQueuePath.")
+        # How many headless worker processes the add-on should start for the coordinator (each is its own Alibre instance)
+        self.worker_process_count = settings.get("WorkerProcessCount", 0)
+        if self.worker_process_count > 0 and self.work_queue_path is None:
+            raise ConfigurationError("WorkerProcessCount needs a WorkQueuePath for the workers to share.")
+        self.worker_pool = worker_pool
+
+        # Memory-pressure management for long runs: sample the process's memory every N exports,
+        # and if it's above the threshold (in MB), run garbage collection so the wrappers of components we're done with let go of their COM objects.
+        # A threshold of 0 only samples (for the high-water marks in the run report).
+        self.memory_sample_interval = settings.get("MemorySampleInterval", 25)
+        self.memory_threshold_mb = settings.get("MemoryThresholdMB", 0)
+
+        # Optionally save the run report as JSON (path is relative to the base path)
+        self.run_report_path = settings.get("RunReportPath")
+
+        # Optionally bundle every file from this run into a single zip archive (path is relative to the base path)
+        self.run_archive_path = settings.get("RunArchivePath")
+
+        # Optionally reuse parts exported by earlier runs (of any product), as long as their source files haven't changed (see ExportCache).
+        # The path is relative to the base path, but it's usually an absolute one, shared by every product.
+        export_cache_path = settings.get("ExportCachePath")
+        self.export_cache = ExportCache(
+            self._get_absolute_export_path(export_cache_path),
+            settings.get("ExportCacheSizeMB", 4096.0),
+            settings.get("ExportCacheLinks", False)
+        ) if export_cache_path is not None else None
+        # Optionally keep every output file once, in a content-addressed store, and link to it from the export paths (see ContentStore).
+        # The path is relative to the base path.
+        content_store_path = settings.get("ContentStorePath")
+        self.content_store = ContentStore(
+            self._get_absolute_export_path(content_store_path),
+            settings.get("ContentStoreLinks", ContentStore.HARD_LINK)
+        ) if content_store_path is not None else None
+
+        # File hashes for the export cache and the content store. With a HashCachePath (relative to the base path), they're remembered
+        # between runs, so files that haven't changed (like most source files) are never read again.
+        hash_cache_path = settings.get("HashCachePath")
+        self.hash_service = HashService(
+            self._get_absolute_export_path(hash_cache_path) if hash_cache_path is not None else None,
+            settings.get("HashWorkerCount", 4)
+        )
+        self._exporter_version = None
+
+        # Export directives, already checked and resolved (export types and all) by the compiler
+        self.export_directives = [ExportDirective(**directive_arguments) for directive_arguments in compiled_config["ExportDirectives"]]
+
+        # Merged config files: their export directives join this run, so every team's exports share one walk of the assembly tree
+        # (and one read of each component's properties). Each keeps its own BaseExportPath, which its export and purge paths are relative to.
+        # Everything else is run-wide, and comes from this (the first) config file.
+        self.config_file_paths = [config_file_path]
+        base_path_abs = self._convert_base_path_to_absolute()
+        for merge_path in settings.get("MergeConfigFile", []):
+            merge_path = os.path.normpath(os.path.join(os.path.dirname(os.path.normpath(config_file_path)), merge_path))
+            if os.path.normcase(os.path.abspath(merge_path)) in [os.path.normcase(os.path.abspath(path)) for path in self.config_file_paths]:
+                raise ConfigurationError("The config file {0} is merged more than once.".format(merge_path))
+            merged_config = config_compiler.compile(merge_path)
+            self.config_from_cache = self.config_from_cache and config_compiler.cache_hit
+            self.config_file_paths.append(merge_path)
+
+            merged_settings = merged_config["Settings"]
+            ignored_settings = [tag for tag in merged_settings if tag != "BaseExportPath" and merged_settings[tag] != settings.get(tag)]
+            if ignored_settings:
+                print "NOTE: Ignoring {0} in {1}. Run-wide settings come from the first config file ({2}).".format(", ".join("<" + tag + ">" for tag in sorted(ignored_settings)), merge_path, config_file_path)
+
+            merged_base_path_abs = _get_absolute_base_path(os.path.normpath(merged_settings.get("BaseExportPath", ".")), merge_path)
+            for directive_arguments in merged_config["ExportDirectives"]:
+                export_directive = ExportDirective(**directive_arguments)
+                if os.path.normcase(merged_base_path_abs) != os.path.normcase(base_path_abs):
+                    export_directive.base_path = merged_base_path_abs
+                self.export_directives.append(export_directive)
+
+        if len(self.config_file_paths) > 1 and self.work_queue_path is not None:
+            raise ConfigurationError("MergeConfigFile can't be combined with a WorkQueuePath (the workers only get the first config file).")
+        if self.staged_swap and any(edir.base_path is not None for edir in self.export_directives):
+            raise ConfigurationError("StagedSwap only swaps the one BaseExportPath, so every merged config file needs the same BaseExportPath.")
 
     
     def export_all(self):
         """Carry out the ExportDirectives in ``self.export_directives`` on the Part or Assembly in ``self.root_component.``"""
 
-        processed_files = set() # This will be a set of file absolute paths that we've processed (run export directives against).
+        work_queue = FileWorkQueue(self._get_absolute_export_path(self.work_queue_path)) if self.work_queue_path is not None else None
+        if work_queue is not None and self.work_queue_role == FileWorkQueue.WORKER:
+            self._export_all_as_queue_worker(work_queue)
+            return
+
+        run_started = time.time()
+        self._start_run(time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8])
+        self.run_report.settings["ExportOrder"] = self.export_order
+        self.run_report.settings["TimeBudgetMinutes"] = self.time_budget_minutes
+        self.export_history = ExportHistory(
+            self._get_absolute_export_path(self.export_history_path) if self.export_history_path is not None else None
+        )
+
+        time_boxed = self.time_budget_minutes > 0
+
+        # Step 1: Start purging old files, if applicable. The purge runs in the background while the exports are planned (Step 2).
+        # Directives with change detection (and thumbnails) need the old files to compare against, so they purge at the end instead (Step 6)
+        # Time-boxed runs may not get to every component, so they never purge: the files from earlier runs are all we have for those.
+        # With a staged swap, the live output isn't purged at all: the staging directory just starts without the files the purge would delete.
+        purge_engine = PurgeEngine(self.purge_worker_count)
+        purges = []
+        if time_boxed:
+            print "Time-boxed run ({0} minutes): skipping purges, so components left for the next run keep their old files.".format(self.time_budget_minutes)
+        else:
+            purges = self._get_purges([edir for edir in self.export_directives if not edir.checks_previous_output()])
+        staged_output = None
+        self._staging_path = None
+        if self.staged_swap:
+            staged_output = self._start_staged_output(purges)
+        else:
+            purge_engine.start(purges)
+
+        # Step 2: Walk the assembly tree, and work out which components need exporting, in what order
+        scheduler = ExportScheduler(self.export_order, self.export_history)
+        with self.run_report.phase("Planning"):
+            if self.streaming_traversal:
+                # Streaming: the walk carries on as the components are exported (in traversal order, so parts still come before their subassembly).
+                # Nothing can be exported until the purge (or staging) is done, though, so walk ahead until then.
+                planned_exports = self._iter_planned_exports()
+                schedule = []
+                while purge_engine.is_running() or (staged_output is not None and staged_output.is_seeding()):
+                    planned = next(planned_exports, None)
+                    if planned is None:
+                        break
+                    schedule.append(planned)
+                exports = itertools.chain(_iter_and_forget(schedule), planned_exports)
+            else:
+                plan = self._plan_exports()
+                schedule = scheduler.schedule(plan)
+                del plan
+                if time_boxed:
+                    schedule = scheduler.prioritize(schedule, self._load_backlog())
+                self.run_report.counters["Components Planned"] = len(schedule)
+                exports = _iter_and_forget(schedule)
+        backlog = [] # FileNames of the components we ran out of time for
+
+        # The purge has to be over before anything is exported, or it could delete fresh files
+        with self.run_report.phase("Waiting For Purge"):
+            self._finish_purge(purge_engine)
+        if staged_output is not None:
+            with self.run_report.phase("Waiting For Staging"):
+                staged_output.wait_for_seeding()
+            self.run_report.counters["Files Linked Into Staging"] = staged_output.linked_count
+            self.run_report.counters["Files Copied Into Staging"] = staged_output.copied_count
+            # From here until the swap, every path under the base path resolves to the staging directory
+            self._staging_path = staged_output.staging_path
+
+        # Everything from here on may hand work off to the post-export workers.
+        # Always drain them, even if an export blows up, so no half-written files are left behind.
+        # Likewise, in bulk mode, always resume Alibre's updates, or the user is left with a frozen Alibre.
+        self.post_export_pipeline.start()
+        self._suspend_updating(self.root_component)
+        try:
+            with self.run_report.phase("Export"):
+                # Step 3: Export each component, running all of the export directives on it back-to-back
+                deadline = run_started + self.time_budget_minutes * 60 if time_boxed else None
+                aggregate_directives = [edir for edir in self.export_directives if ExportTypes.is_aggregate(edir.export_type)]
+                if work_queue is not None:
+                    # Sharded: every process sharing the queue (this one included) exports whatever components it claims
+                    self._export_through_work_queue(work_queue, schedule, aggregate_directives)
+                    del schedule[:]
+                for i, (component, component_kind) in enumerate(exports):
+                    if self.streaming_traversal:
+                        # The walk isn't done until the last component comes out, so count as we go
+                        self.run_report.counters["Components Planned"] = i + 1
+                    # (the first component always goes ahead, however long it's expected to take, so every run makes some progress)
+                    if deadline is not None and i > 0 and (backlog or time.time() + scheduler.get_expected_seconds((component, component_kind)) > deadline):
+                        # Out of time: leave this one for the next run. The aggregate exports (like the BOM) still need every component, though, and they're cheap.
+                        backlog.append(component.FileName)
+                        self._export_planned_component(component, component_kind, aggregate_directives)
+                        continue
+                    self._export_planned_component(component, component_kind)
+
+                # Step 4: Now that every component has been seen, write the run-wide (aggregate) exports like the BOM
+                self._export_aggregates()
+        finally:
+            self._resume_updating()
+
+            # Step 5: Wait for the post-export workers to catch up
+            with self.run_report.phase("Waiting For Post-Export Workers"):
+                self._record_post_export_failures(self.post_export_pipeline.drain())
+
+        # Step 6: Deferred purge, for directives that compare against the old files.
+        # Only files that weren't (re)written this run get deleted.
+        if not time_boxed:
+            with self.run_report.phase("Deferred Purge"):
+                purge_engine = PurgeEngine(self.purge_worker_count)
+                purge_engine.start(self._get_purges([edir for edir in self.export_directives if edir.checks_previous_output()], keep_files=self.output_files))
+                self._finish_purge(purge_engine)
+
+        # Step 7: Move the output into the content store, if configured. Every file is final by now.
+        if self.content_store is not None:
+            with self.run_report.phase("Content Store"):
+                self._add_to_content_store()
+
+        # Step 8: Bundle the run into an archive, if configured.
+        # This has to wait for the workers, since they're the ones writing (and compressing) the files.
+        if self.run_archive_path is not None:
+            with self.run_report.phase("Archive"):
+                self._archive_run()
+
+        # Step 9: Swap the staged output into place, if we're staging. Everything after this goes to the (new) live output.
+        if staged_output is not None:
+            self._staging_path = None
+            with self.run_report.phase("Swap"):
+                try:
+                    staged_output.swap()
+                except Exception as e:
+                    failure_message = "ERROR: Could not swap the new output into place, so the old output is still live. The new output is in {0}: {1}".format(staged_output.staging_path, e)
+                    print failure_message
+                    self.export_failures.append(failure_message)
+
+        # Step 10: Remember how long everything took (and what's left for next time), keep the export cache in size, and report timings and memory use
+        self.export_history.save()
+        if self.export_cache is not None:
+            with self.run_report.phase("Export Cache Trim"):
+                self.run_report.counters["Export Cache Evictions"] = self.export_cache.trim()
+        self.hash_service.save()
+        if self.hash_service.hashed_count or self.hash_service.cached_count:
+            self.run_report.counters["Files Hashed"] = self.hash_service.hashed_count
+            self.run_report.counters["Hashes From Cache"] = self.hash_service.cached_count
+        if time_boxed:
+            self._save_backlog(backlog)
+            self.run_report.counters["Components Left In Backlog"] = len(backlog)
+            if backlog:
+                print "Ran out of time: {0} of {1} components are left in the backlog for the next run.".format(len(backlog), len(schedule))
+        self._sample_memory()
+        self._finish_run_report()
+
+    def _start_staged_output(self, purges):
+        """Set up a ``StagedOutput`` for this run, and start seeding it (without the files ``purges`` would delete) in the background."""
+        # type: (AlibreNeutralizer, list[tuple[str, tuple[str], set[str] | None]]) -> StagedOutput
+        staged_output = StagedOutput(self._convert_base_path_to_absolute(), self.run_id)
+        config_file_path = os.path.normcase(os.path.abspath(self.config_file_path))
+        if config_file_path.startswith(os.path.normcase(staged_output.live_path) + os.sep):
+            raise Exception("StagedSwap needs BaseExportPath to be a directory of its own, but it contains the config file ({0}).".format(self.config_file_path))
+        # The old output gets deleted after the swap, so anything that has to outlive the run can't be in it
+        for setting_name, persistent_path in (("ExportCachePath", self.export_cache.cache_path if self.export_cache is not None else None),
+                                              ("ContentStorePath", self.content_store.store_path if self.content_store is not None else None)):
+            if persistent_path is not None and os.path.normcase(os.path.abspath(persistent_path)).startswith(os.path.normcase(staged_output.live_path) + os.sep):
+                raise Exception("StagedSwap replaces everything in BaseExportPath, so {0} ({1}) has to be somewhere else.".format(setting_name, persistent_path))
+        staged_output.remove_leftovers()
+        # The work queue is shared with the workers at its live path, and only matters for this run, so it stays out of the staged output
+        excluded_paths = [self._get_absolute_export_path(self.work_queue_path)] if self.work_queue_path is not None else []
+        # The SQLite index is updated in place, so it needs a copy of its own rather than a link to the live one
+        copied_paths = [self._get_absolute_export_path(edir.get_export_path(self.root_component), edir)
+                        for edir in self.export_directives if edir.export_type == ExportTypes.SQLite_Index]
+        staged_output.start_seeding(purges, excluded_paths, copied_paths)
+        return staged_output
+
+    def _start_run(self, run_id):
+        """Reset everything that's kept per run, ready for a new run with the ID ``run_id``."""
+        # type: (AlibreNeutralizer, str) -> None
+        self.run_id = run_id
+        self.run_report = RunReport()
+        self.run_report.settings["BulkMode"] = self.bulk_mode
+        self.run_report.settings["PostExportWorkerCount"] = self.post_export_pipeline.worker_count
+        self.run_report.settings["MemoryThresholdMB"] = self.memory_threshold_mb
+        self.run_report.settings["ConfigFiles"] = len(self.config_file_paths)
+        self.run_report.settings["ConfigFromCache"] = self.config_from_cache
+        self._sample_memory()
+        self.component_occurrences = OrderedDict()
+        self.assembly_occurrences = OrderedDict()
+        self.assembly_transforms = {}
+        self.component_output_files = {}
+        self.geometry_fingerprints = {}
+        # Every aggregate export reports how many instances of each component there are in the whole product
+        self.records_occurrences = any(ExportTypes.is_aggregate(edir.export_type) for edir in self.export_directives)
+        self.records_structure = any(edir.export_type == ExportTypes.JSON_Structure for edir in self.export_directives)
+        self.aggregate_export_components = dict((edir, []) for edir in self.export_directives if ExportTypes.is_aggregate(edir.export_type))
+
+    def _export_through_work_queue(self, work_queue, schedule, aggregate_directives):
+        """As the coordinator: put the scheduled components in the work queue, help export them, wait for the workers to finish the rest,
+        then collect everyone's results (output files, failures, timings) as if this process had done all the exports itself."""
+        # type: (AlibreNeutralizer, FileWorkQueue, list[tuple], list[ExportDirective]) -> None
+        components_by_file = dict((component.FileName, component) for component, component_kind in schedule)
+        work_queue.reset(self.run_id, [{"FileName": component.FileName, "Kind": component_kind} for component, component_kind in schedule], self._staging_path)
+        print "Queued {0} components at {1}. Workers can start claiming them now.".format(len(schedule), work_queue.queue_path)
+
+        # The aggregate exports (like the BOM) need every component, and they're cheap, so the coordinator does those itself
+        for component, component_kind in schedule:
+            self._export_planned_component(component, component_kind, aggregate_directives)
+
+        worker_pool_started = False
+        if self.worker_process_count > 0:
+            if self.worker_pool is None:
+                print "WARNING: WorkerProcessCount is set, but worker processes can only be started from the add-on. Start any workers by hand."
+            else:
+                # The workers open the assembly from disk, so they need its absolute path, and the config's
+                self.worker_pool.Start(self.worker_process_count, os.path.abspath(self.config_file_path), self.root_component.FileName,
+                                       os.path.join(work_queue.queue_path, "logs"))
+                worker_pool_started = True
+                print "Started {0} worker processes.".format(self.worker_process_count)
+
+        try:
+            export_directives = [edir for edir in self.export_directives if not ExportTypes.is_aggregate(edir.export_type)]
+            exported_here = self._work_through_queue(work_queue, components_by_file, export_directives)
+
+            # Wait for the other processes. If one of them died holding a claim, take it back and do it ourselves.
+            # Only stop once every item has a result, too: an empty todo/ and claimed/ on their own could be a glimpse between two moves.
+            with self.run_report.phase("Waiting For Work Queue"):
+                while True:
+                    counts = work_queue.get_counts()
+                    finished = counts[FileWorkQueue.DONE] + counts[FileWorkQueue.FAILED]
+                    if counts[FileWorkQueue.TODO] == 0 and counts[FileWorkQueue.CLAIMED] == 0 and finished >= len(schedule):
+                        break
+                    released = work_queue.release_stale_claims(self.work_queue_claim_timeout_minutes * 60)
+                    if released > 0:
+                        print "WARNING: {0} work queue claims were abandoned; putting them back in the queue.".format(released)
+                    exported_here += self._work_through_queue(work_queue, components_by_file, export_directives)
+                    time.sleep(1)
+        finally:
+            if worker_pool_started:
+                # The queue is empty, so the workers are on their way out; give them a minute before they're killed
+                for failure_message in self.worker_pool.Stop(60):
+                    print failure_message
+                    # A restarted worker is only a warning: whatever it had claimed went back in the queue, and got exported by someone else
+                    if not failure_message.startswith("WARNING"):
+                        self.export_failures.append(failure_message)
+                self.run_report.counters["Worker Process Restarts"] = self.worker_pool.Restarts
+
+        workers = set()
+        for result in work_queue.iter_results():
+            workers.add(result["Worker"])
+            self.output_files.update(result["OutputFiles"])
+            self.component_output_files.setdefault(result["FileName"], set()).update(result["OutputFiles"])
+            # Our own export failures were already printed as they happened
+            already_printed = result.get("FailuresPrinted", 0) if result["Worker"] == self.worker_id else 0
+            for failure_message in result["Failures"][already_printed:]:
+                print failure_message
+            self.export_failures.extend(result["Failures"])
+            self.export_history.record_export(result["FileName"], result["Kind"], result["Seconds"])
+        self.run_report.counters["Work Queue Items"] = len(schedule)
+        self.run_report.counters["Work Queue Items Exported Here"] = exported_here
+        self.run_report.counters["Work Queue Processes"] = len(workers)
+
+    def _export_all_as_queue_worker(self, work_queue):
+        """As a worker: claim components from the coordinator's work queue and export them until it's empty.
+        Purging, the aggregate exports and archiving are left to the coordinator."""
+        # type: (AlibreNeutralizer, FileWorkQueue) -> None
+        manifest = work_queue.get_manifest()
+        if manifest is None:
+            print "There's no work queue at {0} yet, so there's nothing to do. Start the coordinator first.".format(work_queue.queue_path)
+            return
+        self._start_run(manifest["RunId"])
+        # If the coordinator is staging its output, so do we
+        self._staging_path = manifest.get("OutputPath")
+        self.run_report.settings["WorkQueueRole"] = self.work_queue_role
+        self.export_history = ExportHistory() # The coordinator keeps the history
+
+        with self.run_report.phase("Planning"):
+            # Every process walks the same assembly, so claimed FileNames can be matched back to components
+            components_by_file = dict((component.FileName, component) for component, component_kind in self._plan_exports())
+
+        self.post_export_pipeline.start()
+        self._suspend_updating(self.root_component)
+        try:
+            with self.run_report.phase("Export"):
+                export_directives = [edir for edir in self.export_directives if not ExportTypes.is_aggregate(edir.export_type)]
+                self.run_report.counters["Work Queue Items Exported Here"] = self._work_through_queue(work_queue, components_by_file, export_directives)
+        finally:
+            self._resume_updating()
+            self._record_post_export_failures(self.post_export_pipeline.drain())
+            self._staging_path = None
+
+        self._sample_memory()
+        # Every process shares the config, so saving to RunReportPath would overwrite the coordinator's report (and the other workers')
+        self._finish_run_report(work_queue.get_report_path(self.worker_id, self.run_report_path) if self.run_report_path is not None else None)
+
+    def _work_through_queue(self, work_queue, components_by_file, export_directives):
+        """Claim components from ``work_queue`` and run ``export_directives`` on them, until there's nothing left to claim.
+        Each item's output files, failures and timing are reported back through the queue. Returns the number of items done."""
+        # type: (AlibreNeutralizer, FileWorkQueue, dict, list[ExportDirective]) -> int
+        run_output_files = self.output_files
+        exported = 0
+        try:
+            while True:
+                item = work_queue.claim(_get_process_id())
+                if item is None:
+                    return exported
+                component = components_by_file.get(item["FileName"])
+                self.output_files = set()
+                failures_before = len(self.export_failures)
+                started = time.time()
+                self.post_export_pipeline.begin_group()
+                if component is None:
+                    failure_message = "ERROR: Work queue item {0} isn't part of {1}. Was the queue made for a different assembly?".format(item["FileName"], self.root_component.Name)
+                    print failure_message
+                    self.export_failures.append(failure_message)
+                else:
+                    try:
+                        self._export_planned_component(component, item["Kind"], export_directives)
+                    except Exception as e:
+                        failure_message = "ERROR: Exporting {0} failed: {1}".format(component.Name, e)
+                        print failure_message
+                        self.export_failures.append(failure_message)
+
+                # The failures travel with the item; whoever coordinates collects them from the queue
+                failures = self.export_failures[failures_before:]
+                del self.export_failures[failures_before:]
+                result = {
+                    "Worker": self.worker_id,
+                    "Seconds": time.time() - started,
+                    "OutputFiles": sorted(self.output_files),
+                    "Failures": failures,
+                    # The ones after these come from post-processing, and haven't been printed here
+                    "FailuresPrinted": len(failures),
+                }
+                # Don't report the item as done until its post-processing has finished writing its files.
+                # That happens on the post-export workers, so this process moves straight on to its next item.
+                self.post_export_pipeline.end_group(
+                    lambda group, item=item, result=result: self._complete_queue_item(work_queue, item, result, group)
+                )
+                exported += 1
+        finally:
+            self.output_files = run_output_files
+
+    def _complete_queue_item(self, work_queue, item, result, post_export_tasks):
+        """Report a work queue item as finished, along with the failures from its post-processing (a ``PostExportTaskGroup``).
+        If the item can't be reported (say the queue's volume is full), it goes back in the queue for someone to redo, rather than staying
+        claimed by a process that's still alive, which nobody would ever take back. This usually runs on a post-export worker, so it mustn't touch Alibre."""
+        # type: (AlibreNeutralizer, FileWorkQueue, dict, dict, PostExportTaskGroup) -> None
+        completed = False
+        try:
+            result["Failures"] = result["Failures"] + post_export_tasks.failures
+            work_queue.complete(item, result)
+            completed = True
+        finally:
+            if not completed:
+                work_queue.release(item)
+
+    def _suspend_updating(self, component):
+        """In bulk mode, pause Alibre's display updates and regeneration on a component (once per component per run), so Alibre isn't busy
+        redrawing while we export. Everything paused here is resumed by ``_resume_updating()``."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly) -> None
+        if not self.bulk_mode or component.FileName in self._suspended_files:
+            return
+        self._suspended_files.add(component.FileName)
+
+        # Only Parts and Assemblies have PauseUpdating; placed instances (AssembledPart) don't
+        pause_updating = getattr(component, "PauseUpdating", None)
+        if pause_updating is None:
+            return
+        try:
+            pause_updating()
+            self._suspended_components.append(component)
+        except Exception as e:
+            print "WARNING: Could not pause updates on {0}: {1}".format(component.Name, e)
+
+    def _resume_updating(self):
+        """Resume updates on everything ``_suspend_updating()`` paused, most recent first. Always call this once the exports are over, even if they failed."""
+        # type: (AlibreNeutralizer) -> None
+        self.run_report.counters["Components Paused In Bulk Mode"] = len(self._suspended_components)
+        while self._suspended_components:
+            component = self._suspended_components.pop()
+            try:
+                component.ResumeUpdating()
+            except Exception as e:
+                print "WARNING: Could not resume updates on {0}: {1}".format(component.Name, e)
+        self._suspended_files = set()
+
+    def _sample_memory(self):
+        """Measure this process's memory, keep track of the high-water mark, and relieve the pressure if we're over ``self.memory_threshold_mb``."""
+        # type: (AlibreNeutralizer) -> None
+        self._exports_since_memory_sample = 0
+        memory_mb = _get_process_memory_mb()
+        if memory_mb is None:
+            # Can't measure it here (not running inside Alibre); nothing more we can do
+            return
+
+        counters = self.run_report.counters
+        counters["Memory Samples"] = counters.get("Memory Samples", 0) + 1
+        counters["Peak Working Set (MB)"] = max(counters.get("Peak Working Set (MB)", 0), int(memory_mb))
+
+        if self.memory_threshold_mb > 0 and memory_mb > self.memory_threshold_mb:
+            self._relieve_memory_pressure()
+            memory_after_mb = _get_process_memory_mb()
+            memory_message = "- Memory: {0:.0f} MB is over the {1} MB threshold; collected garbage, now {2:.0f} MB".format(
+                memory_mb, self.memory_threshold_mb, memory_after_mb)
+            print memory_message
+            counters["Memory Pressure Collections"] = counters.get("Memory Pressure Collections", 0) + 1
+            counters["Peak Working Set After Collection (MB)"] = max(counters.get("Peak Working Set After Collection (MB)", 0), int(memory_after_mb))
+
+    def _relieve_memory_pressure(self):
+        """Run IronPython and .NET garbage collection.
+        The components we get are AlibreScript.API wrappers rather than raw COM objects, and they don't hand out the COM objects behind them,
+        so there's nothing we can release directly. Finalizing the wrappers we no longer reference is what lets go of those COM objects."""
+        # type: (AlibreNeutralizer) -> None
+        gc.collect()
+        if GC is not None:
+            # Finalizers are what actually let go of the COM objects behind Alibre's .NET wrappers, so collect again once they've run
+            GC.Collect()
+            GC.WaitForPendingFinalizers()
+            GC.Collect()
+
+    def _finish_run_report(self, report_path=None):
+        """Print the run report, and save it to ``report_path`` (an absolute path), or if that's None, to ``RunReportPath`` if it's configured."""
+        # type: (AlibreNeutralizer, str | None) -> None
+        self.run_report.counters["Export Failures"] = len(self.export_failures)
+        for line in self.run_report.get_summary_lines():
+            print line
+        if report_path is None and self.run_report_path is not None:
+            report_path = self._get_absolute_export_path(self.run_report_path)
+        if report_path is not None:
+            try:
+                self.run_report.save(report_path)
+            except Exception as e:
+                print "WARNING: Could not save the run report: {0}".format(e)
+
+    def _plan_exports(self):
+        """Walk the whole assembly tree, and return the list of ``(component, component_kind)`` pairs to run the export directives on (see ``_iter_planned_exports()``)."""
+        # type: (AlibreNeutralizer) -> list[tuple]
+        return list(self._iter_planned_exports())
+
+    def _iter_planned_exports(self):
+        """Walk the assembly tree, yielding the ``(component, component_kind)`` pairs to run the export directives on as they're found,
+        in traversal order: the root assembly, then its parts, then each subassembly (recursively, see ``_iter_planned_subassemblies_recursive()``).
+        Every component is only yielded once, no matter how many times it's placed. Every placement gets recorded for the BOM, though,
+        so the BOM is only complete once the generator is used up.
+
+        Since this is a generator, exports can start on the first components while the rest of the tree is still being walked (see StreamingTraversal)."""
+        # type: (AlibreNeutralizer) -> Iterator[tuple]
+
+        self._record_occurrence(self.root_component, None)
+        yield (self.root_component, "Root Assembly")
+
+        planned_files = set() # This will be a set of file absolute paths that we've planned to process (run export directives against).
         # This ensures we only export each component once.
-        # Even if the export directive says not to export anything for a given file, we still add that file to the "processed" list.
+        # Even if the export directive says not to export anything for a given file, we still add that file to the "planned" list.
         # Note that we use absolute paths (e.g. C:\wherever\myThing.AD_PRT) over Alibre's .Name property, because .Name includes the instance ID (the "<37>" type thing) at the end, while the filename does not.
         # May need to change this in the future if we want to export directly from PDM instead of from a package, since FileName is None in PDM.
+        # It's one set, shared (and added to) all the way down the walk.
 
-        # Step 1: Purge old files, if applicable
-        for edir in self.export_directives:
-            self._purge_according_to_export_directive(edir)
-        
-        # Step 2 : Export the Root Assembly
-        # if none of the export directives call for this, this function won't do anything
-        self._export_root_assembly()
-
-        # Step 3: Export parts in root assembly, and add those parts to the exported_files list
-        processed_files = processed_files.union(
-            self._export_parts(self.root_component, self.export_directives, processed_files)
-        )
+        # Parts in root assembly
+        for planned in self._iter_planned_parts(self.root_component, planned_files):
+            yield planned
 
-        # Step 4: Export subassemblies in root assembly (recursive)
-        # for subassy in subassemblies
-        #   for edir in export_directives
-        #     newly_exported_names = _export_subassembly_recursive(component, edir)
-        #     exported_files.append(newly_exported_names)
+        # Subassemblies in root assembly (recursive)
         for subassy in self.root_component.SubAssemblies:
-            if subassy.FileName not in processed_files:
-                processed_files = processed_files.union(
-                    self._export_subassemblies_recursive(subassy, self.export_directives, processed_files)
-                )
+            self._record_occurrence(subassy, self.root_component)
+            if subassy.FileName not in planned_files:
+                for planned in self._iter_planned_subassemblies_recursive(subassy, planned_files):
+                    yield planned
 
-    def _export_parts(self, assembly, export_directives, already_processed_files):
-        """Given an Assembly (or AssembledSubAssembly), an ExportDirective, and a list of already-exported files to ignore,
-        export the parts in the assembly according to the ExportDirective, and return an updated list of exported files."""
-        # type (AlibreNeutralizer, Assembly | AssembledSubAssembly, list[ExportDirective], set[str]) -> set[str]
+    def _iter_planned_parts(self, assembly, planned_files):
+        """Given an Assembly (or AssembledSubAssembly) and the set of already-planned files to ignore,
+        yield the parts in the assembly that still need planning, adding them to ``planned_files`` as we go."""
+        # type (AlibreNeutralizer, Assembly | AssembledSubAssembly, set[str]) -> Iterator[tuple]
 
         for part in assembly.Parts:
-            # First, make sure we haven't processed this one already
-            if part.FileName not in already_processed_files:
-                # Run through all the export directives on this part
-                for edir in export_directives:
-                    self._execute_single_export_directive(part, edir)
-                # Once all Export Directives have been executed, add it to the list of exports
-                already_processed_files = already_processed_files.union({part.FileName})
-
-        return already_processed_files
-
-    def _export_root_assembly(self):
-        """If any of the Export Directives call for it, export the Root Assembly (``self.root_component``)."""
-        # type (AlibreNeutralizer)
-
-        for export_directive in self.export_directives:
-            if (export_directive.export_root_assembly == True):
-                # We need to export this root Assembly
-                print "- Exporting Root Assembly to {0}: {1}".format(ExportTypes.convert_to_string(export_directive.export_type), self.root_component.Name)
-                abs_export_path = self._get_absolute_export_path(
-                    export_directive.get_export_path(self.root_component)
-                )
-                print "- Path : {0}".format(abs_export_path)
-                self._export(
-                    self.root_component,
-                    export_directive.export_type,
-                    abs_export_path
-                )
-
-    def _export_subassemblies_recursive(self, subassembly, export_directives, already_processed_files):
-        # type (AlibreNeutralizer, AssembledSubAssembly, list[ExportDirective], set[str]) -> set[str]
-
-        # Step 1 : Export parts
-        # If the export directives have "Export Parts" set to False, this code won't do anything
-        # Also, if any of these parts have already been exported, they'll be skipped automatically in this function
-        already_processed_files = already_processed_files.union(
-            self._export_parts(subassembly, export_directives, already_processed_files)
+            # Every instance counts towards the BOM, even ones we've already planned
+            self._record_occurrence(part, assembly)
+            # First, make sure we haven't planned this one already
+            if part.FileName not in planned_files:
+                planned_files.add(part.FileName)
+                yield (part, "Part")
+
+    def _export_planned_component(self, component, component_kind, export_directives=None):
+        """Run every export directive (or just ``export_directives``, if given) on one planned component, back-to-back.
+        This function does NOT perform any deduplication checking."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly, str, list[ExportDirective] | None) -> None
+        started = time.time()
+        if component_kind == "Root Assembly":
+            # if none of the export directives call for this, this function won't do anything
+            self._export_root_assembly(export_directives)
+        else:
+            is_part = isinstance(component, AssembledPart) or isinstance(component, Part)
+            # Only the directives that apply to this kind of component get a say in which configurations get activated
+            applicable_directives = [
+                edir for edir in (export_directives if export_directives is not None else self.export_directives)
+                if (edir.export_parts if is_part else edir.export_subassemblies) == True
+            ]
+            self._export_in_configurations(
+                component, applicable_directives,
+                lambda edir, configuration: self._execute_single_export_directive(component, edir, configuration)
+            )
+        if export_directives is None:
+            self.export_history.record_export(component.FileName, component_kind, time.time() - started)
+
+    def _load_backlog(self):
+        """Return the set of FileNames the last time-boxed run didn't get to (empty if there's no backlog file yet)."""
+        # type: (AlibreNeutralizer) -> set[str]
+        backlog_path_abs = self._get_absolute_export_path(self.backlog_path)
+        if not os.path.exists(backlog_path_abs):
+            return set()
+        with open(backlog_path_abs, 'r') as backlog_file:
+            return set(json.load(backlog_file).get("Components", []))
+
+    def _save_backlog(self, backlog):
+        """Save the FileNames this run didn't get to, so the next run can pick them up. The old backlog is only replaced once the new one is completely written."""
+        # type: (AlibreNeutralizer, list[str]) -> None
+        backlog_path_abs = self._get_absolute_export_path(self.backlog_path)
+        backlog_directory = os.path.dirname(backlog_path_abs)
+        if not os.path.exists(backlog_directory):
+            os.makedirs(backlog_directory)
+        temporary_path = _get_temporary_path(backlog_path_abs)
+        with open(temporary_path, 'w') as backlog_file:
+            json.dump({"Version": 1, "RunId": self.run_id, "Components": backlog}, backlog_file, indent=1)
+        _replace_file(temporary_path, backlog_path_abs)
+
+    def _export_root_assembly(self, export_directives=None):
+        """If any of the Export Directives (or just ``export_directives``, if given) call for it, export the Root Assembly (``self.root_component``)."""
+        # type (AlibreNeutralizer, list[ExportDirective] | None)
+
+        root_directives = [
+            edir for edir in (export_directives if export_directives is not None else self.export_directives)
+            if edir.export_root_assembly == True
+        ]
+        self._export_in_configurations(
+            self.root_component, root_directives,
+            lambda edir, configuration: self._export_component(self.root_component, edir, "Root Assembly", configuration)
         )
 
-        # Step 2 : Export this subassembly
-        if subassembly.FileName not in already_processed_files:
-            for edir in export_directives:
-                self._execute_single_export_directive(subassembly, edir)
-            already_processed_files = already_processed_files.union({subassembly.FileName})
+    def _export_in_configurations(self, component, export_directives, export_one):
+        """Call ``export_one(export_directive, configuration_name)`` for each of ``export_directives`` that applies to ``component``.
+        Directives that don't name any configurations go first, in whichever one is active (with a ``configuration_name`` of None).
+        Then each configuration that any directive wants is activated once, and every directive that wants it runs.
+        The configuration that was active to begin with is put back at the end, even if an export fails."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly, list[ExportDirective], Callable) -> None
+        for export_directive in export_directives:
+            if export_directive.configurations is None:
+                export_one(export_directive, None)
+
+        configured_directives = [edir for edir in export_directives if edir.configurations is not None]
+        if not configured_directives:
+            return
+        configurations = list(component.Configurations)
+        active_configurations = [configuration for configuration in configurations if configuration.IsActive]
+        try:
+            for configuration in configurations:
+                wanting_directives = [edir for edir in configured_directives if edir.wants_configuration(configuration.Name)]
+                if not wanting_directives:
+                    continue
+                if not configuration.IsActive:
+                    configuration.Activate()
+                    self.run_report.counters["Configuration Switches"] = self.run_report.counters.get("Configuration Switches", 0) + 1
+                for export_directive in wanting_directives:
+                    export_one(export_directive, configuration.Name)
+        finally:
+            if active_configurations and not active_configurations[0].IsActive:
+                active_configurations[0].Activate()
+
+    def _record_occurrence(self, component, parent):
+        """Note down one instance of ``component`` placed in the assembly ``parent`` (None for the root assembly), for the BOM and the assembly structure."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly, Assembly | AssembledSubAssembly | None) -> None
+        parent_path = self.component_occurrences[parent.FileName]["Path"] if parent is not None else ""
+        occurrence = self.component_occurrences.get(component.FileName)
+        if occurrence is None:
+            occurrence = {
+                "Path": parent_path + "/" + component.Name,
+                "Count": 0,
+                "ParentPaths": [],
+                "Kind": "Part" if (isinstance(component, Part) or isinstance(component, AssembledPart)) else "Assembly",
+            }
+            self.component_occurrences[component.FileName] = occurrence
+        occurrence["Count"] += 1
+        if parent is not None and parent_path not in occurrence["ParentPaths"]:
+            occurrence["ParentPaths"].append(parent_path)
+        if parent is not None and self.records_occurrences:
+            self.assembly_occurrences.setdefault(parent.FileName, []).append(
+                (component.Name, component.FileName, self._get_occurrence_transform(component, parent, occurrence["Count"] == 1) if self.records_structure else None)
+            )
+        elif parent is None and self.records_structure:
+            self.assembly_transforms[component.FileName] = _IDENTITY_TRANSFORM
+
+    def _get_occurrence_transform(self, component, parent, walked):
+        """Return where an instance of ``component`` is placed in ``parent``, as a 4x4 row-major transform matrix (a flat list of 16 numbers,
+        in the document's units), or None if Alibre Script doesn't say (see ``_get_top_level_transform()``).
+        ``walked`` says this is the first instance of ``component``, which (for an assembly) is the one whose contents get walked."""
+        # type: (AlibreNeutralizer, AssembledPart | AssembledSubAssembly, Assembly | AssembledSubAssembly, bool) -> list[float] | None
+        transform = _get_top_level_transform(component)
+        if walked and not (isinstance(component, Part) or isinstance(component, AssembledPart)):
+            self.assembly_transforms[component.FileName] = transform
+        parent_transform = self.assembly_transforms.get(parent.FileName)
+        if transform is None or parent_transform is None:
+            return None
+        parent_inverse = _invert_transform(parent_transform)
+        return _multiply_transforms(parent_inverse, transform) if parent_inverse is not None else None
+
+    def _iter_planned_subassemblies_recursive(self, subassembly, planned_files):
+        # type (AlibreNeutralizer, AssembledSubAssembly, set[str]) -> Iterator[tuple]
+
+        # Step 1 : Plan parts (always before the subassembly they're in)
+        # If any of these parts have already been planned, they'll be skipped automatically in this function
+        for planned in self._iter_planned_parts(subassembly, planned_files):
+            yield planned
+
+        # Step 2 : Plan this subassembly
+        if subassembly.FileName not in planned_files:
+            planned_files.add(subassembly.FileName)
+            yield (subassembly, "Subassembly")
 
         # Step 3: Recurse
         for subsubassy in subassembly.SubAssemblies:
-            if subsubassy.FileName not in already_processed_files:
-                already_processed_files = already_processed_files.union(
-                    self._export_subassemblies_recursive(subsubassy, export_directives, already_processed_files)
-                )
-
-        return already_processed_files
-
-    def _purge_according_to_export_directive(self, export_directive):
-        """Given an ExportDirective, delete any old files it's configured to purge. This should be called before exporting any new files."""
-        # type: (AlibreNeutralizer, ExportDirective) -> None
-        
-        # Recursively purge files with extensions listed in export_directive.
-        for file_extension in export_directive.get_extensions_to_purge():
-            # Recursive purge files of type ".{fileExtension}" from self._convert_base_path_to_absolute() + export_directive.purge_before_export
-
-            # Purge path = export_directive.purge_before_export, relative to self._convert_base_path_to_absolute()
+            self._record_occurrence(subsubassy, subassembly)
+            if subsubassy.FileName not in planned_files:
+                for planned in self._iter_planned_subassemblies_recursive(subsubassy, planned_files):
+                    yield planned
+
+    def _get_purges(self, export_directives, keep_files=None):
+        """Given some ExportDirectives, return the purges (for ``PurgeEngine.start()``) for the ones configured to purge old files.
+        Without ``keep_files``, that's a pre-export purge. With it, it's a post-export cleanup that deletes every matching file except the ones in ``keep_files``."""
+        # type: (AlibreNeutralizer, list[ExportDirective], set[str] | None) -> list[tuple[str, tuple[str], set[str] | None]]
+
+        if keep_files is not None:
+            keep_files = set(os.path.normcase(os.path.normpath(path)) for path in keep_files)
+
+        # Directives often share a purge directory (CSV_Properties and CSV_Parameters both purging ./CSV, say), so purges are merged by directory.
+        # Otherwise the same file would be queued once per directive, and the deleters would race each other for it.
+        purge_extensions = OrderedDict() # normalized purge path -> (purge path, extensions)
+        for export_directive in export_directives:
+            file_extensions = export_directive.get_extensions_to_purge()
+            if not file_extensions:
+                continue
+            # Purge path = export_directive.purge_before_export, relative to the directive's base path (see _convert_base_path_to_absolute())
+            # Files with any of those extensions get purged from it, and its subdirectories
             purge_path = os.path.normpath(
                 os.path.join(
-                    self._convert_base_path_to_absolute(),
+                    self._convert_base_path_to_absolute(export_directive),
                     os.path.normpath(export_directive.purge_before_export)
                 )
             )
-
-            # Recursively purge files of type fileExtension in purge_path and subdirectories
-            for root, _, files in os.walk(purge_path):
-                for file in files:
-                    if file.endswith(file_extension):
-                        file_path = os.path.join(root, file)
-                        try:
-                            # TODO: uncomment to do it for realsies
-                            os.remove(file_path)
-                        except OSError as e:
-                            print "ERROR: Could not delete {file_path} in pre-export purge: {e}".format(file_path=file_path, e=e)
-
-    def _execute_single_export_directive(self, component, export_directive):
-        """Given a ``Part`` or ``Assembly``, execute one ``ExportDirective`` against it. This function does NOT perform any deduplication checking."""
-        # type: (AlibreNeutralizer, Part, ExportDirective | list[ExportDirective]) -> None
+            _, extensions = purge_extensions.setdefault(os.path.normcase(purge_path), (purge_path, []))
+            extensions.extend(extension for extension in file_extensions if extension not in extensions)
+        return [(purge_path, tuple(extensions), keep_files) for purge_path, extensions in purge_extensions.values()]
+
+    def _finish_purge(self, purge_engine):
+        """Wait for a ``PurgeEngine`` to finish, and report how it went."""
+        # type: (AlibreNeutralizer, PurgeEngine) -> None
+        for failure_message in purge_engine.wait():
+            print failure_message
+        if purge_engine.failed_count > 0:
+            self.run_report.counters["Purge Failures"] = self.run_report.counters.get("Purge Failures", 0) + purge_engine.failed_count
+        self.run_report.counters["Files Purged"] = self.run_report.counters.get("Files Purged", 0) + purge_engine.deleted_count
+
+    def _execute_single_export_directive(self, component, export_directive, configuration=None):
+        """Given a ``Part`` or ``Assembly``, execute one ``ExportDirective`` against it, in the configuration named ``configuration`` (None for whichever is active).
+        This function does NOT perform any deduplication checking."""
+        # type: (AlibreNeutralizer, Part, ExportDirective | list[ExportDirective], str | None) -> None
         
         if not (
             isinstance(component, AssembledPart)
@@ -459,36 +2745,112 @@ class AlibreNeutralizer:
             # This will dictate whether we actually need to export this component.
             if export_directive.export_parts == True and (isinstance(component, AssembledPart) or isinstance(component, Part)):
                 # We need to export this Part
-                print "- Exporting Part to {0}: {1}".format(ExportTypes.convert_to_string(export_directive.export_type), component.Name)
-                abs_export_path = self._get_absolute_export_path(
-                    export_directive.get_export_path(component)
-                )
-                print "- Path : {0}".format(abs_export_path)
-                self._export(
-                    component,
-                    export_directive.export_type,
-                    abs_export_path
-                )
+                self._export_component(component, export_directive, "Part", configuration)
             elif (export_directive.export_subassemblies == True) and isinstance(component, AssembledSubAssembly):
                 # We need to export this Subassembly
-                print "- Exporting Subassembly to {0}: {1}".format(ExportTypes.convert_to_string(export_directive.export_type), component.Name)
-                abs_export_path = self._get_absolute_export_path(
-                    export_directive.get_export_path(component)
-                )
-                print "- Path : {0}".format(abs_export_path)
-                self._export(
-                    component,
-                    export_directive.export_type,
-                    abs_export_path
-                )
+                self._export_component(component, export_directive, "Subassembly", configuration)
 
 
         else:
             raise Exception("Invalid argument - expected an ExportDirective.")
     
-    def _export(self, component, export_type, export_path_abs):
-        """Given a Part or Assembly, export the specified file type to the specified absolute path."""
-        # type: (AlibreNeutralizer, Part | Assembly, int, str) -> None
+    def _export_component(self, component, export_directive, component_kind, configuration=None):
+        """Export one component under one ``ExportDirective`` that we already know applies to it.
+        For aggregate export types, this just adds the component to the run-wide file, which gets written at the end of the run.
+
+        :param component_kind: "Root Assembly", "Subassembly" or "Part", for logging.
+        :type component_kind: str
+
+        :param configuration: The name of the configuration that's been activated for this export, or None if it's whichever one was already active.
+        :type configuration: str | None
+        """
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly, ExportDirective, str, str | None) -> None
+        if ExportTypes.is_aggregate(export_directive.export_type):
+            # Read what we need now, while we're on this component; the file gets written in _export_aggregates().
+            # These have one row per component, so they share the snapshot whatever configuration is active.
+            self._get_component_properties(component)
+            if export_directive.export_type == ExportTypes.SQLite_Index:
+                self._get_component_parameters(component)
+            elif export_directive.export_type == ExportTypes.CSV_MassProperties:
+                self._get_component_mass_properties(component)
+            self.aggregate_export_components[export_directive].append(component.FileName)
+            return
+
+        self._suspend_updating(component)
+        print "- Exporting {0} to {1}: {2}{3}".format(component_kind, ExportTypes.convert_to_string(export_directive.export_type), component.Name, " ({0})".format(configuration) if configuration is not None else "")
+        abs_export_path = self._get_absolute_export_path(
+            export_directive.get_export_path(component, configuration),
+            export_directive
+        )
+        print "- Path : {0}".format(export_directive.get_output_path(abs_export_path))
+        self._export(
+            component,
+            export_directive,
+            abs_export_path,
+            configuration
+        )
+
+    def _export_aggregates(self):
+        """Write the run-wide files for aggregate export types (like CSV_BOM). Call this once every component has been through the export directives."""
+        # type: (AlibreNeutralizer) -> None
+        for export_directive in self.export_directives:
+            if not ExportTypes.is_aggregate(export_directive.export_type):
+                continue
+            # Aggregate exports are named after the root assembly
+            print "- Writing {0} for {1}".format(ExportTypes.convert_to_string(export_directive.export_type), self.root_component.Name)
+            abs_export_path = self._get_absolute_export_path(
+                export_directive.get_export_path(self.root_component),
+                export_directive
+            )
+            print "- Path : {0}".format(abs_export_path)
+            export_directory = os.path.dirname(abs_export_path)
+            if not os.path.exists(export_directory):
+                os.makedirs(export_directory)
+            # Don't write through a link (see _export())
+            if self._output_may_be_linked() and export_directive.export_type != ExportTypes.SQLite_Index and os.path.lexists(abs_export_path):
+                os.remove(abs_export_path)
+
+            if export_directive.export_type == ExportTypes.CSV_BOM:
+                self._export_bom_to_csv(self.aggregate_export_components[export_directive], abs_export_path)
+            elif export_directive.export_type == ExportTypes.SQLite_Index:
+                self._export_index_to_sqlite(self.aggregate_export_components[export_directive], abs_export_path)
+            elif export_directive.export_type == ExportTypes.JSON_Structure:
+                self._export_structure_to_json(self.aggregate_export_components[export_directive], abs_export_path)
+            elif export_directive.export_type == ExportTypes.CSV_MassProperties:
+                self._export_mass_properties_to_csv(self.aggregate_export_components[export_directive], abs_export_path)
+            self.output_files.add(abs_export_path)
+
+    def _export(self, component, export_directive, export_path_abs, configuration=None):
+        """Given a Part or Assembly, export it to the specified absolute path, following the file type and options in an ``ExportDirective``.
+        ``configuration`` is the name of the configuration that was activated for it (None if it's whichever one was already active)."""
+        # type: (AlibreNeutralizer, Part | Assembly, ExportDirective, str, str | None) -> None
+
+        export_type = export_directive.export_type
+        output_path_abs = export_directive.get_output_path(export_path_abs)
+
+        # Thumbnails are only rendered again when what they show has changed. The existing image says what it shows in its stamp.
+        thumbnail_stamp = None
+        if export_type == ExportTypes.PNG_Thumbnail:
+            thumbnail_stamp = self._get_thumbnail_stamp(component, export_directive, configuration)
+            if thumbnail_stamp is not None and _read_png_text(output_path_abs, ExportDirective.THUMBNAIL_STAMP_KEYWORD) == thumbnail_stamp:
+                print "- Unchanged since the last run; keeping the existing image"
+                self.run_report.counters["Thumbnails Unchanged"] = self.run_report.counters.get("Thumbnails Unchanged", 0) + 1
+                self.output_files.add(output_path_abs)
+                self.component_output_files.setdefault(component.FileName, set()).add(output_path_abs)
+                return
+
+        # With change detection (and for thumbnails), Alibre exports to a temporary file next to the real one.
+        # The post-export workers then decide whether it replaces the existing output.
+        if export_directive.checks_previous_output():
+            export_path_abs = _get_temporary_path(export_path_abs)
+
+        # The old output may be a link (see _output_may_be_linked()). Writing through that would change
+        # the file at the other end (and everything else linked to it), so it has to go first.
+        # Change detection still needs the old output to compare against, but it replaces rather than writes.
+        if self._output_may_be_linked():
+            for stale_path in set([export_path_abs] if export_directive.checks_previous_output() else [export_path_abs, output_path_abs]):
+                if os.path.lexists(stale_path):
+                    os.remove(stale_path)
 
         # Make sure the full directory tree exists. If it doesn't create it
         export_directory = os.path.dirname(export_path_abs)
@@ -497,8 +2859,17 @@ class AlibreNeutralizer:
         
         # TODO: Better error handling/logging than this.
         # This gets the job done for testing the path interpretations.
+        started = time.time()
         try:
-            if export_type == ExportTypes.SAT:
+            # Parts that haven't changed since some run (of any product) exported them come straight out of the export cache
+            cache_key = self._get_export_cache_key(component, export_type, configuration)
+            cache_hit = cache_key is not None and self.export_cache.fetch(cache_key, export_path_abs)
+            if cache_key is not None:
+                counter_name = "Export Cache Hits" if cache_hit else "Export Cache Misses"
+                self.run_report.counters[counter_name] = self.run_report.counters.get(counter_name, 0) + 1
+            if cache_hit:
+                cache_key = None # Nothing new to store
+            elif export_type == ExportTypes.SAT:
                 component.ExportSAT(export_path_abs, 0, True) # TODO: Figure out an appropriate File Version (probably not 0)
             elif export_type == ExportTypes.STEP203:
                 component.ExportSTEP203(export_path_abs)
@@ -510,33 +2881,182 @@ class AlibreNeutralizer:
                 component.ExportSTL(export_path_abs)
             elif export_type == ExportTypes.CSV_Properties:
                 # Export Properties (metadata like Cost Center, Part Number, etc) to CSV
-                self._export_properties_to_csv(component, export_path_abs)
+                self._export_properties_to_csv(component, export_path_abs, configuration)
             elif export_type == ExportTypes.CSV_Parameters:
                 # Export Parameters (dimensions, equations, etc) to CSV
-                self._export_parameters_to_csv(component, export_path_abs)
+                self._export_parameters_to_csv(component, export_path_abs, configuration)
+            elif export_type == ExportTypes.PNG_Thumbnail:
+                render_size = export_directive.thumbnail_size * ExportDirective.THUMBNAIL_RENDER_SCALE
+                component.SaveSnapshot(export_path_abs, render_size, render_size)
+
+            # Post-processing (adding to the export cache, STL compaction, compression, change detection) doesn't need Alibre, so it's left to the post-export workers.
+            # The steps for one file have to run in order, so they're submitted as a single task.
+            if export_type == ExportTypes.PNG_Thumbnail:
+                self.post_export_pipeline.submit(output_path_abs, _finish_thumbnail, export_path_abs, output_path_abs, export_directive.thumbnail_size, thumbnail_stamp)
+            elif export_directive.convert_stl_to_binary or output_path_abs != export_path_abs or cache_key is not None:
+                self.post_export_pipeline.submit(output_path_abs, self._post_process_export, export_directive, export_path_abs, output_path_abs, cache_key)
+            self.output_files.add(output_path_abs)
+            self.component_output_files.setdefault(component.FileName, set()).add(output_path_abs)
         except Exception as e:
             failure_message = "ERROR: There was a problem exporting {0} to {1} format: {2}".format(component.FileName, ExportTypes.convert_to_string(export_type), e)
             print failure_message
             self.export_failures.append(failure_message)
+
+        self.run_report.add_export(ExportTypes.convert_to_string(export_type), time.time() - started)
+
+        # Keep an eye on memory during long runs
+        self._exports_since_memory_sample += 1
+        if self.memory_sample_interval > 0 and self._exports_since_memory_sample >= self.memory_sample_interval:
+            self._sample_memory()
+
+        # Surface anything the post-export workers have choked on since the last export
+        self._record_post_export_failures(self.post_export_pipeline.pop_failures())
+
+    def _get_export_cache_key(self, component, export_type, configuration=None):
+        """Return the export cache key for exporting ``component`` to ``export_type`` (in the activated configuration ``configuration``, if any),
+        or None if it shouldn't go through the cache. Only parts do: an assembly's export depends on more than its own file."""
+        # type: (AlibreNeutralizer, Part | Assembly, int, str | None) -> str | None
+        if self.export_cache is None or export_type not in ExportCache.EXPORT_TYPES:
+            return None
+        if not (isinstance(component, Part) or isinstance(component, AssembledPart)):
+            return None
+        try:
+            source_hash = self.hash_service.hash_file(component.FileName)
+        except (IOError, OSError, TypeError):
+            return None # e.g. it lives in PDM
+        if self._exporter_version is None:
+            self._exporter_version = _get_exporter_version()
+        return ExportCache.get_key(source_hash, export_type, self._exporter_version, configuration)
+
+    def _get_thumbnail_stamp(self, component, export_directive, configuration=None):
+        """Return the stamp for a thumbnail of ``component`` under ``export_directive``: its geometry fingerprint, the image size and the configuration.
+        A thumbnail with the same stamp would come out the same. Returns None if there's no fingerprint, in which case the thumbnail is always rendered."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly, ExportDirective, str | None) -> str | None
+        fingerprint = self._get_geometry_fingerprint(component)
+        if fingerprint is None:
+            return None
+        return hashlib.sha1(u"{0}|{1}|{2}".format(fingerprint, export_directive.thumbnail_size, configuration or "").encode("utf-8")).hexdigest()
+
+    def _get_geometry_fingerprint(self, component):
+        """Return a fingerprint of everything ``component``'s geometry depends on: the hash of its own file, plus (for assemblies) the fingerprints
+        of everything placed in it, in order. Placements live in the assembly's own file, so they're covered too.
+        Returns None if any of those files can't be hashed (e.g. it lives in PDM). Each unique component is only worked out once per run."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly) -> str | None
+        if component.FileName in self.geometry_fingerprints:
+            return self.geometry_fingerprints[component.FileName]
+        try:
+            hashes = [self.hash_service.hash_file(component.FileName)]
+        except (IOError, OSError, TypeError):
+            hashes = [None]
+        if not (isinstance(component, Part) or isinstance(component, AssembledPart)):
+            hashes += [self._get_geometry_fingerprint(child) for child in itertools.chain(component.Parts, component.SubAssemblies)]
+        fingerprint = hashlib.sha1("|".join(hashes)).hexdigest() if None not in hashes else None
+        self.geometry_fingerprints[component.FileName] = fingerprint
+        return fingerprint
+
+    def _post_process_export(self, export_directive, export_path_abs, output_path_abs, cache_key=None):
+        """Everything that happens to an exported file once Alibre is done with it. This runs on a post-export worker, so it must never touch Alibre.
+        With a ``cache_key``, the file goes into the export cache first, just as Alibre wrote it."""
+        # type: (AlibreNeutralizer, ExportDirective, str, str, str | None) -> None
+        if cache_key is not None:
+            try:
+                self.export_cache.store(cache_key, export_path_abs)
+            except (IOError, OSError):
+                pass # The cache is only an optimization, so this export is still fine
+
+        if export_directive.convert_stl_to_binary:
+            _convert_ascii_stl_to_binary(export_path_abs)
+
+        processed_path_abs = export_directive.get_output_path(export_path_abs)
+        if processed_path_abs != export_path_abs:
+            _gzip_file(export_path_abs, processed_path_abs)
+
+        if export_directive.detect_geometry_changes:
+            # processed_path_abs is a temporary file; only let it replace the real output if the geometry is different.
+            # Whatever happens (including the comparison failing on an unreadable file), it doesn't outlive this.
+            try:
+                if not (os.path.exists(output_path_abs) and _stl_geometry_matches(processed_path_abs, output_path_abs, export_directive.geometry_tolerance)):
+                    _replace_file(processed_path_abs, output_path_abs)
+            finally:
+                if os.path.exists(processed_path_abs):
+                    os.remove(processed_path_abs)
+
+    def _record_post_export_failures(self, failure_messages):
+        """Log failures reported by the post-export workers and add them to ``self.export_failures``. Only call this from the COM thread."""
+        # type: (AlibreNeutralizer, list[str]) -> None
+        for failure_message in failure_messages:
+            print failure_message
+            self.export_failures.append(failure_message)
     
-    def _convert_base_path_to_absolute(self):
+    def _add_to_content_store(self):
+        """Move every file this run wrote into ``self.content_store``, leaving links in their place. Call this once the post-export workers are drained.
+        SQLite indexes stay ordinary files, since they're added to in place from run to run."""
+        # type: (AlibreNeutralizer) -> None
+        mutable_extensions = tuple(ExportTypes.get_file_extensions(ExportTypes.SQLite_Index))
+        file_paths = [file_path for file_path in sorted(self.output_files) if not file_path.lower().endswith(mutable_extensions) and os.path.exists(file_path)]
+        # Hashing is the slow part, so it all happens up front, on the hash service's threads
+        file_hashes = self.hash_service.hash_files(file_paths)
+        stored_count = 0
+        duplicate_count = 0
+        failures = []
+        for file_path in file_paths:
+            try:
+                if self.content_store.add(file_path, file_hashes.get(file_path)):
+                    duplicate_count += 1
+                else:
+                    stored_count += 1
+            except (IOError, OSError) as e:
+                failures.append("{0}: {1}".format(file_path, e))
+        self.run_report.counters["Files Stored"] = stored_count
+        self.run_report.counters["Duplicate Files Linked"] = duplicate_count
+        if failures:
+            # Usually all for the same reason (like the store being on another drive), so the first one says it all
+            print "WARNING: {0} file(s) couldn't be moved into the content store, and were left as ordinary files. The first: {1}".format(len(failures), failures[0])
+            self.run_report.counters["Content Store Failures"] = len(failures)
+
+    def _output_may_be_linked(self):
+        """Whether files already at the output paths may be links: into the content store, into the export cache (with ExportCacheLinks),
+        or (while staging) back to the live output. If so, they have to be removed or replaced before anything is written there, never written over."""
+        # type: (AlibreNeutralizer) -> bool
+        return (self.content_store is not None
+                or (self.export_cache is not None and self.export_cache.use_links)
+                or self._staging_path is not None)
+
+    def _archive_run(self):
+        """Write every file from this run into the zip archive at ``self.run_archive_path``. Call this once the post-export workers are drained."""
+        # type: (AlibreNeutralizer) -> None
+        archive_path_abs = self._get_absolute_export_path(self.run_archive_path)
+        print "- Archiving {0} exported files to: {1}".format(len(self.output_files), archive_path_abs)
+        # Don't write through a link (see _export())
+        if self._output_may_be_linked() and os.path.lexists(archive_path_abs):
+            os.remove(archive_path_abs)
+        # Entries are named relative to the directory every base path (merged config files included) has in common
+        base_paths = [self._convert_base_path_to_absolute()] + [edir.base_path for edir in self.export_directives if edir.base_path is not None]
+        archive_base_path = os.path.dirname(os.path.commonprefix([os.path.join(base_path, "") for base_path in base_paths]))
+        try:
+            _write_run_archive(archive_path_abs, archive_base_path, self.output_files)
+        except Exception as e:
+            failure_message = "ERROR: There was a problem writing the run archive {0}: {1}".format(archive_path_abs, e)
+            print failure_message
+            self.export_failures.append(failure_message)
+
+    def _convert_base_path_to_absolute(self, export_directive=None):
         """Convert self.base_path to an absolute path, relative to the directory where the config file lives.
         In the rare case that self.base_path is already absolute, just return it as-is.
+        While a run's output is being staged, this is the staging directory instead (see ``StagedOutput``).
+        If ``export_directive`` comes from a merged config file with its own base path, that's returned instead.
         
         This serves as the 'base' path for individual file export paths."""
-        # type: (AlibreNeutralizer) -> str
+        # type: (AlibreNeutralizer, ExportDirective | None) -> str
 
-        if os.path.isabs(self.base_path):
-            return self.base_path
-        else:
-            # It's not absolute. We need to make it absolute.
-            root_assembly_dir = os.path.dirname(
-                os.path.normpath(self.config_file_path)
-            )
-            return os.path.normpath(os.path.join(root_assembly_dir, self.base_path))
+        if export_directive is not None and export_directive.base_path is not None:
+            return export_directive.base_path
+        if self._staging_path is not None:
+            return self._staging_path
+        return _get_absolute_base_path(self.base_path, self.config_file_path)
     
-    def _get_absolute_export_path(self, export_path_relative):
-        """Combine a given relative export path with this ``AlibreNeutralizer``'s absolute ``base_path``, to give an absolute path."""
+    def _get_absolute_export_path(self, export_path_relative, export_directive=None):
+        """Combine a given relative export path with this ``AlibreNeutralizer``'s absolute ``base_path`` (or ``export_directive``'s, see ``_convert_base_path_to_absolute()``), to give an absolute path."""
 
 
         # Scrub out some illegal characters from the relative portion of the path
@@ -546,91 +3066,977 @@ class AlibreNeutralizer:
 
         return os.path.normpath(
             os.path.join(
-                self._convert_base_path_to_absolute(),
+                self._convert_base_path_to_absolute(export_directive),
                 export_path_relative_sanitized
             )
         )
 
-    def _export_properties_to_csv(self, component, export_path_abs):
-        """Given a single Part or Assembly, export its Properties (Comment, Cost Center, Part Number, etc) to a CSV file at a specified path."""
-        # type: (AlibreNeutralizer, Part | Assembly, str) -> None
-
-        # If you don't put "wb" here, it puts an extra blank row between every row
-        with open(export_path_abs, 'wb') as csv_file:
-            writer = csv.writer(csv_file)
-
-            # File header
-            writer.writerow(["Property Name", "Value"])
-
-            # File contents
-            data = [
-                ["Comment", component.Comment],
-                ["CostCenter", component.CostCenter],
-                ["CreatedBy", component.CreatedBy],
-                ["CreatedDate", component.CreatedDate],
-                ["CreatingApplication", component.CreatingApplication],
-                ["Density", component.Density],
-                ["Description", component.Description],
-                ["DocumentNumber", component.DocumentNumber],
-                ["EngineeringApprovalDate", component.EngineeringApprovalDate],
-                ["EngineeringApprovedBy", component.EngineeringApprovedBy],
-                ["EstimatedCost", component.EstimatedCost],
-                # I am NOT including FileName, since it's an absolute file path
-                # I would not personally want an automated export script revealing details about the structure of my filesystem in a public-facing Git repo
-                ["Keywords", component.Keywords],
-                ["LastAuthor", component.LastAuthor],
-                ["LastUpdateDate", component.LastUpdateDate],
-                ["ManufacturingApprovedBy", component.ManufacturingApprovedBy],
-                ["ModifiedInformation", component.ModifiedInformation],
-                ["Name", component.Name],
-                ["Number", component.Number],
-                ["Product", component.Product],
-                ["ReceivedFrom", component.ReceivedFrom],
-                ["Revision", component.Revision],
-                ["StockSize", component.StockSize],
-                ["Supplier", component.Supplier],
-                ["Title", component.Title],
-                ["Vendor", component.Vendor],
-                ["WebLink", component.WebLink]
-            ]
+    def _export_properties_to_csv(self, component, export_path_abs, configuration=None):
+        """Given a single Part or Assembly, export its Properties (Comment, Cost Center, Part Number, etc) to a CSV file at a specified path.
+        The properties are read from Alibre right away; the file itself is written by the post-export workers."""
+        # type: (AlibreNeutralizer, Part | Assembly, str, str | None) -> None
+
+        self.post_export_pipeline.submit(
+            export_path_abs,
+            _write_csv_file, export_path_abs, ["Property Name", "Value"], self._get_component_properties(component, configuration)
+        )
 
-            writer.writerows(data)
+    def _get_component_properties(self, component, configuration=None):
+        """Return a component's Properties as a list of ``[name, value]`` pairs, in a fixed order.
+        Alibre only gets asked once per component (and ``configuration``, the name of the one that's been activated, if any) per run;
+        after that, the answer comes from ``self.component_properties``."""
+        # type: (AlibreNeutralizer, Part | Assembly, str | None) -> list[list]
+        snapshot_key = component.FileName if configuration is None else (component.FileName, configuration)
+        if snapshot_key in self.component_properties:
+            return self.component_properties[snapshot_key]
+
+        data = [
+            ["Comment", component.Comment],
+            ["CostCenter", component.CostCenter],
+            ["CreatedBy", component.CreatedBy],
+            ["CreatedDate", component.CreatedDate],
+            ["CreatingApplication", component.CreatingApplication],
+            ["Density", component.Density],
+            ["Description", component.Description],
+            ["DocumentNumber", component.DocumentNumber],
+            ["EngineeringApprovalDate", component.EngineeringApprovalDate],
+            ["EngineeringApprovedBy", component.EngineeringApprovedBy],
+            ["EstimatedCost", component.EstimatedCost],
+            # I am NOT including FileName, since it's an absolute file path
+            # I would not personally want an automated export script revealing details about the structure of my filesystem in a public-facing Git repo
+            ["Keywords", component.Keywords],
+            ["LastAuthor", component.LastAuthor],
+            ["LastUpdateDate", component.LastUpdateDate],
+            ["ManufacturingApprovedBy", component.ManufacturingApprovedBy],
+            ["ModifiedInformation", component.ModifiedInformation],
+            ["Name", component.Name],
+            ["Number", component.Number],
+            ["Product", component.Product],
+            ["ReceivedFrom", component.ReceivedFrom],
+            ["Revision", component.Revision],
+            ["StockSize", component.StockSize],
+            ["Supplier", component.Supplier],
+            ["Title", component.Title],
+            ["Vendor", component.Vendor],
+            ["WebLink", component.WebLink]
+        ]
+
+        self.component_properties[snapshot_key] = data
+        return data
+
+    def _export_bom_to_csv(self, file_names, export_path_abs):
+        """Write a single Bill of Materials CSV: one row per unique component in ``file_names``, with all of its Properties,
+        how many instances of it there are in the whole product (see ``_get_total_quantities()``), and where in the assembly tree it's placed.
+        Rows come from the property snapshot rather than from Alibre, so the whole file is written by a post-export worker in one streaming pass."""
+        # type: (AlibreNeutralizer, list[str], str) -> None
+        included_file_names = set(file_names)
+        # The snapshot is complete by now, and nothing writes to it anymore, so it's safe for a worker to read
+        property_names = [name for name, _ in self.component_properties[file_names[0]]] if file_names else []
+        total_quantities = self._get_total_quantities()
+
+        def _rows():
+            # Traversal order is stable from run to run, which keeps the BOM diff-friendly
+            for file_name, occurrence in self.component_occurrences.items():
+                if file_name in included_file_names:
+                    yield (
+                        [value for _, value in self.component_properties[file_name]]
+                        + [total_quantities.get(file_name, 0), "; ".join(occurrence["ParentPaths"])]
+                    )
+
+        self.post_export_pipeline.submit(
+            export_path_abs,
+            _write_csv_file, export_path_abs, property_names + ["Occurrences", "Parent Paths"], _rows()
+        )
     
-    def _export_parameters_to_csv(self, component, export_path_abs):
-        """Given a single Part or Assembly, export its Parameters to a CSV file at a specified path."""
-        # type: (AlibreNeutralizer, Part | Assembly, str) -> None
-        
-        # If you don't put "wb" here, it puts an extra blank row between every row
-        with open(export_path_abs, 'wb') as csv_file:
-            writer = csv.writer(csv_file)
-
-            # File header
-            # This roughly mirrors the "Equation Editor" table view in Alibre's GUI
-            writer.writerow(["Name", "Equation", "Value", "Units", "Type", "Comment"])
-
-            # First, get the data
-            # We don't know what order Alibre will return this data in
-            # For example, will D1 come before A19? or no?
-            parameter_data_unalphabetized = []
-            for param in component.Parameters:
-                parameter_data_unalphabetized.append([param.Name, param.Equation, param.Value, param.Units, param.Type, param.Comment])
-            
-            # since we don't know the order, let's alphabetize it before writing
-            parameter_data_alphabetized = sorted(parameter_data_unalphabetized, key=lambda x: x[0])
-
-            # now write the consistent, alphabetized data
-            # having it organized like this makes it easy to Diff these CSV files
-            for row in parameter_data_alphabetized:
-                writer.writerow(row)
-            
+    def _export_structure_to_json(self, file_names, export_path_abs):
+        """Write the assembly structure as a single JSON file: every unique component in ``file_names`` (its Properties, how many instances
+        of it there are in the whole product, and the files it was exported to this run), and the instances placed in each unique assembly
+        (instance name, component, and transform). Components are keyed by their file's path relative to the root assembly's directory
+        (with forward slashes), so files with the same name in different directories stay apart.
+        Downstream tools can rebuild the assembly from the per-part exports with this, instead of needing a STEP export of every assembly."""
+        # type: (AlibreNeutralizer, list[str], str) -> None
+        included_file_names = set(file_names)
+        export_directory = os.path.dirname(export_path_abs)
+        total_quantities = self._get_total_quantities()
+
+        components = OrderedDict()
+        assemblies = OrderedDict()
+        # Traversal order is stable from run to run, which keeps the file diff-friendly
+        for file_name, occurrence in self.component_occurrences.items():
+            if file_name not in included_file_names:
+                continue
+            components[self._get_component_key(file_name)] = OrderedDict([
+                ("Kind", occurrence["Kind"]),
+                ("Path", occurrence["Path"]),
+                ("TotalQuantity", total_quantities.get(file_name, 0)),
+                # JSON takes the same types SQLite does
+                ("Properties", OrderedDict((name, _to_sqlite_value(value)) for name, value in self.component_properties[file_name])),
+                ("Files", sorted(
+                    os.path.relpath(output_path, export_directory).replace(os.sep, "/")
+                    for output_path in self.component_output_files.get(file_name, ())
+                )),
+            ])
+            if occurrence["Kind"] == "Assembly":
+                assemblies[self._get_component_key(file_name)] = [
+                    OrderedDict([("Instance", instance_name), ("Component", self._get_component_key(child_file_name)), ("Transform", transform)])
+                    for instance_name, child_file_name, transform in self.assembly_occurrences.get(file_name, [])
+                    if child_file_name in included_file_names
+                ]
+
+        document = OrderedDict([
+            ("Version", 1),
+            ("RunId", self.run_id),
+            ("Root", self._get_component_key(self.root_component.FileName)),
+            ("Components", components),
+            ("Assemblies", assemblies),
+        ])
+        self.post_export_pipeline.submit(export_path_abs, _write_json_file, export_path_abs, document)
+
+    def _get_component_key(self, file_name):
+        """Return the key the run-wide exports (JSON_Structure, SQLite_Index) identify a component by: its file's path relative to the
+        root assembly's directory, with forward slashes, so files with the same name in different directories stay apart.
+        A file on another drive than the root assembly has no relative path, so it keeps its full path."""
+        # type: (AlibreNeutralizer, str) -> str
+        try:
+            return os.path.relpath(file_name, os.path.dirname(self.root_component.FileName)).replace(os.sep, "/")
+        except ValueError:
+            return file_name.replace(os.sep, "/")
+
+    def _get_total_quantities(self):
+        """Return how many instances of each component (by FileName) there are in the whole product. Unlike ``component_occurrences``' "Count",
+        this multiplies out repeated subassemblies: a bolt placed twice in a subassembly that's placed three times counts as six."""
+        # type: (AlibreNeutralizer) -> dict[str, int]
+        total_quantities = {self.root_component.FileName: 1}
+        # Assemblies, with how many instances of each are still waiting to be counted into their children
+        pending = [(self.root_component.FileName, 1)]
+        while pending:
+            assembly_file_name, quantity = pending.pop()
+            for _, file_name, _ in self.assembly_occurrences.get(assembly_file_name, []):
+                total_quantities[file_name] = total_quantities.get(file_name, 0) + quantity
+                if file_name in self.assembly_occurrences:
+                    pending.append((file_name, quantity))
+        return total_quantities
+
+    def _export_mass_properties_to_csv(self, file_names, export_path_abs):
+        """Write a single CSV of mass properties: one row per unique component in ``file_names``, with its Number, Name, Density, Mass, Material,
+        bounding box (in its own coordinates) and the size of that box, plus how many instances of it there are in the whole product (like the BOM).
+        Everything comes from the snapshots taken during the traversal, so the whole file is written by a post-export worker."""
+        # type: (AlibreNeutralizer, list[str], str) -> None
+        included_file_names = set(file_names)
+        total_quantities = self._get_total_quantities()
+
+        def _rows():
+            # Traversal order, like the BOM
+            for file_name in self.component_occurrences:
+                if file_name not in included_file_names:
+                    continue
+                properties = dict(self.component_properties[file_name])
+                mass, material, minimum_x, minimum_y, minimum_z, maximum_x, maximum_y, maximum_z = self.component_mass_properties[file_name]
+                sizes = [
+                    maximum - minimum if minimum is not None and maximum is not None else None
+                    for minimum, maximum in ((minimum_x, maximum_x), (minimum_y, maximum_y), (minimum_z, maximum_z))
+                ]
+                yield (
+                    [properties["Number"], properties["Name"], properties["Density"], mass, material]
+                    + [minimum_x, minimum_y, minimum_z, maximum_x, maximum_y, maximum_z] + sizes + [total_quantities.get(file_name, 0)]
+                )
+
+        header = [
+            "Number", "Name", "Density", "Mass", "Material",
+            "Min X", "Min Y", "Min Z", "Max X", "Max Y", "Max Z", "Size X", "Size Y", "Size Z", "Occurrences",
+        ]
+        self.post_export_pipeline.submit(export_path_abs, _write_csv_file, export_path_abs, header, _rows())
+
+    def _get_component_mass_properties(self, component):
+        """Return a component's mass properties (see ``_read_mass_properties()``). Alibre only gets asked once per component per run,
+        and, for parts, not at all if the export history has them for the part's current geometry fingerprint (see ``_get_geometry_fingerprint()``).
+        Assemblies are always read: their fingerprint means walking everything in them, which costs more than asking Alibre."""
+        # type: (AlibreNeutralizer, Part | Assembly | AssembledPart | AssembledSubAssembly) -> list
+        if component.FileName in self.component_mass_properties:
+            return self.component_mass_properties[component.FileName]
+
+        if isinstance(component, Part) or isinstance(component, AssembledPart):
+            fingerprint = self._get_geometry_fingerprint(component)
+        else:
+            fingerprint = None
+        mass_properties = self.export_history.get_mass_properties(component.FileName, fingerprint) if fingerprint is not None else None
+        if mass_properties is not None:
+            counter_name = "Mass Properties From History"
+        else:
+            counter_name = "Mass Properties Read"
+            mass_properties = _read_mass_properties(component)
+            if fingerprint is not None:
+                self.export_history.record_mass_properties(component.FileName, fingerprint, mass_properties)
+        self.run_report.counters[counter_name] = self.run_report.counters.get(counter_name, 0) + 1
+
+        self.component_mass_properties[component.FileName] = mass_properties
+        return mass_properties
+
+    def _export_parameters_to_csv(self, component, export_path_abs, configuration=None):
+        """Given a single Part or Assembly, export its Parameters to a CSV file at a specified path.
+        The parameters are read from Alibre right away; sorting and writing happen on the post-export workers."""
+        # type: (AlibreNeutralizer, Part | Assembly, str, str | None) -> None
+
+        # First, get the data
+        parameter_table = self._get_component_parameters(component, configuration)
+
+        # The header roughly mirrors the "Equation Editor" table view in Alibre's GUI.
+        # Rows are alphabetized, since having it organized like this makes it easy to Diff these CSV files.
+        self.post_export_pipeline.submit(
+            export_path_abs,
+            _write_csv_file, export_path_abs, ParameterTable.COLUMNS, parameter_table.iter_rows(alphabetized=True)
+        )
 
 
+    def _get_component_parameters(self, component, configuration=None):
+        """Return a component's Parameters as a ``ParameterTable``.
+        Alibre only gets asked once per component (and ``configuration``, like ``_get_component_properties()``) per run;
+        after that, the answer comes from ``self.component_parameters``."""
+        # type: (AlibreNeutralizer, Part | Assembly, str | None) -> ParameterTable
+        snapshot_key = component.FileName if configuration is None else (component.FileName, configuration)
+        if snapshot_key in self.component_parameters:
+            return self.component_parameters[snapshot_key]
+
+        parameter_table = ParameterTable.read(component)
+        self.component_parameters[snapshot_key] = parameter_table
+        return parameter_table
+
+    def _export_index_to_sqlite(self, file_names, export_path_abs):
+        """Add this run's Properties and Parameters for every component in ``file_names`` to an indexed SQLite database,
+        so downstream tools can query across the whole product (e.g. "which parts have D12 = 6.35 mm?") without reading thousands of CSVs.
+
+        Each run is tagged with ``self.run_id``, and earlier runs are kept. Everything is inserted in bulk, in a single transaction,
+        by a post-export worker; the data comes from the snapshot rather than from Alibre."""
+        # type: (AlibreNeutralizer, list[str], str) -> None
+        included_file_names = set(file_names)
+        run_id = self.run_id
+        root_name = self.root_component.Name
+        total_quantities = self._get_total_quantities()
+
+        def _write_index():
+            # Components are identified by their file's path relative to the root assembly, for the same reason CSV_Properties leaves out FileName
+            component_rows = []
+            property_rows = []
+            parameter_rows = []
+            for file_name, occurrence in self.component_occurrences.items():
+                if file_name not in included_file_names:
+                    continue
+                component_file = self._get_component_key(file_name)
+                component_rows.append((run_id, component_file, occurrence["Path"], total_quantities.get(file_name, 0), "; ".join(occurrence["ParentPaths"])))
+                for name, value in self.component_properties[file_name]:
+                    property_rows.append((run_id, component_file, name, _to_sqlite_value(value)))
+                for row in self.component_parameters[file_name].iter_rows(alphabetized=False):
+                    parameter_rows.append((run_id, component_file) + tuple(_to_sqlite_value(value) for value in row))
+
+            connection = sqlite3.connect(export_path_abs)
+            try:
+                # The with block commits everything at once at the end, or rolls it all back if anything fails
+                with connection:
+                    connection.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, root_assembly TEXT, exported_at TEXT)")
+                    connection.execute("CREATE TABLE IF NOT EXISTS components (run_id TEXT, component_file TEXT, tree_path TEXT, occurrences INTEGER, parent_paths TEXT)")
+                    connection.execute("CREATE TABLE IF NOT EXISTS properties (run_id TEXT, component_file TEXT, name TEXT, value)")
+                    connection.execute("CREATE TABLE IF NOT EXISTS parameters (run_id TEXT, component_file TEXT, name TEXT, equation TEXT, value, units TEXT, type TEXT, comment TEXT)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS components_run ON components (run_id, component_file)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS properties_name_value ON properties (name, value, run_id)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS properties_component ON properties (run_id, component_file)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS parameters_name_value ON parameters (name, value, run_id)")
+                    connection.execute("CREATE INDEX IF NOT EXISTS parameters_component ON parameters (run_id, component_file)")
+
+                    connection.execute("INSERT INTO runs VALUES (?, ?, ?)", (run_id, root_name, time.strftime("%Y-%m-%dT%H:%M:%S")))
+                    connection.executemany("INSERT INTO components VALUES (?, ?, ?, ?, ?)", component_rows)
+                    connection.executemany("INSERT INTO properties VALUES (?, ?, ?, ?)", property_rows)
+                    connection.executemany("INSERT INTO parameters VALUES (?, ?, ?, ?, ?, ?, ?, ?)", parameter_rows)
+            finally:
+                connection.close()
+
+        self.post_export_pipeline.submit(export_path_abs, _write_index)
+
+
+def _get_process_memory_mb():
+    """Return this process's working set in MB, or None if it can't be measured (e.g. outside Alibre/IronPython)."""
+    # type: () -> float | None
+    if Process is None:
+        return None
+    current_process = Process.GetCurrentProcess()
+    current_process.Refresh()
+    return current_process.WorkingSet64 / (1024.0 * 1024.0)
+
+
+def _is_purged(file_path, purges):
+    """Return True if one of ``purges`` (see ``PurgeEngine.start()``) would delete the file at ``file_path``."""
+    # type: (str, list[tuple[str, tuple[str], set[str] | None]]) -> bool
+    normalized_path = os.path.normcase(os.path.normpath(file_path))
+    for purge_path, extensions, keep_files in purges:
+        if (normalized_path.startswith(os.path.normcase(purge_path) + os.sep) and file_path.endswith(extensions)
+                and (keep_files is None or normalized_path not in keep_files)):
+            return True
+    return False
+
+def _rename_with_retries(source_path, destination_path, attempts):
+    """``os.rename()``, retried once a second (up to ``attempts`` tries in all) while it fails, e.g. because a reader has a file open on Windows."""
+    # type: (str, str, int) -> None
+    for attempt in range(attempts):
+        try:
+            os.rename(source_path, destination_path)
+            return
+        except OSError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(1)
+
+def _get_process_id():
+    """Return this process's ID."""
+    # type: () -> int
+    if Process is not None:
+        return Process.GetCurrentProcess().Id
+    return os.getpid()
+
+def _process_is_running(process_id):
+    """Return True if the process with the ID ``process_id`` is still running."""
+    # type: (int) -> bool
+    if Process is not None:
+        try:
+            return not Process.GetProcessById(process_id).HasExited
+        except Exception:
+            return False # No such process
+    try:
+        os.kill(process_id, 0)
+    except OSError:
+        return False
+    return True
+
+def _get_absolute_base_path(base_path, config_file_path):
+    """Return a config file's BaseExportPath (``base_path``) as an absolute path. Relative ones are relative to the directory the config file is in."""
+    # type: (str, str) -> str
+    if os.path.isabs(base_path):
+        return base_path
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.normpath(config_file_path)), base_path))
+
+def _get_exporter_version():
+    """Return the version of the Alibre doing the exporting (its executable's file version), or "unknown" outside of Alibre."""
+    # type: () -> str
+    if Process is not None:
+        try:
+            return str(Process.GetCurrentProcess().MainModule.FileVersionInfo.FileVersion)
+        except Exception:
+            pass
+    return "unknown"
+
+def _get_source_modified(file_name):
+    """Return the modification time of a component's source file, or None if it can't be read (e.g. the component lives in PDM)."""
+    # type: (str) -> float | None
+    try:
+        return os.path.getmtime(file_name)
+    except (OSError, TypeError):
+        return None
+
+def _iter_and_forget(items):
+    """Yield each item in the list ``items``, clearing its slot as we go, so the list doesn't hang on to items we're done with (see ``_sample_memory()``)."""
+    # type: (list) -> Iterator
+    for i in range(len(items)):
+        item = items[i]
+        items[i] = None
+        yield item
+
+def _to_sqlite_value(value):
+    """SQLite only stores numbers, text and NULL. Pass those through, and turn anything else Alibre hands back (dates, enums, etc) into text."""
+    if value is None or isinstance(value, (int, long, float, basestring)):
+        return value
+    return unicode(value)
+
+
+def _read_mass_properties(component):
+    """Ask Alibre for a component's mass properties: ``[Mass, Material, min X, min Y, min Z, max X, max Y, max Z]``, where the last six are its
+    bounding box, in its own coordinates. Anything Alibre Script doesn't have for it is None (assemblies have no Mass or bounding box)."""
+    # type: (Part | Assembly | AssembledPart | AssembledSubAssembly) -> list
+    values = []
+    for name in ("Mass", "Material"):
+        try:
+            # Stored as JSON in the export history, which takes the same types SQLite does
+            values.append(_to_sqlite_value(getattr(component, name)))
+        except Exception:
+            values.append(None)
+
+    corners = [None] * 6
+    if isinstance(component, Part) or isinstance(component, AssembledPart):
+        try:
+            # Alibre Script returns the box as corner points; go by the extremes, whichever corners they are
+            coordinates = [float(value) for point in component.GetBoundingBox() for value in point]
+            points = [coordinates[i:i + 3] for i in range(0, len(coordinates) - 2, 3)]
+            if points:
+                corners = [min(point[axis] for point in points) for axis in range(3)] + [max(point[axis] for point in points) for axis in range(3)]
+        except Exception:
+            pass
+    return values + corners
+
+
+def _get_active_configuration_name(component):
+    """Return the name of the configuration that's active on ``component``, or None if Alibre Script doesn't say."""
+    # type: (Part | Assembly | AssembledPart | AssembledSubAssembly) -> str | None
+    try:
+        for configuration in component.Configurations:
+            if configuration.IsActive:
+                return configuration.Name
+    except Exception:
+        pass
+    return None
+
+
+# A transform that leaves everything where it is (see _get_top_level_transform())
+_IDENTITY_TRANSFORM = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+def _get_top_level_transform(component):
+    """Return where an instance is placed in the top-level assembly, as a 4x4 row-major transform matrix (a flat list of 16 numbers, in the
+    document's units), or None if Alibre Script doesn't say. It's worked out by mapping the instance's origin and axes into the top-level
+    assembly, which is where Alibre Script maps points to, however deep the instance is: PartPointtoAssemblyPoint() for parts, and
+    SubAssemblyPointtoAssemblyPoint() for subassemblies. Versions of Alibre Script without the latter give subassemblies None."""
+    # type: (AssembledPart | AssembledSubAssembly) -> list[float] | None
+    if isinstance(component, AssembledPart):
+        map_point = getattr(component, "PartPointtoAssemblyPoint", None)
+    else:
+        map_point = getattr(component, "SubAssemblyPointtoAssemblyPoint", None)
+    if map_point is None:
+        return None
+    try:
+        origin = map_point([0, 0, 0])
+        axes = [map_point(point) for point in ([1, 0, 0], [0, 1, 0], [0, 0, 1])]
+        if origin is None or None in axes:
+            return None
+        # Each axis becomes a column of the rotation, and the origin the translation column
+        rows = [[axes[0][i] - origin[i], axes[1][i] - origin[i], axes[2][i] - origin[i], origin[i]] for i in range(3)]
+        return [float(value) for row in rows for value in row] + [0.0, 0.0, 0.0, 1.0]
+    except Exception:
+        return None
+
+
+def _multiply_transforms(transform_a, transform_b):
+    """Return the transform that applies ``transform_b``, then ``transform_a`` (both 4x4 row-major matrices, as flat lists of 16 numbers)."""
+    # type: (list[float], list[float]) -> list[float]
+    return [sum(transform_a[row * 4 + k] * transform_b[k * 4 + column] for k in range(4)) for row in range(4) for column in range(4)]
+
+
+def _invert_transform(transform):
+    """Return the inverse of a placement transform (a 4x4 row-major matrix, as a flat list of 16 numbers, with a bottom row of 0, 0, 0, 1),
+    or None if it flattens everything (and so has no inverse)."""
+    # type: (list[float]) -> list[float] | None
+    (a, b, c, x), (d, e, f, y), (g, h, i, z) = [transform[row * 4:row * 4 + 4] for row in range(3)]
+    # The rotation (and any scaling) part is inverted by its adjugate over its determinant; the translation is then undone in the new frame
+    determinant = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+    if determinant == 0:
+        return None
+    rotation = [
+        [(e * i - f * h) / determinant, (c * h - b * i) / determinant, (b * f - c * e) / determinant],
+        [(f * g - d * i) / determinant, (a * i - c * g) / determinant, (c * d - a * f) / determinant],
+        [(d * h - e * g) / determinant, (b * g - a * h) / determinant, (a * e - b * d) / determinant],
+    ]
+    inverse = []
+    for row in rotation:
+        inverse += row + [-(row[0] * x + row[1] * y + row[2] * z)]
+    return inverse + [0.0, 0.0, 0.0, 1.0]
+
+
+def _finish_thumbnail(render_path, output_path, size, stamp):
+    """Scale the snapshot Alibre rendered at ``render_path`` down to fit ``size`` x ``size`` pixels, stamp it with ``stamp`` (if it isn't None),
+    and move it to ``output_path``. Without System.Drawing, the image keeps the size it was rendered at.
+    This never touches Alibre, so it's safe to call from a post-export worker."""
+    # type: (str, str, int, str | None) -> None
+    if Bitmap is not None:
+        scaled_path = _get_temporary_path(render_path)
+        _downscale_image(render_path, scaled_path, size)
+        os.remove(render_path)
+        os.rename(scaled_path, render_path)
+    if stamp is not None:
+        with open(render_path, 'rb') as render_file:
+            png_bytes = render_file.read()
+        with open(render_path, 'wb') as render_file:
+            render_file.write(_add_png_text(png_bytes, ExportDirective.THUMBNAIL_STAMP_KEYWORD, stamp))
+    _replace_file(render_path, output_path)
+
+
+def _downscale_image(source_path, destination_path, size):
+    """Write a copy of the image at ``source_path`` to ``destination_path`` as a PNG, scaled down (keeping its proportions) to fit ``size`` x ``size`` pixels.
+    Needs System.Drawing."""
+    # type: (str, str, int) -> None
+    source = Bitmap(source_path)
+    try:
+        scale = min(1.0, float(size) / max(source.Width, source.Height))
+        scaled = Bitmap(max(1, int(round(source.Width * scale))), max(1, int(round(source.Height * scale))))
+        try:
+            graphics = Graphics.FromImage(scaled)
+            try:
+                graphics.InterpolationMode = InterpolationMode.HighQualityBicubic
+                graphics.DrawImage(source, 0, 0, scaled.Width, scaled.Height)
+            finally:
+                graphics.Dispose()
+            scaled.Save(destination_path, ImageFormat.Png)
+        finally:
+            scaled.Dispose()
+    finally:
+        source.Dispose()
+
+
+_PNG_SIGNATURE = "\x89PNG\r\n\x1a\n"
+
+
+def _add_png_text(png_bytes, keyword, text):
+    """Return the PNG file ``png_bytes`` with a text chunk (``keyword``: ``text``) added straight after its header chunk."""
+    # type: (str, str, str) -> str
+    if not png_bytes.startswith(_PNG_SIGNATURE):
+        raise ValueError("Not a PNG file.")
+    header_end = len(_PNG_SIGNATURE) + 12 + struct.unpack(">I", png_bytes[8:12])[0]
+    chunk_data = "tEXt" + str(keyword) + "\0" + str(text)
+    chunk = struct.pack(">I", len(chunk_data) - 4) + chunk_data + struct.pack(">I", zlib.crc32(chunk_data) & 0xffffffff)
+    return png_bytes[:header_end] + chunk + png_bytes[header_end:]
+
+
+def _read_png_text(file_path, keyword):
+    """Return the text stored under ``keyword`` in the PNG file at ``file_path`` (see ``_add_png_text()``), or None if it isn't there.
+    Only the chunks before the image data are read, so this is quick even for big images."""
+    # type: (str, str) -> str | None
+    try:
+        with open(file_path, 'rb') as png_file:
+            if png_file.read(len(_PNG_SIGNATURE)) != _PNG_SIGNATURE:
+                return None
+            while True:
+                chunk_header = png_file.read(8)
+                if len(chunk_header) < 8:
+                    return None
+                length, chunk_type = struct.unpack(">I4s", chunk_header)
+                if chunk_type == "IDAT" or chunk_type == "IEND":
+                    return None
+                chunk_data = png_file.read(length + 4)[:length]
+                if chunk_type == "tEXt":
+                    chunk_keyword, _, text = chunk_data.partition("\0")
+                    if chunk_keyword == keyword:
+                        return text
+    except (IOError, OSError):
+        return None
+
+
+def _write_json_file(export_path_abs, document):
+    """Write a JSON document to a file. This never touches Alibre, so it's safe to call from a post-export worker."""
+    # type: (str, dict) -> None
+    with open(export_path_abs, 'w') as json_file:
+        json.dump(document, json_file, indent=1)
+
+
+def _write_csv_file(export_path_abs, header, rows):
+    """Write a header row plus data rows to a CSV file. This never touches Alibre, so it's safe to call from a post-export worker."""
+    # type: (str, list, list[list]) -> None
+
+    # If you don't put "wb" here, it puts an extra blank row between every row
+    with open(export_path_abs, 'wb') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _gzip_file(source_path, destination_path):
+    """Gzip ``source_path`` into ``destination_path``, then delete ``source_path``.
+    The gzip header is written without a file name or timestamp, so compressing an unchanged export gives a byte-identical file
+    (Git won't see a change). This never touches Alibre, so it's safe to call from a post-export worker."""
+    # type: (str, str) -> None
+    with open(source_path, 'rb') as source_file:
+        with open(destination_path, 'wb') as destination_file:
+            gzip_file = gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=destination_file, mtime=0)
+            try:
+                shutil.copyfileobj(source_file, gzip_file, 1024 * 1024)
+            finally:
+                gzip_file.close()
+    os.remove(source_path)
+
+
+# One ASCII STL facet. Alibre writes these in the standard lowercase layout, one keyword group per line.
+_ASCII_STL_FACET_PATTERN = re.compile(
+    r'facet\s+normal\s+(\S+)\s+(\S+)\s+(\S+)\s+outer\s+loop'
+    r'\s+vertex\s+(\S+)\s+(\S+)\s+(\S+)'
+    r'\s+vertex\s+(\S+)\s+(\S+)\s+(\S+)'
+    r'\s+vertex\s+(\S+)\s+(\S+)\s+(\S+)'
+    r'\s+endloop\s+endfacet'
+)
+
+# Binary STL header. Deliberately doesn't start with "solid", since some readers use that to (wrongly) guess a file is ASCII.
+_BINARY_STL_HEADER = "Binary STL written by Alibre Neutralizer".ljust(80, " ")
+
+# Facets are packed into binary this many at a time, with one struct.pack() call per batch
+_STL_FACETS_PER_BATCH = 4096
+
+
+def _is_ascii_stl(stl_path):
+    """Return True if ``stl_path`` is an ASCII STL file."""
+    # type: (str) -> bool
+    with open(stl_path, 'rb') as stl_file:
+        header = stl_file.read(84)
+    return _stl_header_is_ascii(header, os.path.getsize(stl_path))
+
+
+def _stl_header_is_ascii(header, file_size):
+    """Given the first 84 bytes of an STL file and its total size, return True if it's ASCII STL.
+    Binary STL headers are free-form and sometimes start with "solid" too, so a file only counts as ASCII if its size doesn't match the
+    size a binary STL with its facet count would have."""
+    # type: (str, int) -> bool
+    if not header.lstrip().startswith("solid"):
+        return False
+    if len(header) == 84 and file_size == 84 + 50 * struct.unpack("<I", header[80:84])[0]:
+        return False
+    return True
+
+
+def _iter_file_chunks(file_path, chunk_size):
+    """Yield the contents of a file in ``chunk_size`` pieces, memory-mapping the file when mmap is available.
+    Either way, only about one chunk is held in memory at a time."""
+    # type: (str, int) -> iter[str]
+    with open(file_path, 'rb') as source_file:
+        file_size = os.path.getsize(file_path)
+        if mmap is not None and file_size > 0:
+            mapped_file = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for offset in range(0, file_size, chunk_size):
+                    yield mapped_file[offset:offset + chunk_size]
+            finally:
+                mapped_file.close()
+        else:
+            while True:
+                chunk = source_file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def _convert_ascii_stl_to_binary(stl_path, chunk_size=16 * 1024 * 1024):
+    """Rewrite an ASCII STL file as binary STL, in place. Returns False (and leaves the file alone) if it's already binary.
+
+    The file is parsed one chunk at a time, so memory use stays bounded no matter how big the mesh is.
+    Facets are parsed with one regular expression pass per chunk and packed into binary in batches, rather than facet by facet.
+    If any facet can't be parsed, the original file is left untouched and an exception is raised.
+    This never touches Alibre, so it's safe to call from a post-export worker."""
+    # type: (str, int) -> bool
+    if not _is_ascii_stl(stl_path):
+        return False
+
+    batch_struct = struct.Struct("<" + "12fH" * _STL_FACETS_PER_BATCH)
+    facet_struct = struct.Struct("<12fH")
+    facet_count = 0
+    binary_path = stl_path + ".binary-tmp"
+    with open(binary_path, 'wb') as binary_file:
+        # Facet count is patched in at the end, once we know it
+        binary_file.write(_BINARY_STL_HEADER)
+        binary_file.write(struct.pack("<I", 0))
+
+        pending_values = []
+        leftover = ""
+        for chunk in _iter_file_chunks(stl_path, chunk_size):
+            text = leftover + chunk
+            # Only parse up to the last complete facet; the rest waits for the next chunk
+            end = text.rfind("endfacet")
+            if end == -1:
+                leftover = text
+                continue
+            end += len("endfacet")
+            parsable, leftover = text[:end], text[end:]
+
+            matches = _ASCII_STL_FACET_PATTERN.findall(parsable)
+            if len(matches) != parsable.count("endfacet"):
+                binary_file.close()
+                os.remove(binary_path)
+                raise Exception("Could not parse every facet in ASCII STL file {0}".format(stl_path))
+
+            for match in matches:
+                pending_values.extend(map(float, match))
+                pending_values.append(0) # Attribute byte count
+            facet_count += len(matches)
+
+            # Flush full batches with a single pack() each
+            batch_value_count = 13 * _STL_FACETS_PER_BATCH
+            full_batches_end = len(pending_values) - len(pending_values) % batch_value_count
+            for batch_start in range(0, full_batches_end, batch_value_count):
+                binary_file.write(batch_struct.pack(*pending_values[batch_start:batch_start + batch_value_count]))
+            pending_values = pending_values[full_batches_end:]
+
+        if "endfacet" in leftover:
+            binary_file.close()
+            os.remove(binary_path)
+            raise Exception("Could not parse every facet in ASCII STL file {0}".format(stl_path))
+        for value_start in range(0, len(pending_values), 13):
+            binary_file.write(facet_struct.pack(*pending_values[value_start:value_start + 13]))
+
+        binary_file.seek(80)
+        binary_file.write(struct.pack("<I", facet_count))
+
+    _replace_file(binary_path, stl_path)
+    return True
+
+
+def _iter_stl_triangles(stl_path, chunk_size=16 * 1024 * 1024):
+    """Yield the vertices of every triangle in an STL file, in file order, as 9-tuples of floats. Facet normals are ignored.
+    Handles ASCII and binary STL, gzipped or not (going by a ``.gz`` extension). The file is read one chunk at a time, so memory use stays bounded."""
+    # type: (str, int) -> iter[tuple]
+    if stl_path.endswith(".gz"):
+        # A gzip file ends with the size of what's in it (modulo 4 GB, which is more than any STL export worth comparing)
+        with open(stl_path, 'rb') as compressed_file:
+            compressed_file.seek(-4, os.SEEK_END)
+            file_size = struct.unpack("<I", compressed_file.read(4))[0]
+        stl_file = gzip.open(stl_path, 'rb')
+    else:
+        file_size = os.path.getsize(stl_path)
+        stl_file = open(stl_path, 'rb')
+    try:
+        header = stl_file.read(84)
+        if _stl_header_is_ascii(header, file_size):
+            leftover = header
+            while True:
+                chunk = stl_file.read(chunk_size)
+                text = leftover + chunk
+                # Only parse up to the last complete facet; the rest waits for the next chunk (at the end, the rest is all there is)
+                if chunk:
+                    end = text.rfind("endfacet")
+                    if end == -1:
+                        leftover = text
+                        continue
+                    end += len("endfacet")
+                else:
+                    end = len(text)
+                parsable, leftover = text[:end], text[end:]
+                for match in _ASCII_STL_FACET_PATTERN.findall(parsable):
+                    yield tuple(map(float, match[3:12]))
+                if not chunk:
+                    return
+
+        facet_struct = struct.Struct("<12fH")
+        remaining_count = struct.unpack("<I", header[80:84])[0]
+        while remaining_count > 0:
+            facet_count = min(remaining_count, max(1, chunk_size // 50))
+            data = stl_file.read(50 * facet_count)
+            if len(data) < 50 * facet_count:
+                raise Exception("Binary STL file {0} ends before its last facet".format(stl_path))
+            for offset in range(0, len(data), 50):
+                yield facet_struct.unpack_from(data, offset)[3:12]
+            remaining_count -= facet_count
+    finally:
+        stl_file.close()
+
+
+def _triangles_match(triangle_a, triangle_b, tolerance):
+    """Return True if two triangles (9-tuples of vertex coordinates) are the same to within ``tolerance`` on every coordinate, once their vertices
+    are rotated to line up. The vertices are only rotated, never reordered, so the winding (and therefore the facet orientation) has to match."""
+    # type: (tuple, tuple, float) -> bool
+    for first in (0, 3, 6):
+        rotated_b = triangle_b[first:] + triangle_b[:first]
+        for value_a, value_b in zip(triangle_a, rotated_b):
+            if abs(value_a - value_b) > tolerance:
+                break
+        else:
+            return True
+    return False
+
+
+def _get_triangle_pool_cells(vertex, tolerance, nearby=False):
+    """Return the keys of the triangle pool cells (see ``_take_matching_triangle()``) a vertex is filed under, or with ``nearby``,
+    the cells any vertex within ``tolerance`` of it could be filed under."""
+    # type: (tuple, float, bool) -> list[tuple]
+    if tolerance <= 0:
+        return [tuple(vertex)]
+    # Cells are a few tolerances wide, so a vertex only reaches into a neighbouring cell along an axis when it's that close to the cell's edge
+    cell_size = 4 * tolerance
+    axis_cells = []
+    for value in vertex:
+        cell = int(value // cell_size)
+        cells = [cell]
+        if nearby:
+            if value - cell * cell_size <= tolerance:
+                cells.append(cell - 1)
+            if (cell + 1) * cell_size - value <= tolerance:
+                cells.append(cell + 1)
+        axis_cells.append(cells)
+    return list(itertools.product(*axis_cells))
+
+
+def _add_to_triangle_pool(pool, triangle, tolerance):
+    """File a triangle in ``pool`` (see ``_take_matching_triangle()``), under the cell of each of its vertices."""
+    # type: (dict, tuple, float) -> None
+    for cell in set(_get_triangle_pool_cells(triangle[i:i + 3], tolerance)[0] for i in (0, 3, 6)):
+        pool.setdefault(cell, []).append(triangle)
+
+
+def _take_matching_triangle(pool, triangle, tolerance):
+    """Look for a triangle matching ``triangle`` (see ``_triangles_match()``) in ``pool``, and if there is one, take it out and return True.
+
+    A pool is a dict of triangles waiting for a match, filed by position: a grid of cells keyed by their integer coordinates, each holding the
+    triangles with a vertex in it. A match has a vertex within ``tolerance`` of the triangle's first one, so only the cells that vertex
+    could be in need looking at, however big the pool gets."""
+    # type: (dict, tuple, float) -> bool
+    for cell in _get_triangle_pool_cells(triangle[0:3], tolerance, nearby=True):
+        for candidate in pool.get(cell, ()):
+            if _triangles_match(triangle, candidate, tolerance):
+                for candidate_cell in set(_get_triangle_pool_cells(candidate[i:i + 3], tolerance)[0] for i in (0, 3, 6)):
+                    pool[candidate_cell].remove(candidate)
+                    if not pool[candidate_cell]:
+                        del pool[candidate_cell]
+                return True
+    return False
+
+
+def _stl_geometry_matches(stl_path_a, stl_path_b, tolerance):
+    """Return True if two STL files describe the same triangles (see ``_triangles_match()``), regardless of triangle order, vertex rotation,
+    ASCII vs binary, or compression.
+
+    Both files are streamed side by side. Triangles that come in the same order in both are compared and dropped straight away, so a re-export
+    written in the same order (the usual case) only ever holds one triangle from each file. The rest wait in a pool for their match from
+    the other file, so memory use only grows with how much the order differs."""
+    # type: (str, str, float) -> bool
+    # Cheap check first: byte-identical files obviously match
+    if os.path.getsize(stl_path_a) == os.path.getsize(stl_path_b) and _files_are_identical(stl_path_a, stl_path_b):
+        return True
+
+    pool_a = {}
+    pool_b = {}
+    for triangle_a, triangle_b in itertools.izip_longest(_iter_stl_triangles(stl_path_a), _iter_stl_triangles(stl_path_b)):
+        if triangle_a is None or triangle_b is None:
+            return False # Different numbers of triangles
+        if _triangles_match(triangle_a, triangle_b, tolerance):
+            continue
+        if not _take_matching_triangle(pool_b, triangle_a, tolerance):
+            _add_to_triangle_pool(pool_a, triangle_a, tolerance)
+        if not _take_matching_triangle(pool_a, triangle_b, tolerance):
+            _add_to_triangle_pool(pool_b, triangle_b, tolerance)
+    return not pool_a and not pool_b
+
+
+def _hash_file(file_path, chunk_size=1024 * 1024):
+    """Return the SHA-1 of a file's contents, as hex."""
+    # type: (str, int) -> str
+    file_hash = hashlib.sha1()
+    for chunk in _iter_file_chunks(file_path, chunk_size):
+        file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _files_are_identical(path_a, path_b, chunk_size=1024 * 1024):
+    """Return True if two files have exactly the same contents."""
+    # type: (str, str, int) -> bool
+    with open(path_a, 'rb') as file_a:
+        with open(path_b, 'rb') as file_b:
+            while True:
+                chunk_a = file_a.read(chunk_size)
+                if chunk_a != file_b.read(chunk_size):
+                    return False
+                if not chunk_a:
+                    return True
+
+
+def _create_link(source_path, link_path, symbolic=False):
+    """Create a hard link (or, with ``symbolic``, a symbolic link) at ``link_path`` to ``source_path``.
+    IronPython on Windows has neither os.link nor os.symlink, so that goes through the Win32 API instead. Raises OSError if it can't be done."""
+    # type: (str, str, bool) -> None
+    if symbolic and hasattr(os, "symlink"):
+        os.symlink(source_path, link_path)
+        return
+    if not symbolic and hasattr(os, "link"):
+        os.link(source_path, link_path)
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+    except (ImportError, AttributeError):
+        raise OSError("Links aren't supported here.")
+    if symbolic:
+        # 0x2 = SYMBOLIC_LINK_FLAG_ALLOW_UNPRIVILEGED_CREATE (needs Developer Mode; otherwise Alibre has to run as administrator)
+        created = kernel32.CreateSymbolicLinkW(unicode(link_path), unicode(source_path), 0x2)
+    else:
+        created = kernel32.CreateHardLinkW(unicode(link_path), unicode(source_path), None)
+    if not created:
+        raise OSError(ctypes.GetLastError(), "Could not link {0} to {1}".format(link_path, source_path))
+
+
+def _get_temporary_path(file_path):
+    """Return a temporary path next to ``file_path``, keeping its extension (some Alibre exporters care about the extension)."""
+    # type: (str) -> str
+    directory, file_name = os.path.split(file_path)
+    return os.path.join(directory, "~neutralizer-tmp-" + file_name)
+
+
+def _replace_file(source_path, destination_path):
+    """Move ``source_path`` to ``destination_path``, atomically replacing whatever is already there: anyone looking at ``destination_path``
+    sees either the old file or the new one, never neither (the work queue relies on that). Both paths need to be on the same volume."""
+    # type: (str, str) -> None
+    if os.name != "nt":
+        # POSIX rename() already replaces atomically
+        os.rename(source_path, destination_path)
+        return
+    # Windows' os.rename() won't replace an existing file, and removing it first would leave a gap, so this goes through the Win32 API instead
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+    except (ImportError, AttributeError):
+        raise OSError("Can't replace {0} atomically here.".format(destination_path))
+    # 0x1 = MOVEFILE_REPLACE_EXISTING
+    if not kernel32.MoveFileExW(unicode(source_path), unicode(destination_path), 0x1):
+        raise OSError(ctypes.GetLastError(), "Could not move {0} to {1}".format(source_path, destination_path))
+
+
+def _write_run_archive(archive_path, base_path, file_paths):
+    """Write ``file_paths`` into a zip archive at ``archive_path``, named relative to ``base_path``.
+
+    The archive is deterministic: entries are written in sorted order, with a fixed timestamp and permissions,
+    so two runs that produce the same files produce a byte-identical archive.
+    Files that are already compressed (STEP-Z, gzip) are stored as-is instead of being compressed a second time."""
+    # type: (str, str, list[str]) -> None
+    archive_directory = os.path.dirname(archive_path)
+    if not os.path.exists(archive_directory):
+        os.makedirs(archive_directory)
+
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, True) as archive:
+        for file_path in sorted(file_paths):
+            if os.path.normcase(os.path.abspath(file_path)) == os.path.normcase(os.path.abspath(archive_path)):
+                continue # Don't try to archive the archive
+            if not os.path.exists(file_path):
+                continue # The export failed, and that's already been reported
+            # Always use forward slashes inside the archive, whatever OS we're on
+            entry_name = os.path.relpath(file_path, base_path).replace(os.sep, "/")
+            if file_path.endswith(".stpZ") or file_path.endswith(".gz"):
+                _add_file_to_zip(archive, file_path, entry_name, zipfile.ZIP_STORED)
+            else:
+                _add_file_to_zip(archive, file_path, entry_name, zipfile.ZIP_DEFLATED)
+
+
+def _add_file_to_zip(archive, file_path, entry_name, compress_type):
+    """Add the file at ``file_path`` to ``archive`` as ``entry_name``, with a fixed timestamp and permissions.
+    ``ZipFile.write()`` streams the file in small chunks, so even a huge export never has to fit in memory, but it takes the timestamp and
+    permissions from the file itself. So they're overwritten afterwards, in the entry and in the local header that's already been written."""
+    # type: (zipfile.ZipFile, str, str, int) -> None
+    archive.write(file_path, entry_name, compress_type)
+    entry = archive.filelist[-1]
+    entry.date_time = (1980, 1, 1, 0, 0, 0)
+    entry.external_attr = 0644 << 16
+    # Same test ZipFile.write() uses, so the header comes out the same length as the one it's replacing
+    zip64 = archive._allowZip64 and entry.file_size * 1.05 > zipfile.ZIP64_LIMIT
+    end_position = archive.fp.tell()
+    archive.fp.seek(entry.header_offset)
+    archive.fp.write(entry.FileHeader(zip64))
+    archive.fp.seek(end_position)
+
+
+def _get_script_argument(arguments, name):
+    """Return the value after ``name`` in the script's ``Arguments`` (e.g. ``["--config", "C:\\x.xml"]``), or None if it's not there."""
+    # type: (list[str], str) -> str | None
+    if name in arguments and arguments.index(name) + 1 < len(arguments):
+        return arguments[arguments.index(name) + 1]
+    return None
+
 def main():
     """This is the entry point of the program.
     Even though you don't HAVE to use a main function in Python scripts, I prefer it
     since it limits the scope of the variables inside this function."""
 
     window_name = "Alibre Neutralizer"
+
+    # Headless worker processes (started by the add-on's WorkerPool) get their config as arguments, and have nobody to show dialogs to
+    arguments = list(globals().get("Arguments") or [])
+    if _get_script_argument(arguments, "--role") == FileWorkQueue.WORKER:
+        neutralizer = AlibreNeutralizer(CurrentAssembly(), _get_script_argument(arguments, "--config"), work_queue_role=FileWorkQueue.WORKER)
+        neutralizer.export_all()
+        return
     
     # Take user input (ask for a config file)
     cfg_file_path = Windows().OpenFileDialog("Select Neutralizer Config File", "XML Files | *.XML", ".XML")
@@ -641,17 +4047,21 @@ def main():
         return
 
     # Create an instance using configuration from XML file
-    neutralizer = AlibreNeutralizer(CurrentAssembly(), cfg_file_path)
+    try:
+        neutralizer = AlibreNeutralizer(CurrentAssembly(), cfg_file_path, worker_pool=globals().get("WorkerPool"))
+    except ConfigurationError as e:
+        Windows().ErrorDialog("{0}\n\nAlibre Neutralizer will close now, and nothing will be exported.".format(e), window_name)
+        return
 
     # Now that we've created an AlibreNeutralizer, give the user a quick summary of how we understood the config file
     # This is their last opportunity to cancel
     continue_window_prompt = """
-    Successfully read the config file, which contains {edirs} export directives.
+    Successfully read the config file, which contains {edirs} export directives (from {configs} config file(s)).
 
     Would you like to start Alibre Neutralizer's export process, following that configuration?
     
     THIS MAY DELETE FILES, if you've enabled the pre-export purge option on any of your export directives.
-    """.format(edirs=len(neutralizer.export_directives))
+    """.format(edirs=len(neutralizer.export_directives), configs=len(neutralizer.config_file_paths))
     continue_choice = Windows().QuestionDialog(
         continue_window_prompt,
         window_name
@@ -0,0 +1,52 @@
+# Shared helpers for the benchmark scripts in this folder.
+# The benchmarks run under plain CPython 2.7 or a standalone IronPython 2.7 (ipy.exe), not inside Alibre. The helpers they time never touch
+# Alibre, so all the export script needs is a stand-in for the Alibre Script API that keeps main() from asking for a config file.
+
+import os
+import sys
+import time
+import types
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "alibre-neutralizer.py")
+
+
+class _NoDialogs:
+    """Stands in for Alibre Script's ``Windows()``. The config file dialog always comes back empty, so ``main()`` returns without exporting anything."""
+
+    def OpenFileDialog(self, *args):
+        return ""
+
+    def ErrorDialog(self, *args):
+        pass
+
+
+def load_neutralizer():
+    """Run alibre-neutralizer.py against a stand-in for the Alibre Script API, and return its globals (functions, classes and all)."""
+    alibre_script = types.ModuleType("AlibreScript")
+    alibre_script.Windows = _NoDialogs
+    sys.modules["AlibreScript"] = alibre_script
+    neutralizer = {"__name__": "alibre_neutralizer", "__file__": SCRIPT_PATH}
+    execfile(SCRIPT_PATH, neutralizer)
+    return neutralizer
+
+
+def best_of(repeats, function, setup=None):
+    """Call ``function()`` ``repeats`` times, calling ``setup()`` (untimed) before each one.
+    Returns the fastest wall-clock time in seconds, and what the last call returned."""
+    best_seconds = None
+    result = None
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.time()
+        result = function()
+        seconds = time.time() - started
+        if best_seconds is None or seconds < best_seconds:
+            best_seconds = seconds
+    return best_seconds, result
+
+
+def describe_runtime():
+    """Return a one-line description of the Python running the benchmark."""
+    implementation = "IronPython" if sys.platform == "cli" else "CPython"
+    return "{0} {1} on {2}".format(implementation, sys.version.split()[0], sys.platform)
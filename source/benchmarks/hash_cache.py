@@ -0,0 +1,98 @@
+# Benchmark: hashing output files with HashService (cold and from its cache), compared with plain read-and-hash.
+#
+# Usage (CPython 2.7 or IronPython 2.7, from anywhere):
+#     python source/benchmarks/hash_cache.py [--files 48] [--size-mb 16] [--workers 4] [--repeats 3] [--directory <scratch directory>]
+#
+# Writes --files random files of --size-mb each to the scratch directory (a new temporary directory by default), then hashes them.
+# They were just written, so they're usually in the OS page cache: cold numbers measure hashing, not the disk. To measure the disk too,
+# point --directory at files you've already generated, after clearing the page cache (or on a network share).
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+
+from common import best_of, describe_runtime, load_neutralizer
+
+
+def write_files(directory, file_count, size_mb):
+    """Write ``file_count`` files of ``size_mb`` MB of random bytes to ``directory`` (reusing any already there), and return their paths."""
+    file_paths = []
+    for i in range(file_count):
+        file_path = os.path.join(directory, "output-{0:04d}.bin".format(i))
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != size_mb * 1024 * 1024:
+            with open(file_path, 'wb') as output_file:
+                for _ in range(size_mb):
+                    output_file.write(os.urandom(1024 * 1024))
+        file_paths.append(file_path)
+    return file_paths
+
+
+def read_and_hash(file_paths):
+    """The baseline: read each file whole, and hash it, one at a time."""
+    file_hashes = {}
+    for file_path in file_paths:
+        with open(file_path, 'rb') as output_file:
+            file_hashes[file_path] = hashlib.sha1(output_file.read()).hexdigest()
+    return file_hashes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Alibre Neutralizer's HashService against plain read-and-hash.")
+    parser.add_argument("--files", type=int, default=48, help="Number of files to hash (default: 48)")
+    parser.add_argument("--size-mb", type=int, default=16, help="Size of each file, in MB (default: 16)")
+    parser.add_argument("--workers", type=int, default=4, help="Threads for the threaded HashService runs, like HashWorkerCount (default: 4)")
+    parser.add_argument("--repeats", type=int, default=3, help="Times to run each case; the fastest run is reported (default: 3)")
+    parser.add_argument("--directory", help="Scratch directory for the test files (default: a new temporary directory, deleted afterwards)")
+    arguments = parser.parse_args()
+
+    neutralizer = load_neutralizer()
+    HashService = neutralizer["HashService"]
+    directory = arguments.directory or tempfile.mkdtemp(prefix="neutralizer-hash-benchmark-")
+    try:
+        print "Runtime: {0}".format(describe_runtime())
+        print "Writing {0} files of {1} MB...".format(arguments.files, arguments.size_mb)
+        file_paths = write_files(directory, arguments.files, arguments.size_mb)
+        total_mb = float(arguments.files * arguments.size_mb)
+        cache_path = os.path.join(directory, "hash-cache.json")
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+        expected_hashes = read_and_hash(file_paths)
+        cases = []
+        cases.append(("read-and-hash baseline",) + best_of(arguments.repeats, lambda: read_and_hash(file_paths)))
+        # A new HashService every time, so nothing comes from its in-memory cache
+        cases.append(("HashService, cold, 1 thread",) + best_of(arguments.repeats, lambda: HashService(worker_count=0).hash_files(file_paths)))
+        cases.append(("HashService, cold, {0} threads".format(arguments.workers),) +
+                     best_of(arguments.repeats, lambda: HashService(worker_count=arguments.workers).hash_files(file_paths)))
+
+        # Warm: what the next run sees, loading the cache a previous run saved (the load is timed too)
+        hash_service = HashService(cache_path, arguments.workers)
+        hash_service.hash_files(file_paths)
+        hash_service.save()
+        warm_services = []
+
+        def _hash_warm():
+            warm_services.append(HashService(cache_path, arguments.workers))
+            return warm_services[-1].hash_files(file_paths)
+        cases.append(("HashService, from the cache",) + best_of(arguments.repeats, _hash_warm))
+
+        for name, _, file_hashes in cases:
+            if file_hashes != expected_hashes:
+                raise Exception("{0} got different hashes from the baseline".format(name))
+        if warm_services[-1].hashed_count != 0:
+            raise Exception("HashService read {0} files, even though none of them changed".format(warm_services[-1].hashed_count))
+
+        baseline_seconds = cases[0][1]
+        print "Hashed {0:.0f} MB in {1} files. Best of {2}:".format(total_mb, arguments.files, arguments.repeats)
+        for name, seconds, _ in cases:
+            print "  {0:<32} {1:8.3f} s  {2:8.1f} MB/s  {3:8.1f}x the baseline".format(
+                name, seconds, total_mb / max(seconds, 1e-6), baseline_seconds / max(seconds, 1e-6))
+    finally:
+        if arguments.directory is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
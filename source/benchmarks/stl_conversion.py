@@ -0,0 +1,112 @@
+# Benchmark: converting ASCII STL exports to binary (ConvertSTLToBinary), compared with a naive line-by-line converter.
+#
+# Usage (CPython 2.7 or IronPython 2.7, from anywhere):
+#     python source/benchmarks/stl_conversion.py [--triangles 1000000] [--repeats 3] [--directory <scratch directory>]
+#
+# Writes a random ASCII STL mesh in the layout Alibre uses, then converts copies of it. Needs room for about 5 times the ASCII file's size
+# (about 240 MB for the default million triangles) in the scratch directory, which defaults to a new temporary directory.
+
+import argparse
+import os
+import random
+import shutil
+import struct
+import tempfile
+
+from common import best_of, describe_runtime, load_neutralizer
+
+
+def write_ascii_stl(stl_path, triangle_count, seed=0):
+    """Write ``triangle_count`` random triangles to ``stl_path`` as ASCII STL, formatted the way Alibre's ExportSTL() writes it."""
+    generator = random.Random(seed)
+    with open(stl_path, 'wb') as stl_file:
+        stl_file.write("solid benchmark\n")
+        for _ in range(triangle_count):
+            values = [generator.uniform(-1000.0, 1000.0) for _ in range(12)]
+            stl_file.write(
+                "  facet normal {0:e} {1:e} {2:e}\n"
+                "    outer loop\n"
+                "      vertex {3:e} {4:e} {5:e}\n"
+                "      vertex {6:e} {7:e} {8:e}\n"
+                "      vertex {9:e} {10:e} {11:e}\n"
+                "    endloop\n"
+                "  endfacet\n".format(*values)
+            )
+        stl_file.write("endsolid benchmark\n")
+
+
+def convert_line_by_line(ascii_path, binary_path):
+    """The obvious converter, as a baseline: read a line at a time, and pack each facet on its own."""
+    facet_struct = struct.Struct("<12fH")
+    facet_count = 0
+    values = []
+    with open(ascii_path, 'rb') as ascii_file:
+        with open(binary_path, 'wb') as binary_file:
+            binary_file.write(" " * 80)
+            binary_file.write(struct.pack("<I", 0))
+            for line in ascii_file:
+                words = line.split()
+                if not words:
+                    continue
+                if words[0] == "facet":
+                    values = [float(word) for word in words[2:5]]
+                elif words[0] == "vertex":
+                    values.extend(float(word) for word in words[1:4])
+                elif words[0] == "endfacet":
+                    binary_file.write(facet_struct.pack(*(values + [0])))
+                    facet_count += 1
+            binary_file.seek(80)
+            binary_file.write(struct.pack("<I", facet_count))
+    return facet_count
+
+
+def get_binary_facet_count(binary_path):
+    with open(binary_path, 'rb') as binary_file:
+        binary_file.seek(80)
+        return struct.unpack("<I", binary_file.read(4))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Alibre Neutralizer's ASCII to binary STL conversion.")
+    parser.add_argument("--triangles", type=int, default=1000000, help="Triangles in the test mesh (default: 1000000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Times to run each converter; the fastest run is reported (default: 3)")
+    parser.add_argument("--directory", help="Scratch directory for the test files (default: a new temporary directory, deleted afterwards)")
+    arguments = parser.parse_args()
+
+    neutralizer = load_neutralizer()
+    directory = arguments.directory or tempfile.mkdtemp(prefix="neutralizer-stl-benchmark-")
+    try:
+        ascii_path = os.path.join(directory, "mesh-ascii.stl")
+        converted_path = os.path.join(directory, "mesh-converted.stl")
+        baseline_path = os.path.join(directory, "mesh-baseline.stl")
+
+        print "Runtime: {0}".format(describe_runtime())
+        print "Writing {0} random triangles as ASCII STL...".format(arguments.triangles)
+        write_ascii_stl(ascii_path, arguments.triangles)
+        ascii_mb = os.path.getsize(ascii_path) / (1024.0 * 1024.0)
+
+        # The neutralizer converts in place, so every run starts from a fresh copy (the copy isn't timed)
+        converter_seconds, _ = best_of(
+            arguments.repeats,
+            lambda: neutralizer["_convert_ascii_stl_to_binary"](converted_path),
+            setup=lambda: shutil.copyfile(ascii_path, converted_path)
+        )
+        baseline_seconds, _ = best_of(arguments.repeats, lambda: convert_line_by_line(ascii_path, baseline_path))
+
+        for path in (converted_path, baseline_path):
+            if get_binary_facet_count(path) != arguments.triangles:
+                raise Exception("{0} has {1} facets, not {2}".format(path, get_binary_facet_count(path), arguments.triangles))
+        binary_mb = os.path.getsize(converted_path) / (1024.0 * 1024.0)
+
+        print "ASCII {0:.1f} MB -> binary {1:.1f} MB ({2:.2f}x smaller)".format(ascii_mb, binary_mb, ascii_mb / binary_mb)
+        print "Best of {0}:".format(arguments.repeats)
+        for name, seconds in (("_convert_ascii_stl_to_binary()", converter_seconds), ("line-by-line baseline", baseline_seconds)):
+            print "  {0:<32} {1:7.2f} s  {2:7.1f} MB/s  {3:10.0f} triangles/s".format(
+                name, seconds, ascii_mb / seconds, arguments.triangles / seconds)
+    finally:
+        if arguments.directory is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# A simulated Alibre Script API, so the export script can be run (and tested) without Alibre, under CPython 2.7 or a standalone IronPython 2.7.
+#
+# load_neutralizer() runs alibre-neutralizer.py against the simulator and returns the script's globals (its classes and functions).
+# build_product() makes a small simulated product on disk, and write_config() a config file for it. The simulated exporters write a short
+# text file naming what was exported and what the source file held (an ASCII STL for ExportSTL()), and every export is logged in EXPORTS.
+
+import contextlib
+import math
+import os
+import sys
+import StringIO
+import threading
+import time
+import types
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "alibre-neutralizer.py")
+
+PROPERTY_NAMES = (
+    "Comment", "CostCenter", "CreatedBy", "CreatedDate", "CreatingApplication", "Density", "Description", "DocumentNumber",
+    "EngineeringApprovalDate", "EngineeringApprovedBy", "EstimatedCost", "Keywords", "LastAuthor", "LastUpdateDate",
+    "ManufacturingApprovedBy", "ModifiedInformation", "Number", "Product", "ReceivedFrom", "Revision", "StockSize",
+    "Supplier", "Title", "Vendor", "WebLink",
+)
+
+# (export type, component FileName, path) for every export, in order, from every thread
+EXPORTS = []
+_exports_lock = threading.Lock()
+
+# How long each simulated export takes, in seconds. Slow exports give several processes sharing a work queue a chance to interleave.
+EXPORT_SECONDS = 0.0
+
+
+class Parameter(object):
+    def __init__(self, name, value):
+        self.Name = name
+        self.Equation = str(value)
+        self.Value = value
+        self.Units = "mm"
+        self.Type = "Distance"
+        self.Comment = ""
+
+
+class Configuration(object):
+    """One of a simulated component's configurations. Activating it sets the component's attributes in ``changes`` (a dict)."""
+
+    def __init__(self, component, name, changes=None):
+        self._component = component
+        self.Name = name
+        self.IsActive = False
+        self._changes = changes or {}
+
+    def Activate(self):
+        for configuration in self._component.Configurations:
+            configuration.IsActive = configuration is self
+        for name, value in self._changes.items():
+            setattr(self._component, name, value)
+
+
+class _SimulatedComponent(object):
+    """What parts and assemblies have in common: a file, its properties and parameters, and the exporters."""
+
+    def __init__(self, name, file_path):
+        self.Name = name + "<1>"
+        self.FileName = file_path
+        if not os.path.exists(file_path):
+            with open(file_path, 'w') as source_file:
+                source_file.write("Simulated source file for " + name)
+        for property_name in PROPERTY_NAMES:
+            setattr(self, property_name, "")
+        self.Number = "PN-" + name
+        self.Parameters = [Parameter("D3", 3), Parameter("D1", 1), Parameter("D2", 2)]
+        self.Configurations = [Configuration(self, "Config<1>")]
+        self.Configurations[0].IsActive = True
+        # Where this instance sits in the assembly it's placed in: 3 rows of a row-major transform. Tests can move it with place().
+        self.Placement = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0]]
+        self._parent = None
+
+    def place(self, rotation_degrees=0.0, translation=(0.0, 0.0, 0.0)):
+        """Place this instance in its assembly: rotated by ``rotation_degrees`` about Z, then moved by ``translation``. Returns the instance."""
+        cosine = math.cos(math.radians(rotation_degrees))
+        sine = math.sin(math.radians(rotation_degrees))
+        self.Placement = [[cosine, -sine, 0.0, translation[0]], [sine, cosine, 0.0, translation[1]], [0.0, 0.0, 1.0, translation[2]]]
+        return self
+
+    def _map_to_top_level(self, point):
+        # Like Alibre Script, placed instances map points all the way up to the top-level assembly, not just into their own parent
+        point = [sum(row[i] * point[i] for i in range(3)) + row[3] for row in self.Placement]
+        if isinstance(self._parent, AssembledSubAssembly):
+            return self._parent._map_to_top_level(point)
+        return point
+
+    def _get_source(self):
+        with open(self.FileName, 'r') as source_file:
+            return source_file.read()
+
+    def _export(self, export_type, path, content):
+        if EXPORT_SECONDS:
+            time.sleep(EXPORT_SECONDS)
+        with _exports_lock:
+            EXPORTS.append((export_type, self.FileName, path))
+        with open(path, 'w') as export_file:
+            export_file.write(content)
+
+    def ExportSTEP203(self, path, *args):
+        self._export("STEP203", path, "STEP203 of {0}: {1}\n".format(self.FileName, self._get_source()))
+
+    def ExportSTEP214(self, path, *args):
+        self._export("STEP214", path, "STEP214 of {0}: {1}\n".format(self.FileName, self._get_source()))
+
+    def ExportSAT(self, path, *args):
+        self._export("SAT", path, "SAT of {0}: {1}\n".format(self.FileName, self._get_source()))
+
+    def ExportIGES(self, path, *args):
+        self._export("IGES", path, "IGES of {0}: {1}\n".format(self.FileName, self._get_source()))
+
+    def ExportSTL(self, path, *args):
+        self._export("STL", path, "solid simulated\n facet normal 0 0 1\n  outer loop\n   vertex 0 0 0\n   vertex 1 0 0\n   vertex 0 1 0\n"
+                                  "  endloop\n endfacet\nendsolid simulated\n")
+
+
+class Part(_SimulatedComponent):
+    pass
+
+
+class AssembledPart(_SimulatedComponent):
+    def PartPointtoAssemblyPoint(self, point):
+        return self._map_to_top_level(point)
+
+
+def _adopt(assembly):
+    for child in assembly.Parts + assembly.SubAssemblies:
+        child._parent = assembly
+
+
+class Assembly(_SimulatedComponent):
+    def __init__(self, name, file_path, parts, subassemblies):
+        _SimulatedComponent.__init__(self, name, file_path)
+        self.Parts = parts
+        self.SubAssemblies = subassemblies
+        _adopt(self)
+
+
+class AssembledSubAssembly(_SimulatedComponent):
+    def __init__(self, name, file_path, parts, subassemblies):
+        _SimulatedComponent.__init__(self, name, file_path)
+        self.Parts = parts
+        self.SubAssemblies = subassemblies
+        _adopt(self)
+
+    def SubAssemblyPointtoAssemblyPoint(self, point):
+        return self._map_to_top_level(point)
+
+
+class Windows(object):
+    """No dialogs: the config file dialog always comes back empty, so the script's ``main()`` returns without exporting anything."""
+
+    def OpenFileDialog(self, *args):
+        return ""
+
+    def ErrorDialog(self, *args):
+        pass
+
+    def InfoDialog(self, *args):
+        pass
+
+    def QuestionDialog(self, *args):
+        return False
+
+
+def CurrentAssembly():
+    raise Exception("There's no current assembly in the simulator. Pass one to AlibreNeutralizer yourself.")
+
+
+def load_neutralizer():
+    """Run alibre-neutralizer.py against the simulator, and return its globals."""
+    alibre_script = types.ModuleType("AlibreScript")
+    for name in ("Parameter", "Configuration", "Part", "AssembledPart", "Assembly", "AssembledSubAssembly", "Windows", "CurrentAssembly"):
+        setattr(alibre_script, name, globals()[name])
+    sys.modules["AlibreScript"] = alibre_script
+    neutralizer = {"__name__": "alibre_neutralizer", "__file__": SCRIPT_PATH}
+    execfile(SCRIPT_PATH, neutralizer)
+    return neutralizer
+
+
+def build_product(directory):
+    """Make a simulated product in ``directory``, and return its root assembly. Like real Alibre, every placement is an object of its own:
+
+        root.AD_ASM
+            plate.AD_PRT, bolt.AD_PRT
+            sub.AD_ASM
+                plate.AD_PRT, bolt.AD_PRT
+                inner.AD_ASM (bolt.AD_PRT, nut.AD_PRT)
+            inner.AD_ASM (bolt.AD_PRT, nut.AD_PRT)
+    """
+    def part(name):
+        return AssembledPart(name, os.path.join(directory, name + ".AD_PRT"))
+
+    def subassembly(name, parts, subassemblies):
+        return AssembledSubAssembly(name, os.path.join(directory, name + ".AD_ASM"), parts, subassemblies)
+
+    inner = subassembly("inner", [part("bolt"), part("nut")], [])
+    sub = subassembly("sub", [part("plate"), part("bolt")], [inner])
+    return Assembly("root", os.path.join(directory, "root.AD_ASM"), [part("plate"), part("bolt")],
+                    [sub, subassembly("inner", [part("bolt"), part("nut")], [])])
+
+
+def write_config(config_path, settings="", directives=None):
+    """Write a config file exporting to ``./out`` next to it. ``settings`` is extra XML for the top level, and ``directives`` the
+    ``<ExportDirective>`` elements (by default, a STEP214 and a CSV_Properties export of everything)."""
+    if directives is None:
+        directives = (
+            "<ExportDirective><type>STEP214</type><RelativeExportPath>./STEPs/{Number}.stp</RelativeExportPath></ExportDirective>"
+            "<ExportDirective><type>CSV_Properties</type><RelativeExportPath>./props/{Number}.csv</RelativeExportPath></ExportDirective>"
+        )
+    with open(config_path, 'w') as config_file:
+        config_file.write(
+            "<AlibreNeutralizerConfig><BaseExportPath>./out</BaseExportPath>{0}"
+            "<ExportDirectiveList>{1}</ExportDirectiveList></AlibreNeutralizerConfig>".format(settings, directives)
+        )
+    return config_path
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow everything printed inside the block (the script is chatty), and hand it back as a StringIO."""
+    old_stdout = sys.stdout
+    sys.stdout = StringIO.StringIO()
+    try:
+        yield sys.stdout
+    finally:
+        sys.stdout = old_stdout
@@ -0,0 +1,41 @@
+import difflib
+import os
+import re
+import unittest
+
+import alibre_simulator
+
+ADDON_SCRIPT_PATH = os.path.join(os.path.dirname(alibre_simulator.SCRIPT_PATH), "alibre-neutralizer-addon", "src", "Scripts", "alibre-neutralizer.py")
+PRINT_PATTERN = re.compile(r'^(\s*)print (.+)$')
+
+
+class AddOnCopyTest(unittest.TestCase):
+    """The add-on's copy of the script is the script itself, plus the OutputConsole class, with every print going to the console instead."""
+
+    def setUp(self):
+        with open(alibre_simulator.SCRIPT_PATH, 'r') as script_file:
+            self.script_lines = script_file.read().splitlines()
+        with open(ADDON_SCRIPT_PATH, 'r') as script_file:
+            self.addon_lines = script_file.read().splitlines()
+
+    def test_every_print_is_one_line(self):
+        # Prints are converted to OutputConsole.get().log() a line at a time, so one spread over several lines wouldn't be
+        for line_number, line in enumerate(self.script_lines, 1):
+            if PRINT_PATTERN.match(line):
+                try:
+                    compile(line.strip(), "line {0}".format(line_number), "exec")
+                except SyntaxError:
+                    self.fail("The print on line {0} of the script continues onto the next line".format(line_number))
+
+    def test_addon_copy_matches_the_script(self):
+        expected_lines = [PRINT_PATTERN.sub(r'\1OutputConsole.get().log(\2)', line) for line in self.script_lines]
+        self.assertEqual([line for line in self.addon_lines if PRINT_PATTERN.match(line)], [])
+        # The only difference left is the OutputConsole class, added in one place
+        opcodes = [opcode for opcode in difflib.SequenceMatcher(None, expected_lines, self.addon_lines, autojunk=False).get_opcodes() if opcode[0] != "equal"]
+        self.assertEqual(len(opcodes), 1, opcodes)
+        self.assertEqual(opcodes[0][0], "insert")
+        self.assertIn("class OutputConsole:", self.addon_lines[opcodes[0][3]:opcodes[0][4]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+class BillOfMaterialsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_occurrences_are_multiplied_through_repeated_subassemblies(self):
+        config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            directives="<ExportDirective><type>CSV_BOM</type><RelativeExportPath>./{Number}-bom.csv</RelativeExportPath></ExportDirective>"
+        )
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(alibre_simulator.build_product(self.directory), config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+
+        with open(os.path.join(self.directory, "out", "PN-root-bom.csv"), 'rb') as bom_file:
+            rows = list(csv.DictReader(bom_file))
+        # inner is placed once in sub and once in root, so its bolt and nut are there twice; the other bolts are in root and in sub
+        self.assertEqual(dict((row["Number"], int(row["Occurrences"])) for row in rows),
+                         {"PN-root": 1, "PN-plate": 2, "PN-bolt": 4, "PN-sub": 1, "PN-inner": 2, "PN-nut": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
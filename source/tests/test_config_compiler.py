@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+ConfigCompiler = neutralizer["ConfigCompiler"]
+ConfigurationError = neutralizer["ConfigurationError"]
+
+
+class PathTemplateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _compile(self, relative_export_path):
+        config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            directives="<ExportDirective><type>STEP214</type><RelativeExportPath>{0}</RelativeExportPath></ExportDirective>".format(relative_export_path)
+        )
+        return ConfigCompiler().compile(config_path)
+
+    def test_valid_template(self):
+        self._compile("./STEPs/{Number}-{Revision}.stp")
+
+    def test_broken_templates_are_configuration_errors(self):
+        for relative_export_path in ("./{Nmber}.stp", "./{Number.foo}.stp", "./{Number[}.stp", "./{Number.stp", "./{0}.stp"):
+            self.assertRaises(ConfigurationError, self._compile, relative_export_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import csv
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+def _add_configurations(component):
+    component.Configurations = [
+        alibre_simulator.Configuration(component, name, {"Description": name, "Parameters": [alibre_simulator.Parameter("Length", length)]})
+        for name, length in (("Short", 10), ("Long", 20))
+    ]
+    component.Configurations[0].Activate()
+    for child in itertools.chain(getattr(component, "Parts", []), getattr(component, "SubAssemblies", [])):
+        _add_configurations(child)
+
+
+class ConfigurationExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _read_csv(self, *path):
+        with open(os.path.join(self.directory, "out", *path), 'rb') as csv_file:
+            return list(csv.reader(csv_file))[1:]
+
+    def test_each_configuration_gets_its_own_properties_and_parameters(self):
+        config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            directives=(
+                "<ExportDirective><type>CSV_Properties</type><RelativeExportPath>./props/{Number}.csv</RelativeExportPath></ExportDirective>"
+                "<ExportDirective><type>CSV_Properties</type><RelativeExportPath>./props/{Number}-{Configuration}.csv</RelativeExportPath>"
+                "<Configurations>All</Configurations></ExportDirective>"
+                "<ExportDirective><type>CSV_Parameters</type><RelativeExportPath>./params/{Number}-{Configuration}.csv</RelativeExportPath>"
+                "<Configurations>All</Configurations></ExportDirective>"
+            )
+        )
+        product = alibre_simulator.build_product(self.directory)
+        _add_configurations(product)
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(product, config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+
+        for number in ("PN-root", "PN-bolt"):
+            self.assertIn(["Description", "Short"], self._read_csv("props", number + ".csv"))
+            for name, length in (("Short", "10"), ("Long", "20")):
+                self.assertIn(["Description", name], self._read_csv("props", "{0}-{1}.csv".format(number, name)))
+                self.assertEqual([row[:3] for row in self._read_csv("params", "{0}-{1}.csv".format(number, name))], [["Length", length, length]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+class LinkedExportCacheTest(unittest.TestCase):
+    """With ExportCacheLinks, outputs are hard links to cache entries, so the exports must never write through them."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = tempfile.mkdtemp()
+        self.config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            "<ExportCachePath>{0}</ExportCachePath><ExportCacheLinks>true</ExportCacheLinks>".format(self.cache_path)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+
+    def _run(self):
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(alibre_simulator.build_product(self.directory), self.config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+        return run
+
+    def _read_cache_entries(self):
+        entries = {}
+        for directory_path, _, file_names in os.walk(os.path.join(self.cache_path, "objects")):
+            for file_name in file_names:
+                with open(os.path.join(directory_path, file_name), 'r') as entry_file:
+                    entries[file_name] = entry_file.read()
+        return entries
+
+    def test_miss_after_linked_hit_leaves_the_old_entry_alone(self):
+        self._run()
+        self.assertEqual(self._run().run_report.counters["Export Cache Hits"], 3) # plate, bolt and nut
+
+        # The bolt changes, so its next export misses the cache, and Alibre writes a new file where the link to the old entry is
+        entries = self._read_cache_entries()
+        with open(os.path.join(self.directory, "bolt.AD_PRT"), 'w') as source_file:
+            source_file.write("A longer bolt")
+        run = self._run()
+        self.assertEqual(run.run_report.counters["Export Cache Misses"], 1)
+
+        new_entries = self._read_cache_entries()
+        for key, content in entries.items():
+            self.assertEqual(new_entries[key], content)
+        with open(os.path.join(self.directory, "out", "STEPs", "PN-bolt.stp"), 'r') as output_file:
+            self.assertIn("A longer bolt", output_file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
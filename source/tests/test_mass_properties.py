@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+class MassPropertiesHistoryTest(unittest.TestCase):
+    """With an export history, parts' mass properties come from it while their files are unchanged. Assemblies are always read from Alibre."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            "<ExportHistoryPath>./history.json</ExportHistoryPath>",
+            "<ExportDirective><type>CSV_MassProperties</type><RelativeExportPath>./{Number}-mass.csv</RelativeExportPath></ExportDirective>"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _run(self):
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(alibre_simulator.build_product(self.directory), self.config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+        return run
+
+    def test_only_parts_come_from_the_history(self):
+        self._run()
+        run = self._run()
+        self.assertEqual(run.run_report.counters["Mass Properties From History"], 3) # plate, bolt and nut
+        self.assertEqual(run.run_report.counters["Mass Properties Read"], 3) # root, sub and inner
+        # Nothing walked the assemblies to fingerprint them
+        self.assertEqual(sorted(os.path.basename(file_name) for file_name in run.geometry_fingerprints),
+                         ["bolt.AD_PRT", "nut.AD_PRT", "plate.AD_PRT"])
+
+        with open(os.path.join(self.directory, "bolt.AD_PRT"), 'w') as source_file:
+            source_file.write("A longer bolt")
+        self.assertEqual(self._run().run_report.counters["Mass Properties From History"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
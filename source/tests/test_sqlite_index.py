@@ -0,0 +1,45 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+class SQLiteIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            directives="<ExportDirective><type>SQLite_Index</type><RelativeExportPath>./index.sqlite</RelativeExportPath></ExportDirective>"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_same_named_files_in_different_directories_stay_apart(self):
+        os.makedirs(os.path.join(self.directory, "hardware"))
+        bolt = alibre_simulator.AssembledPart("bolt", os.path.join(self.directory, "bolt.AD_PRT"))
+        hardware_bolt = alibre_simulator.AssembledPart("bolt", os.path.join(self.directory, "hardware", "bolt.AD_PRT"))
+        hardware_bolt.Number = "PN-hardware-bolt"
+        root = alibre_simulator.Assembly("root", os.path.join(self.directory, "root.AD_ASM"), [bolt, hardware_bolt], [])
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(root, self.config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+
+        connection = sqlite3.connect(os.path.join(self.directory, "out", "index.sqlite"))
+        try:
+            numbers = dict(connection.execute("SELECT component_file, value FROM properties WHERE name = 'Number'"))
+        finally:
+            connection.close()
+        self.assertEqual(numbers, {"root.AD_ASM": "PN-root", "bolt.AD_PRT": "PN-bolt", "hardware/bolt.AD_PRT": "PN-hardware-bolt"})
+
+
+if __name__ == "__main__":
+    unittest.main()
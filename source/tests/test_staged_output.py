@@ -0,0 +1,90 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+StagedOutput = neutralizer["StagedOutput"]
+
+
+class StagedOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.live_path = os.path.join(self.directory, "out")
+        self._write(self.live_path, "old")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self, directory, content):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, "part.stp"), 'w') as output_file:
+            output_file.write(content)
+
+    def _read_live(self):
+        with open(os.path.join(self.live_path, "part.stp"), 'r') as output_file:
+            return output_file.read()
+
+    def _crash_mid_swap(self):
+        """Start a staged run, and crash it between the two renames of its swap."""
+        crashed = StagedOutput(self.live_path, "20260101-000000-crashed")
+        self._write(crashed.staging_path, "new")
+        open(crashed.staging_path + StagedOutput.COMPLETE_SUFFIX, 'w').close()
+        os.rename(self.live_path, crashed.previous_path)
+        return crashed
+
+    def test_swap_replaces_the_live_output(self):
+        staged = StagedOutput(self.live_path, "20260101-000000-run")
+        self._write(staged.staging_path, "new")
+        staged.swap()
+        self.assertEqual(self._read_live(), "new")
+        self.assertEqual(os.listdir(self.directory), ["out"])
+
+    def test_crash_mid_swap_puts_the_old_output_back(self):
+        self._crash_mid_swap()
+        with alibre_simulator.quiet():
+            StagedOutput(self.live_path, "20260102-000000-next").remove_leftovers()
+        self.assertEqual(self._read_live(), "old")
+        self.assertEqual(os.listdir(self.directory), ["out"])
+
+    def test_crash_mid_swap_without_old_output_uses_the_new_one(self):
+        crashed = self._crash_mid_swap()
+        shutil.rmtree(crashed.previous_path)
+        with alibre_simulator.quiet():
+            StagedOutput(self.live_path, "20260102-000000-next").remove_leftovers()
+        self.assertEqual(self._read_live(), "new")
+        self.assertEqual(os.listdir(self.directory), ["out"])
+
+    def test_half_deleted_old_output_is_never_put_back(self):
+        leftover = StagedOutput(self.live_path, "20260101-000000-done")
+        os.rename(self.live_path, leftover.previous_path)
+        with alibre_simulator.quiet():
+            StagedOutput(self.live_path, "20260102-000000-next").remove_leftovers()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_running_runs_are_left_alone(self):
+        # Another process, still going
+        other_process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            running_staging_path = self.live_path + StagedOutput.STAGING_SUFFIX + "20260101-000000-running-{0}".format(other_process.pid)
+            self._write(running_staging_path, "in progress")
+            crashed_staging_path = self.live_path + StagedOutput.STAGING_SUFFIX + "20260101-000000-crashed"
+            self._write(crashed_staging_path, "abandoned")
+            with alibre_simulator.quiet():
+                StagedOutput(self.live_path, "20260102-000000-next").remove_leftovers()
+            self.assertTrue(os.path.isdir(running_staging_path))
+            self.assertFalse(os.path.exists(crashed_staging_path))
+            self.assertEqual(self._read_live(), "old")
+        finally:
+            other_process.kill()
+            other_process.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import random
+import shutil
+import struct
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+ExportDirective = neutralizer["ExportDirective"]
+ExportTypes = neutralizer["ExportTypes"]
+_iter_stl_triangles = neutralizer["_iter_stl_triangles"]
+_stl_geometry_matches = neutralizer["_stl_geometry_matches"]
+
+
+def _write_ascii_stl(stl_path, triangles):
+    with open(stl_path, 'wb') as stl_file:
+        stl_file.write("solid test\n")
+        for triangle in triangles:
+            stl_file.write("  facet normal 0 0 1\n    outer loop\n")
+            for i in (0, 3, 6):
+                stl_file.write("      vertex {0!r} {1!r} {2!r}\n".format(*triangle[i:i + 3]))
+            stl_file.write("    endloop\n  endfacet\n")
+        stl_file.write("endsolid test\n")
+
+
+def _write_binary_stl(stl_file, triangles):
+    stl_file.write("binary".ljust(80, " "))
+    stl_file.write(struct.pack("<I", len(triangles)))
+    for triangle in triangles:
+        stl_file.write(struct.pack("<12fH", *((0.0, 0.0, 1.0) + tuple(triangle) + (0,))))
+
+
+class STLComparisonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        generator = random.Random(0)
+        # Values binary STL can hold exactly, so the only differences are the ones the tests make
+        self.triangles = [tuple(struct.unpack("<9f", struct.pack("<9f", *[generator.uniform(-10.0, 10.0) for _ in range(9)])))
+                          for _ in range(500)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def test_reading_across_chunks(self):
+        _write_ascii_stl(self._path("mesh.stl"), self.triangles)
+        with open(self._path("mesh-binary.stl"), 'wb') as stl_file:
+            _write_binary_stl(stl_file, self.triangles)
+        gzip_file = gzip.open(self._path("mesh-binary.stl.gz"), 'wb')
+        try:
+            _write_binary_stl(gzip_file, self.triangles)
+        finally:
+            gzip_file.close()
+        for file_name in ("mesh.stl", "mesh-binary.stl", "mesh-binary.stl.gz"):
+            self.assertEqual(list(_iter_stl_triangles(self._path(file_name), chunk_size=97)), self.triangles, file_name)
+
+    def test_noise_within_tolerance_matches_in_any_order(self):
+        tolerance = 1e-3
+        generator = random.Random(1)
+        # Rotated vertices, shuffled triangles, and noise that pushes coordinates back and forth over any grid the tolerance could snap to
+        noisy_triangles = []
+        for triangle in self.triangles:
+            triangle = tuple(value + generator.uniform(-0.9, 0.9) * tolerance for value in triangle)
+            noisy_triangles.append(triangle[3:] + triangle[:3])
+        generator.shuffle(noisy_triangles)
+        _write_ascii_stl(self._path("a.stl"), self.triangles)
+        _write_ascii_stl(self._path("b.stl"), noisy_triangles)
+        self.assertTrue(_stl_geometry_matches(self._path("a.stl"), self._path("b.stl"), tolerance))
+
+        # One vertex moved a little further is a change, as is a flipped facet
+        moved_triangles = list(noisy_triangles)
+        moved_triangles[7] = (moved_triangles[7][0] + 3 * tolerance,) + moved_triangles[7][1:]
+        _write_ascii_stl(self._path("c.stl"), moved_triangles)
+        self.assertFalse(_stl_geometry_matches(self._path("a.stl"), self._path("c.stl"), tolerance))
+        flipped_triangles = list(noisy_triangles)
+        flipped_triangles[7] = flipped_triangles[7][3:6] + flipped_triangles[7][0:3] + flipped_triangles[7][6:9]
+        _write_ascii_stl(self._path("d.stl"), flipped_triangles)
+        self.assertFalse(_stl_geometry_matches(self._path("a.stl"), self._path("d.stl"), tolerance))
+        _write_ascii_stl(self._path("e.stl"), noisy_triangles[:-1])
+        self.assertFalse(_stl_geometry_matches(self._path("a.stl"), self._path("e.stl"), tolerance))
+
+    def test_failed_comparison_leaves_no_temporary_file(self):
+        config_path = alibre_simulator.write_config(self._path("config.xml"))
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(alibre_simulator.build_product(self.directory), config_path)
+        export_directive = ExportDirective(ExportTypes.STL, "./{Number}.stl", detect_geometry_changes=True)
+        # The existing output was cut short, so it can't be read
+        output_path = self._path("part.stl")
+        with open(output_path, 'wb') as stl_file:
+            _write_binary_stl(stl_file, self.triangles)
+            stl_file.truncate(84 + 50 * 10)
+        export_path = neutralizer["_get_temporary_path"](output_path)
+        _write_ascii_stl(export_path, self.triangles)
+        self.assertRaises(Exception, run._post_process_export, export_directive, export_path, output_path)
+        self.assertFalse(os.path.exists(export_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
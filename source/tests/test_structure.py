@@ -0,0 +1,73 @@
+import json
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+
+
+def _transform(rotation_degrees=0.0, translation=(0.0, 0.0, 0.0)):
+    cosine = math.cos(math.radians(rotation_degrees))
+    sine = math.sin(math.radians(rotation_degrees))
+    return [cosine, -sine, 0.0, translation[0], sine, cosine, 0.0, translation[1], 0.0, 0.0, 1.0, translation[2], 0.0, 0.0, 0.0, 1.0]
+
+
+class StructureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _export_structure(self, product):
+        config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            directives="<ExportDirective><type>JSON_Structure</type><RelativeExportPath>./{Number}-structure.json</RelativeExportPath></ExportDirective>"
+        )
+        with alibre_simulator.quiet():
+            run = AlibreNeutralizer(product, config_path)
+            run.export_all()
+        self.assertEqual(run.export_failures, [])
+        with open(os.path.join(self.directory, "out", "PN-root-structure.json"), 'r') as structure_file:
+            return json.load(structure_file)
+
+    def _assert_transforms(self, instances, expected_transforms):
+        self.assertEqual([instance["Instance"] for instance in instances], [name for name, _ in expected_transforms])
+        for instance, (name, expected_transform) in zip(instances, expected_transforms):
+            self.assertIsNotNone(instance["Transform"], name)
+            for value, expected_value in zip(instance["Transform"], expected_transform):
+                self.assertAlmostEqual(value, expected_value, 9, "{0}: {1} != {2}".format(name, instance["Transform"], expected_transform))
+
+    def test_transforms_are_relative_to_the_parent(self):
+        product = alibre_simulator.build_product(self.directory)
+        product.Parts[0].place(translation=(10, 0, 0))
+        sub, outer_inner = product.SubAssemblies
+        sub.place(90, (100, 0, 0))
+        sub_inner = sub.SubAssemblies[0].place(translation=(0, 50, 0))
+        outer_inner.place(-30, (0, 0, 200))
+        # Both instances of inner are the same file, so everything in them is placed the same
+        for inner in (sub_inner, outer_inner):
+            inner.Parts[0].place(45, (1, 2, 3))
+            inner.Parts[1].place(translation=(5, 0, 0))
+
+        assemblies = self._export_structure(product)["Assemblies"]
+        self._assert_transforms(assemblies["root.AD_ASM"], [
+            ("plate<1>", _transform(translation=(10, 0, 0))), ("bolt<1>", _transform()),
+            ("sub<1>", _transform(90, (100, 0, 0))), ("inner<1>", _transform(-30, (0, 0, 200))),
+        ])
+        self._assert_transforms(assemblies["sub.AD_ASM"], [
+            ("plate<1>", _transform()), ("bolt<1>", _transform()), ("inner<1>", _transform(translation=(0, 50, 0))),
+        ])
+        self._assert_transforms(assemblies["inner.AD_ASM"], [
+            ("bolt<1>", _transform(45, (1, 2, 3))), ("nut<1>", _transform(translation=(5, 0, 0))),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
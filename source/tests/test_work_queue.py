@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import alibre_simulator
+
+neutralizer = alibre_simulator.load_neutralizer()
+AlibreNeutralizer = neutralizer["AlibreNeutralizer"]
+FileWorkQueue = neutralizer["FileWorkQueue"]
+
+
+class FileWorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue_path = tempfile.mkdtemp()
+        self.work_queue = FileWorkQueue(self.queue_path)
+        self.work_queue.reset("run", [{"FileName": "file-{0}".format(i), "Kind": "Part"} for i in range(200)])
+
+    def tearDown(self):
+        shutil.rmtree(self.queue_path, ignore_errors=True)
+
+    def test_every_item_is_claimed_exactly_once(self):
+        claimed = []
+        claimed_lock = threading.Lock()
+
+        def _work():
+            work_queue = FileWorkQueue(self.queue_path)
+            while True:
+                item = work_queue.claim()
+                if item is None:
+                    return
+                with claimed_lock:
+                    claimed.append(item["FileName"])
+                work_queue.complete(item, {"Failures": []})
+
+        threads = [threading.Thread(target=_work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), sorted("file-{0}".format(i) for i in range(200)))
+        self.assertEqual(self.work_queue.get_counts(), {"todo": 0, "claimed": 0, "done": 200, "failed": 0})
+
+    def test_release_puts_an_item_back(self):
+        item = self.work_queue.claim()
+        self.work_queue.release(item)
+        self.assertEqual(self.work_queue.get_counts()["claimed"], 0)
+        self.assertEqual(self.work_queue.claim()["FileName"], item["FileName"])
+
+    def test_reset_clears_worker_reports(self):
+        report_path = self.work_queue.get_report_path("worker", "report.json")
+        os.makedirs(os.path.dirname(report_path))
+        open(report_path, 'w').close()
+        self.work_queue.reset("next run", [])
+        self.assertFalse(os.path.exists(report_path))
+
+
+class _BrokenWorkQueue(FileWorkQueue):
+    def complete(self, item, result):
+        raise IOError("The disk is full")
+
+
+class ShardedExportTest(unittest.TestCase):
+    """A coordinator and a worker, each with its own simulated Alibre, sharing a work queue (in threads, rather than processes)."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_path = alibre_simulator.write_config(
+            os.path.join(self.directory, "config.xml"),
+            "<WorkQueuePath>./queue</WorkQueuePath><RunReportPath>./report.json</RunReportPath>"
+        )
+        self.queue_path = os.path.join(self.directory, "out", "queue")
+        alibre_simulator.EXPORT_SECONDS = 0.05
+
+    def tearDown(self):
+        alibre_simulator.EXPORT_SECONDS = 0.0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _run_worker(self, workers):
+        # Workers started before the coordinator has filled the queue just find nothing to do, so wait for it
+        while FileWorkQueue(self.queue_path).get_manifest() is None:
+            time.sleep(0.01)
+        worker = AlibreNeutralizer(alibre_simulator.build_product(self.directory), self.config_path, work_queue_role=FileWorkQueue.WORKER)
+        worker.export_all()
+        workers.append(worker)
+
+    def test_coordinator_and_worker_share_the_exports(self):
+        workers = []
+        worker_thread = threading.Thread(target=self._run_worker, args=(workers,))
+        with alibre_simulator.quiet():
+            worker_thread.start()
+            coordinator = AlibreNeutralizer(alibre_simulator.build_product(self.directory), self.config_path)
+            coordinator.export_all()
+            worker_thread.join()
+
+        self.assertEqual(coordinator.export_failures, [])
+        self.assertEqual(coordinator.run_report.counters["Work Queue Items"], 6)
+        self.assertEqual(coordinator.run_report.counters["Work Queue Processes"], 2)
+        # Everything got exported once, by one or the other, and the coordinator knows about every file
+        exported = [(export_type, os.path.basename(file_name)) for export_type, file_name, path in alibre_simulator.EXPORTS
+                    if path.startswith(self.directory)]
+        self.assertEqual(sorted(exported), sorted(("STEP214", name) for name in
+                                                  ["root.AD_ASM", "sub.AD_ASM", "inner.AD_ASM", "plate.AD_PRT", "bolt.AD_PRT", "nut.AD_PRT"]))
+        self.assertEqual(len([path for path in coordinator.output_files if path.endswith(".stp")]), 6)
+        for path in coordinator.output_files:
+            self.assertTrue(os.path.exists(path), path)
+
+        # The coordinator's report is where the config says, and the worker's is in the queue
+        with open(os.path.join(self.directory, "out", "report.json")) as report_file:
+            self.assertEqual(json.load(report_file)["Counters"]["Work Queue Items"], 6)
+        with open(FileWorkQueue(self.queue_path).get_report_path(workers[0].worker_id, "report.json")) as report_file:
+            self.assertEqual(json.load(report_file)["Settings"]["WorkQueueRole"], FileWorkQueue.WORKER)
+
+    def test_item_that_cant_be_completed_goes_back_in_the_queue(self):
+        os.makedirs(self.queue_path)
+        work_queue = _BrokenWorkQueue(self.queue_path)
+        work_queue.reset("run", [{"FileName": "file", "Kind": "Part"}])
+        item = work_queue.claim(os.getpid())
+        with alibre_simulator.quiet():
+            coordinator = AlibreNeutralizer(alibre_simulator.build_product(self.directory), self.config_path)
+        group = neutralizer["PostExportTaskGroup"]()
+        self.assertRaises(IOError, coordinator._complete_queue_item, work_queue, item, {"Failures": []}, group)
+        self.assertEqual(work_queue.get_counts(), {"todo": 1, "claimed": 0, "done": 0, "failed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()